@@ -0,0 +1,224 @@
+#!/usr/bin/python
+
+import time
+from array import array
+
+import CypressCapsense_Transport
+from CypressCapsense_I2C import CypressCapsense_I2C
+
+# ===========================================================================
+# CapsenseArray Class
+# Drives a fleet of Cypress Capsense C8YC20xx chips over one or more I2C
+# buses, sharing a single bus handle per bus number.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+class CapsenseArray :
+
+    def __init__(self, addresses=(), busnum=-1, debug=False, transport='smbus'):
+        """
+        Parameters:
+            addresses - 7 Bit device addresses on busnum to add right away
+            busnum - I2C bus number for those addresses (default 1)
+            debug - passed on to every device
+            transport - which transport to open buses with (see
+                        CypressCapsense_Transport)
+        """
+        self.debug = debug
+        self.transport = transport
+        self.buses = {}   # busnum -> shared transport
+        self.devices = [] # CypressCapsense_I2C, in poll order
+        self.statuses = array('i')
+
+        for address in addresses:
+            self.addDevice(address, busnum)
+
+    def getBus(self, busnum=-1):
+        """
+        Parameters:
+            busnum - I2C bus number (default 1)
+
+        Return Value:
+            The shared transport for that bus, opened on first use.
+
+        Errors:
+            none
+
+        Description:
+            Every device on the same bus number shares one file descriptor.
+        """
+        busnum = busnum if busnum >= 0 else 1
+        bus = self.buses.get(busnum)
+        if bus is None:
+            bus = CypressCapsense_Transport.openBus(busnum, self.transport)
+            self.buses[busnum] = bus
+        return bus
+
+    def setBus(self, busnum, bus):
+        """
+        Parameters:
+            busnum - I2C bus number
+            bus - an already open transport, e.g. a SimulatedBus
+
+        Return Value:
+            none
+
+        Errors:
+            none
+
+        Description:
+            Use bus for busnum, instead of opening one. Call before adding
+            devices on that bus.
+        """
+        self.buses[busnum if busnum >= 0 else 1] = bus
+
+    def addDevice(self, address, busnum=-1):
+        """
+        Parameters:
+            address - 7 Bit device address
+            busnum - I2C bus number (default 1)
+
+        Return Value:
+            CypressCapsense_I2C - The device, bound to the shared bus handle.
+
+        Errors:
+            none
+
+        Description:
+            Adds a device to the array. Its status goes at the end of the
+            vector returned by pollAll.
+        """
+        busnum = busnum if busnum >= 0 else 1
+        device = CypressCapsense_I2C(address, busnum, debug=self.debug, bus=self.getBus(busnum))
+        self.devices.append(device)
+        self.statuses.append(0)
+        return device
+
+    def pollAll(self, out=None):
+        """
+        Parameters:
+            out - Optional buffer of at least len(self.devices) ints to fill in place
+
+        Return Value:
+            (timestamp, statuses) - The time the poll started, and the touch
+                status of every device, in the order they were added. A device
+                that failed to answer reports -1.
+
+        Errors:
+            none
+
+        Description:
+            Fetches the touch status from every device in the array. The returned
+            vector is reused between calls unless out is given, so copy it if
+            you need to keep it.
+        """
+        if out is None:
+            out = self.statuses
+
+        timestamp = clock()
+        for i in range(len(self.devices)):
+            out[i] = self.devices[i].fetchTouchStatus()
+
+        return (timestamp, out)
+
+    def setRetryPolicy(self, policy):
+        """
+        Parameters:
+            policy - RetryPolicy for every device (see
+                     CypressCapsense_I2C.setRetryPolicy), or None
+
+        Return Value:
+            none
+
+        Errors:
+            none
+
+        Description:
+            Each device gets its own circuit breaker, so one dead chip is
+            skipped while the rest of the bus keeps polling. Pass
+            recover=fleet.recoverBus in the policy to reopen a shared bus
+            after a bus error.
+        """
+        for device in self.devices:
+            device.setRetryPolicy(policy)
+
+    def recoverBus(self, device):
+        """
+        Parameters:
+            device - the device whose bus failed
+
+        Return Value:
+            The reopened bus, or None if the device's bus isn't one of ours
+
+        Errors:
+            If reopening fails, the IOError is raised
+
+        Description:
+            A RetryPolicy recover hook. Closes and reopens the shared bus and
+            moves every device on it over to the new handle.
+        """
+        for (busnum, bus) in self.buses.items():
+            if bus is device.rawBus:
+                try:
+                    bus.close()
+                except IOError as err:
+                    pass
+                newBus = CypressCapsense_Transport.openBus(busnum, self.transport)
+                self.buses[busnum] = newBus
+                for other in self.devices:
+                    if other.rawBus is bus and other is not device:
+                        other.rawBus = newBus
+                        other.wrapBus()
+                return newBus
+        return None
+
+    def enableMetrics(self):
+        """
+        Enable metrics on every device (see CypressCapsense_I2C.enableMetrics).
+        Devices added later must be enabled on their own.
+        """
+        for device in self.devices:
+            device.enableMetrics()
+
+    def stats(self):
+        """
+        Return Value:
+            list - The stats() snapshot of every device, in poll order (None
+                for a device without metrics).
+
+        Errors:
+            none
+
+        Description:
+            Compare error counts and latencies across the array to find the
+            one device slowing down a shared bus.
+        """
+        return [device.stats() for device in self.devices]
+
+    def close(self):
+        """
+        Close every shared bus handle.
+        """
+        for bus in self.buses.values():
+            bus.close()
+        self.buses = {}
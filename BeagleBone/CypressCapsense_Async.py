@@ -0,0 +1,39 @@
+#!/usr/bin/python
+
+import sys
+
+# ===========================================================================
+# AsyncCypressCapsense Class
+# asyncio facade over CypressCapsense_I2C. The coroutines themselves are in
+# CypressCapsense_AsyncIO, whose syntax needs Python 3.6 or later; on older
+# interpreters this module still imports, with the rest of the library, and
+# AsyncCypressCapsense raises ImportError when used.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+if sys.version_info >= (3, 6):
+    from CypressCapsense_AsyncIO import AsyncCypressCapsense, busExecutor, executors, releaseExecutor
+else:
+    class AsyncCypressCapsense :
+
+        def __init__(self, device, loop=None):
+            """
+            Errors:
+                ImportError; asyncio and async generators need Python 3.6
+            """
+            raise ImportError("AsyncCypressCapsense needs Python 3.6 or later")
@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ===========================================================================
+# AsyncCypressCapsense Class
+# asyncio facade over CypressCapsense_I2C. Requires Python 3.6 or later;
+# import it through CypressCapsense_Async, which also imports on Python 2.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+# id(bus) -> [bus, executor, users]. Holding the bus keeps its id from being
+# reused; the entry goes once its last user lets go (see releaseExecutor).
+executors = {}
+
+# get_running_loop is 3.7 on; 3.6 only has get_event_loop
+getRunningLoop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+def busExecutor(bus):
+    """
+    Returns the single worker thread that owns every transaction on bus, so
+    that devices sharing a bus never talk over each other. Each call counts
+    as one user of the thread; hand it back with releaseExecutor.
+    """
+    entry = executors.get(id(bus))
+    if entry is None:
+        entry = [bus, ThreadPoolExecutor(max_workers=1), 0]
+        executors[id(bus)] = entry
+    entry[2] += 1
+    return entry[1]
+
+def releaseExecutor(bus):
+    """
+    Drops one user of bus's worker thread. The last one out shuts the thread
+    down (after whatever is still queued on it) and forgets the bus.
+    """
+    entry = executors.get(id(bus))
+    if entry is None or entry[0] is not bus:
+        return
+    entry[2] -= 1
+    if entry[2] <= 0:
+        del executors[id(bus)]
+        entry[1].shutdown(wait=False)
+
+class AsyncCypressCapsense :
+
+    def __init__(self, device, loop=None):
+        """
+        Parameters:
+            device - CypressCapsense_I2C to drive
+            loop - event loop to use (default: the running loop)
+        """
+        self.device = device
+        self.loop = loop
+        self.bus = None # the bus self.executor serves
+        self.executor = None
+
+    def run(self, func, *args):
+        # the device may have reopened its bus since the last call
+        bus = self.device.rawBus
+        if bus is not self.bus:
+            self.close()
+            self.executor = busExecutor(bus)
+            self.bus = bus
+        loop = self.loop or getRunningLoop()
+        return loop.run_in_executor(self.executor, func, *args)
+
+    def close(self):
+        """
+        Lets go of the bus worker thread. The device itself stays open, and
+        the next call picks a worker thread up again.
+        """
+        if self.bus is not None:
+            releaseExecutor(self.bus)
+            self.bus = None
+            self.executor = None
+
+    async def read(self, register_address):
+        """
+        Awaitable CypressCapsense_I2C.read
+        """
+        return await self.run(self.device.read, register_address)
+
+    async def write(self, register_address, data):
+        """
+        Awaitable CypressCapsense_I2C.write
+        """
+        return await self.run(self.device.write, register_address, data)
+
+    async def fetchTouchStatus(self):
+        """
+        Awaitable CypressCapsense_I2C.fetchTouchStatus
+        """
+        return await self.run(self.device.fetchTouchStatus)
+
+    async def fetchRawCounts(self, port, sensor):
+        """
+        Awaitable CypressCapsense_I2C.fetchRawCounts
+        """
+        return await self.run(self.device.fetchRawCounts, port, sensor)
+
+    async def fetchAllRawCounts(self, out=None):
+        """
+        Awaitable CypressCapsense_I2C.fetchAllRawCounts
+        """
+        return await self.run(self.device.fetchAllRawCounts, out)
+
+    async def touchEvents(self, rateHz=100, changesOnly=True):
+        """
+        Parameters:
+            rateHz - polls per second
+            changesOnly - only yield frames whose status differs from the last one
+
+        Return Value:
+            async iterator of (timestamp, status) frames, timestamped with
+            time.monotonic() just after the read
+
+        Errors:
+            none
+
+        Description:
+            Polls fetchTouchStatus on the bus worker thread, sleeping on the
+            event loop between polls:
+
+                async for (timestamp, status) in dev.touchEvents():
+                    ...
+        """
+        period = 1.0 / rateHz
+        deadline = time.monotonic()
+        last = None
+
+        while True:
+            status = await self.fetchTouchStatus()
+            timestamp = time.monotonic()
+            if not changesOnly or status != last:
+                last = status
+                yield (timestamp, status)
+
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # behind schedule; start over from now rather than bursting
+                deadline = time.monotonic()
+                await asyncio.sleep(0)
@@ -0,0 +1,213 @@
+#!/usr/bin/python
+
+import numpy
+
+# ===========================================================================
+# BaselineTracker Class
+# Host side baseline, noise and drift tracking over the raw counts of every
+# sensor of every Cypress Capsense C8YC20xx in a fleet, one vectorized step
+# per frame, re-baselining a chip only when its sensors need it.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+SENSORS = 10 # per device, indexed port * 5 + sensor
+
+class BaselineTracker :
+
+    def __init__(self, devices, alpha=0.005, noiseAlpha=0.02, initialNoise=2.0,
+                 touchSigma=5.0, minTouch=30, negativeSigma=5.0, minNegative=30,
+                 stuckFrames=1000, cooldownFrames=200, autoReset=True):
+        """
+        Parameters:
+            devices - CypressCapsense_I2C devices (or a CapsenseArray)
+            alpha - weight of each untouched frame in the IIR baseline
+            noiseAlpha - weight of each untouched frame in the noise estimate
+                         (a running mean absolute deviation, in counts)
+            initialNoise - noise estimate to start from, in counts
+            touchSigma, minTouch - a sensor is touched while its delta is
+                                   above touchSigma * noise, and at least minTouch
+            negativeSigma, minNegative - a delta below -negativeSigma * noise
+                                         (and -minNegative) means the baseline
+                                         is too high, e.g. the chip baselined
+                                         with a finger on it
+            stuckFrames - a sensor touched for this many frames in a row is
+                          taken to be drift rather than a finger
+            cooldownFrames - frames after a reset before a device may be
+                             reset again
+            autoReset - call reset() on a flagged device straight away
+        """
+        self.devices = list(getattr(devices, 'devices', devices))
+        shape = (len(self.devices), SENSORS)
+
+        self.alpha = alpha
+        self.noiseAlpha = noiseAlpha
+        self.initialNoise = initialNoise
+        self.touchSigma = touchSigma
+        self.minTouch = minTouch
+        self.negativeSigma = negativeSigma
+        self.minNegative = minNegative
+        self.stuckFrames = stuckFrames
+        self.cooldownFrames = cooldownFrames
+        self.autoReset = autoReset
+
+        # everything is (device, sensor), updated in place every frame
+        self.counts = numpy.zeros(shape, dtype=numpy.uint16)
+        self.baseline = numpy.zeros(shape)
+        self.noise = numpy.full(shape, float(initialNoise))
+        self.delta = numpy.zeros(shape)
+        self.touched = numpy.zeros(shape, dtype=bool)
+        self.flagged = numpy.zeros(shape, dtype=bool)
+        self.touchedFrames = numpy.zeros(shape, dtype=numpy.int64)
+        self.seeded = numpy.zeros(len(self.devices), dtype=bool)
+        self.valid = numpy.ones(len(self.devices), dtype=bool)
+        self.cooldown = numpy.zeros(len(self.devices), dtype=numpy.int64)
+        self.resets = numpy.zeros(len(self.devices), dtype=numpy.int64)
+        self.frames = 0
+
+        # scratch space, reused every frame
+        self.work = numpy.zeros(shape)
+        self.untouched = numpy.zeros(shape, dtype=bool)
+
+    def poll(self):
+        """
+        Parameters:
+            none
+
+        Return Value:
+            numpy bool array - (device, sensor) sensors flagged for a
+                re-baseline this frame
+
+        Errors:
+            A device that fails to answer is left out of this frame
+
+        Description:
+            Fetches the raw counts of every device straight into self.counts,
+            then runs update.
+        """
+        counts = self.counts
+        valid = self.valid
+        for i in range(len(self.devices)):
+            result = self.devices[i].fetchAllRawCounts(counts[i])
+            valid[i] = not (isinstance(result, int) and result == -1)
+        return self.update(counts, valid)
+
+    def update(self, counts, valid=None):
+        """
+        Parameters:
+            counts - (device, sensor) raw counts for one frame
+            valid - optional bool per device; False leaves that device's
+                    state alone for this frame
+
+        Return Value:
+            numpy bool array - (device, sensor) sensors flagged for a
+                re-baseline this frame
+
+        Errors:
+            none
+
+        Description:
+            One vectorized step over every sensor of every device: delta
+            from the baseline, touch detection against the noise estimate,
+            then the baseline and noise follow untouched sensors only, so a
+            finger isn't learned into the baseline. A sensor is flagged when
+            it has read as touched for stuckFrames, or reads well below its
+            baseline. With autoReset, each device with a flagged sensor is
+            reset() (at most once per cooldownFrames) and its baseline is
+            taken again from the next frame.
+        """
+        if valid is None:
+            valid = self.valid
+            valid[:] = True
+
+        # seed devices seeing their first frame (or their first after a reset)
+        seed = valid & ~self.seeded
+        if seed.any():
+            self.baseline[seed] = counts[seed]
+            self.noise[seed] = self.initialNoise
+            self.touchedFrames[seed] = 0
+            self.seeded |= seed
+
+        delta = self.delta
+        numpy.subtract(counts, self.baseline, out=delta)
+
+        # touched: delta above max(touchSigma * noise, minTouch)
+        work = self.work
+        numpy.multiply(self.noise, self.touchSigma, out=work)
+        numpy.maximum(work, self.minTouch, out=work)
+        numpy.greater(delta, work, out=self.touched)
+        self.touched &= valid[:, None]
+
+        untouched = self.untouched
+        numpy.logical_not(self.touched, out=untouched)
+        untouched &= valid[:, None]
+
+        # IIR baseline and mean absolute deviation, on untouched sensors only
+        numpy.multiply(delta, self.alpha, out=work)
+        work *= untouched
+        self.baseline += work
+
+        numpy.absolute(delta, out=work)
+        work -= self.noise
+        work *= self.noiseAlpha
+        work *= untouched
+        self.noise += work
+
+        # drift: stuck touched, or far below the baseline
+        hold = self.untouched # done with it; reuse
+        numpy.logical_not(valid[:, None], out=hold)
+        hold |= self.touched
+        self.touchedFrames += valid[:, None]
+        self.touchedFrames *= hold
+        flagged = self.flagged
+        numpy.greater_equal(self.touchedFrames, self.stuckFrames, out=flagged)
+        numpy.multiply(self.noise, -self.negativeSigma, out=work)
+        numpy.minimum(work, -self.minNegative, out=work)
+        below = self.untouched
+        numpy.less(delta, work, out=below)
+        below &= valid[:, None]
+        flagged |= below
+
+        self.cooldown[self.cooldown > 0] -= 1
+        self.frames += 1
+
+        if self.autoReset:
+            for i in numpy.flatnonzero(flagged.any(axis=1) & (self.cooldown == 0)):
+                self.rebaseline(i)
+
+        return flagged
+
+    def rebaseline(self, i):
+        """
+        Parameters:
+            i - index of the device
+
+        Return Value:
+            The result of the device's reset()
+
+        Errors:
+            none
+
+        Description:
+            Resets the chip's own baseline, and takes the host baseline again
+            from the next frame.
+        """
+        result = self.devices[i].reset()
+        self.seeded[i] = False
+        self.cooldown[i] = self.cooldownFrames
+        self.resets[i] += 1
+        return result
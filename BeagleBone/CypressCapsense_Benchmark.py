@@ -0,0 +1,292 @@
+#!/usr/bin/python
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import CypressCapsense_Transport
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Array import CapsenseArray
+
+# ===========================================================================
+# Benchmark
+# Measures I2C transaction throughput, per-call latency and full-frame scan
+# rates of the Cypress Capsense driver, on real hardware or on the simulator.
+#
+#   python CypressCapsense_Benchmark.py --sim --latency 0.0002 --devices 4
+#   python CypressCapsense_Benchmark.py --busnum 1 --address 0x5D --json out.json
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.perf_counter
+except AttributeError: # python 2
+    clock = time.time
+
+# per call latencies in integer nanoseconds where the interpreter has them,
+# so short calls don't lose their resolution to float rounding
+try:
+    ticks = time.perf_counter_ns
+    TICK = 1e-9
+except AttributeError: # before python 3.7
+    ticks = clock
+    TICK = 1.0
+
+try:
+    import tracemalloc
+except ImportError: # python 2
+    tracemalloc = None
+
+PERCENTILES = [50, 90, 99]
+
+class CountingBus :
+
+    def __init__(self, bus):
+        """
+        Parameters:
+            bus - the transport to count transactions on
+
+        Wraps any transport and counts the I2C transactions going through it.
+        A prepared batch counts as one, like it costs on the wire.
+        """
+        self.bus = bus
+        self.transactions = 0
+
+    def __getattr__(self, name):
+        # prepare, close and anything else go straight through
+        return getattr(self.bus, name)
+
+    def read_byte_data(self, address, register):
+        self.transactions += 1
+        return self.bus.read_byte_data(address, register)
+
+    def write_byte_data(self, address, register, value):
+        self.transactions += 1
+        return self.bus.write_byte_data(address, register, value)
+
+    def read_i2c_block_data(self, address, register, length=32):
+        self.transactions += 1
+        return self.bus.read_i2c_block_data(address, register, length)
+
+    def write_i2c_block_data(self, address, register, values):
+        self.transactions += 1
+        return self.bus.write_i2c_block_data(address, register, values)
+
+    def run(self, plan):
+        self.transactions += 1
+        return self.bus.run(plan)
+
+def percentile(ordered, p):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+def measure(call, iterations, bus, warmup=10):
+    """
+    Parameters:
+        call - function to benchmark, called with no arguments
+        iterations - number of timed calls
+        bus - CountingBus the calls go through
+        warmup - untimed calls first, to fill caches and prepared plans
+
+    Return Value:
+        dict - calls/sec, transactions/sec and per call, latency percentiles
+            in microseconds, errors (calls returning -1), and allocations per
+            call when tracemalloc is available.
+
+    Errors:
+        none
+
+    Description:
+        Times call iterations times. Allocations are measured in a second,
+        untimed pass, since tracing slows every allocation down.
+    """
+    for i in range(warmup):
+        call()
+
+    latencies = [0] * iterations
+    errors = 0
+    transactions = bus.transactions
+    start = clock()
+    for i in range(iterations):
+        t = ticks()
+        result = call()
+        latencies[i] = ticks() - t
+        if result == -1:
+            errors += 1
+    elapsed = clock() - start
+    transactions = bus.transactions - transactions
+
+    latencies.sort()
+    result = {
+        'iterations': iterations,
+        'callsPerSec': iterations / elapsed if elapsed else None,
+        'transactionsPerSec': transactions / elapsed if elapsed else None,
+        'transactionsPerCall': float(transactions) / iterations,
+        'errors': errors,
+        'latencyUs': dict(('p%d' % p, percentile(latencies, p) * TICK * 1e6) for p in PERCENTILES),
+        }
+    result['latencyUs']['max'] = latencies[-1] * TICK * 1e6
+    result['allocationsPerCall'] = allocations(call, iterations)
+    return result
+
+def allocations(call, iterations):
+    """
+    Memory blocks allocated per call, still alive at the end (net) and at
+    the peak (transient), or None without tracemalloc.
+    """
+    if tracemalloc is None:
+        return None
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        (current, peak) = tracemalloc.get_traced_memory()
+        for i in range(iterations):
+            call()
+        (after, peak) = tracemalloc.get_traced_memory()
+        diff = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+    finally:
+        tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+    return {
+        'netBlocks': float(blocks) / iterations,
+        'netBytes': float(after - current) / iterations,
+        'peakBytes': max(0, peak - current),
+        }
+
+def openBus(args):
+    """
+    The bus under test: a SimulatedBus with args.devices chips, or a real one.
+    """
+    if args.sim:
+        from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+        bus = SimulatedBus(latency=args.latency, seed=0)
+        for address in args.address:
+            bus.addChip(SimulatedCapsense(address, seed=address))
+        return bus
+    return CypressCapsense_Transport.openBus(args.busnum, args.transport)
+
+def run(args):
+    """
+    Runs every benchmark, returning the report as a dict.
+    """
+    bus = CountingBus(openBus(args))
+    devices = [CypressCapsense_I2C(address, args.busnum, bus=bus) for address in args.address]
+    device = devices[0]
+    n = args.iterations
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'transport': 'sim' if args.sim else args.transport,
+        'latency': args.latency if args.sim else None,
+        'addresses': ['0x%02X' % address for address in args.address],
+        'time': time.time(),
+        'results': {},
+        }
+    results = report['results']
+
+    if args.sim or args.setup:
+        # cold is a full write and NVM store, warm is just the readback
+        def setupCold():
+            device.clearShadow()
+            return device.setupDevice(force=True)
+        results['setupDevice.cold'] = measure(setupCold, 1, bus, warmup=0)
+        results['setupDevice.warm'] = measure(device.setupDevice, max(1, n // 100), bus, warmup=1)
+
+    results['fetchTouchStatus'] = measure(device.fetchTouchStatus, n, bus)
+    results['fetchRawCounts'] = measure(lambda: device.fetchRawCounts(0, 0), n, bus)
+    results['fetchAllRawCounts'] = measure(device.fetchAllRawCounts, max(1, n // 10), bus)
+
+    # full frames across 1..N devices on the bus
+    for count in range(1, len(devices) + 1):
+        fleet = CapsenseArray()
+        fleet.setBus(args.busnum, bus)
+        for address in args.address[:count]:
+            fleet.addDevice(address, args.busnum)
+        result = measure(fleet.pollAll, max(1, n // count), bus)
+        result['framesPerSec'] = result.pop('callsPerSec')
+        results['pollAll.%d' % count] = result
+
+        subset = devices[:count]
+        result = measure(lambda: [d.fetchAllRawCounts() for d in subset], max(1, n // (10 * count)), bus)
+        result['framesPerSec'] = result.pop('callsPerSec')
+        results['rawFrame.%d' % count] = result
+
+    bus.close()
+    return report
+
+def printReport(report, out=sys.stdout):
+    out.write("%-20s %12s %10s %10s %10s %10s %10s\n" %
+              ('benchmark', 'calls/s', 'trans/s', 'p50 us', 'p99 us', 'max us', 'blocks'))
+    for name in sorted(report['results']):
+        result = report['results'][name]
+        rate = result.get('callsPerSec', result.get('framesPerSec'))
+        blocks = result['allocationsPerCall']
+        out.write("%-20s %12.1f %10.1f %10.1f %10.1f %10.1f %10s\n" %
+                  (name, rate or 0, result['transactionsPerSec'] or 0,
+                   result['latencyUs']['p50'], result['latencyUs']['p99'],
+                   result['latencyUs']['max'],
+                   '%.2f' % blocks['netBlocks'] if blocks else '-'))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cypress Capsense I2C benchmark')
+    parser.add_argument('--sim', action='store_true',
+                        help='run against the in-memory simulator instead of hardware')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='simulated seconds per transaction')
+    parser.add_argument('--devices', type=int, default=1,
+                        help='simulated devices, when no --address is given')
+    parser.add_argument('--busnum', type=int, default=1)
+    parser.add_argument('--transport', default='smbus',
+                        choices=CypressCapsense_Transport.TRANSPORTS)
+    parser.add_argument('--address', type=lambda s: int(s, 0), action='append',
+                        help='device address, repeat for more devices (default 0x5D)')
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--setup', action='store_true',
+                        help='benchmark setupDevice on hardware too (writes NVM)')
+    parser.add_argument('--json', metavar='FILE',
+                        help="write the report as JSON to FILE, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    if not args.address:
+        args.address = [0x5D + i for i in range(args.devices if args.sim else 1)]
+
+    report = run(args)
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+        return report
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    printReport(report)
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/python
+
+import mmap
+import os
+import struct
+
+# ===========================================================================
+# CaptureWriter and CaptureReader Classes
+# A compact append-only binary file of timestamped touch status (and raw
+# count) records, written in batches and read back through mmap.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+# File layout, little endian:
+#   header, HEADER.size bytes: magic, version, file flags, record size
+#   records, back to back: timestamp (seconds, float64), device address,
+#   record flags, touch status, and with FILE_RAW the raw counts of the ten
+#   sensors, indexed port * 5 + sensor (padded to RAW_RECORD.size)
+MAGIC = b'CSCP'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI4x')
+
+FILE_RAW = 0x0001 # records carry raw counts
+RECORD_RAW = 0x0001 # this record's raw counts are valid
+
+RECORD = struct.Struct('<dHHi')
+RAW_RECORD = struct.Struct('<dHHi10H4x')
+
+def recordDtype(raw):
+    """
+    The NumPy structured dtype of a record, with or without raw counts.
+    Needs numpy.
+    """
+    import numpy
+    names = ['timestamp', 'address', 'flags', 'status']
+    formats = ['<f8', '<u2', '<u2', '<i4']
+    if raw:
+        names.append('raw')
+        formats.append(('<u2', 10))
+    size = RAW_RECORD.size if raw else RECORD.size
+    return numpy.dtype({'names': names, 'formats': formats,
+                        'offsets': [0, 8, 10, 12, 16][:len(names)], 'itemsize': size})
+
+class CaptureWriter :
+
+    def __init__(self, path, raw=False, batch=256):
+        """
+        Parameters:
+            path - file to write; an existing capture in the same format is
+                   appended to
+            raw - whether records carry the ten raw counts
+            batch - records buffered in memory between writes to the file
+
+        Errors:
+            ValueError if path exists but is a different kind of capture
+        """
+        self.raw = raw
+        self.record = RAW_RECORD if raw else RECORD
+        self.batch = batch
+        self.buffer = bytearray(self.record.size * batch)
+        self.pending = 0
+        self.count = 0 # records written, this session
+        self.zeros = (0,) * 10
+
+        fileFlags = FILE_RAW if raw else 0
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            self.file = open(path, 'r+b')
+            (magic, version, flags, size) = HEADER.unpack(self.file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or flags != fileFlags or size != self.record.size:
+                self.file.close()
+                raise ValueError("%s is a different kind of capture" % path)
+            # drop a record torn by a crash, then append
+            end = os.path.getsize(path)
+            end -= (end - HEADER.size) % size
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(HEADER.pack(MAGIC, VERSION, fileFlags, self.record.size))
+
+    def write(self, timestamp, address, status, raw=None):
+        """
+        Parameters:
+            timestamp - seconds, as a float, e.g. time.time(). Poller frames
+                        are timestamped in integer nanoseconds; divide
+                        those by 1e9 first
+            address - 7 Bit device address
+            status - touch status (-1 for a failed read)
+            raw - the ten raw counts, or None; ignored unless the file has raw counts
+
+        Return Value:
+            none
+
+        Errors:
+            none
+
+        Description:
+            Buffers a record, writing the batch to the file when it is full.
+        """
+        offset = self.pending * self.record.size
+        if self.raw:
+            flags = RECORD_RAW if raw is not None else 0
+            if raw is None:
+                raw = self.zeros
+            RAW_RECORD.pack_into(self.buffer, offset, timestamp, address, flags, status,
+                                 raw[0], raw[1], raw[2], raw[3], raw[4],
+                                 raw[5], raw[6], raw[7], raw[8], raw[9])
+        else:
+            RECORD.pack_into(self.buffer, offset, timestamp, address, 0, status)
+
+        self.pending += 1
+        self.count += 1
+        if self.pending == self.batch:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered records to the file.
+        """
+        if self.pending:
+            self.file.write(memoryview(self.buffer)[:self.pending * self.record.size])
+            self.pending = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+class CaptureReader :
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path - capture file to read
+
+        Errors:
+            ValueError if the file isn't a capture
+        """
+        self.file = open(path, 'rb')
+        header = self.file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("%s is not a capture" % path)
+        (magic, version, flags, size) = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a capture" % path)
+        self.raw = bool(flags & FILE_RAW)
+        self.record = RAW_RECORD if self.raw else RECORD
+        if size != self.record.size:
+            raise ValueError("%s has an unknown record size" % path)
+
+        length = os.path.getsize(path)
+        self.map = mmap.mmap(self.file.fileno(), length, access=mmap.ACCESS_READ) if length else None
+        # a record still being written is left out
+        self.count = (length - HEADER.size) // size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        """
+        Record i as (timestamp, address, flags, status, raw counts or None).
+        """
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        fields = self.record.unpack_from(self.map, HEADER.size + i * self.record.size)
+        return fields[:4] + ((fields[4:] if fields[2] & RECORD_RAW else None),)
+
+    def array(self):
+        """
+        Every record as a NumPy structured array (see recordDtype) over the
+        mapped file, without copying. Slice and filter it like any array:
+
+            records = reader.array()
+            touched = records[records['status'] > 0]
+
+        Drop the array, and anything sliced from it, before close(). Needs
+        numpy.
+        """
+        import numpy
+        if not self.count:
+            return numpy.zeros(0, dtype=recordDtype(self.raw))
+        return numpy.frombuffer(self.map, dtype=recordDtype(self.raw), count=self.count,
+                                offset=HEADER.size)
+
+    def close(self):
+        """
+        Unmaps the file. Raises BufferError, leaving it mapped, while an
+        array from array() is still alive.
+        """
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                raise BufferError("%s is still in use by an array from array(); "
+                                  "delete it (or copy what you need) before close()" % self.file.name)
+        self.file.close()
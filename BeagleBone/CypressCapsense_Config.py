@@ -0,0 +1,263 @@
+#!/usr/bin/python
+
+import json
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+
+# ===========================================================================
+# CapsenseConfig Class
+# Declarative configuration for a Cypress Capsense C8YC20xx device, compiled
+# into a register write plan that CypressCapsense_I2C.applyConfig applies.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+C = CypressCapsense_I2C
+
+def sensorIndex(pin):
+    """
+    The index (port * 5 + sensor) of a single capsense pin bit, or None if
+    pin isn't one.
+    """
+    port = 1 if pin > 0xFF else 0
+    bit = pin >> (port * 8)
+    if pin & ~(bit << (port * 8)) or bit & (bit - 1) or not 0 < bit <= 0x10:
+        return None
+    return port * 5 + len(bin(bit)) - 3
+
+# field -> default. Per-sensor lists are indexed port * 5 + sensor; None
+# leaves the device's current values alone.
+FIELDS = [
+    ('gpio', 0x0),
+    ('capsense', 0x1F1F),
+    ('interrupt', 0x0),
+    ('idac', [15] * 10),
+    ('fingerThreshold', None),
+    ('scanPosition', None),
+    ('slider', None),           # CS_SLID_CONFIG value, e.g. CS_SLID_CONFIG_ENABLE
+    ('sliderMultiplier', None), # resolution multiplier, 0 to 255.996
+    ('extCap', C.CSE_OTH_SET_DISABLE_EXT_CAP),
+    ('sensorReset', True),
+    ('clock', C.CSE_OTH_SET_CLOCK_IMO),
+]
+
+class CapsenseConfig(object) :
+
+    __slots__ = [name for (name, default) in FIELDS] + ['plan', 'planFields']
+
+    def __init__(self, **kwargs):
+        """
+        Parameters:
+            gpio - 16 bits to turn on as GPIO, as for setupDevice
+            capsense - 16 bits to turn on as Capsense, as for setupDevice
+            interrupt - single bit naming the interrupt pin, as for setupDevice
+            idac - ten IDAC settings (1-255)
+            fingerThreshold - ten finger thresholds (3-255)
+            scanPosition - ten scan positions (0-9)
+            slider - CS_SLID_CONFIG value
+            sliderMultiplier - slider resolution multiplier
+            extCap - CSE_OTH_SET_*_EXT_CAP bits
+            sensorReset - whether stuck sensors are reset automatically
+            clock - one of the CSE_OTH_SET_CLOCK_* values
+        """
+        for (name, default) in FIELDS:
+            value = kwargs.pop(name, default)
+            setattr(self, name, list(value) if isinstance(value, list) else value)
+        if kwargs:
+            raise TypeError("unknown configuration field(s): %s" % ', '.join(sorted(kwargs)))
+        self.plan = None
+        self.planFields = None # the fields self.plan was compiled from
+
+    def fields(self):
+        """
+        Every field's value, lists as tuples, to tell whether anything changed
+        since the plan was compiled, in place (config.idac[0] = 20) or not.
+        """
+        return tuple(tuple(value) if isinstance(value, list) else value
+                     for value in (getattr(self, name) for (name, default) in FIELDS))
+
+    def setSlider(self, pins, resolution=100):
+        """
+        Parameters:
+            pins - 5 or 10 single bit capsense pins xxxBBBBBxxxBBBBB, in order
+                   from one end of the slider to the other
+            resolution - positions run from 0 to this (at most 255 per gap
+                         between sensors)
+
+        Return Value:
+            none
+
+        Errors:
+            ValueError if there aren't 5 or 10 distinct capsense pins
+
+        Description:
+            The chip's slider is made of the sensors in scan positions 0 to 4
+            (or 0 to 9), so the pins are given those positions in order, and
+            every other sensor the positions left over. Sets scanPosition,
+            slider and sliderMultiplier.
+        """
+        sensors = [sensorIndex(pin) for pin in pins]
+        if len(sensors) not in (5, 10) or len(set(sensors)) != len(sensors) or None in sensors:
+            raise ValueError("a slider needs 5 or 10 distinct single pins")
+        if [pin for pin in pins if not pin & self.capsense]:
+            raise ValueError("slider pins must be capsense pins")
+
+        others = [i for i in range(10) if i not in sensors]
+        positions = [0] * 10
+        for (position, i) in enumerate(sensors + others):
+            positions[i] = position
+
+        self.scanPosition = positions
+        self.slider = C.CS_SLID_CONFIG_ENABLE | (C.CS_SLID_CONFIG_10 if len(sensors) == 10 else 0)
+        self.sliderMultiplier = float(resolution) / (len(sensors) - 1)
+
+    def validate(self):
+        """
+        Parameters:
+            none
+
+        Return Value:
+            list - A description of every problem found. Empty if the
+                configuration is usable.
+
+        Errors:
+            none
+
+        Description:
+            Checks pin conflicts and register ranges.
+        """
+        problems = []
+        gpio = self.gpio | self.interrupt
+
+        if gpio & self.capsense:
+            problems.append("pins 0x%04X are both gpio and capsense" % (gpio & self.capsense))
+        if self.interrupt & (self.interrupt - 1):
+            problems.append("interrupt must be a single pin")
+        if (gpio | self.capsense) & ~0x1F1F:
+            problems.append("pins 0x%04X don't exist" % ((gpio | self.capsense) & ~0x1F1F))
+
+        for (name, low, high) in (('idac', 1, 255), ('fingerThreshold', 3, 255),
+                                  ('scanPosition', 0, 9)):
+            values = getattr(self, name)
+            if values is None:
+                continue
+            if len(values) != 10:
+                problems.append("%s needs 10 values, not %d" % (name, len(values)))
+            elif [v for v in values if not low <= v <= high]:
+                problems.append("%s values must be %d to %d" % (name, low, high))
+
+        # stored in 8.8 fixed point, so what matters is the rounded value
+        if self.sliderMultiplier is not None and not 0 <= int(round(self.sliderMultiplier * 256)) <= 0xFFFF:
+            problems.append("sliderMultiplier must be 0 to 255.996")
+
+        return problems
+
+    def compile(self):
+        """
+        Parameters:
+            none
+
+        Return Value:
+            list - The register write plan, as [register, value, mask]
+                triples in the order they must be written. Only the bits in
+                mask are set; the rest keep their current value. None if the
+                configuration doesn't validate.
+
+        Errors:
+            none
+
+        Description:
+            The plan is cached until a field changes, checked on every call
+            so fields changed in place are noticed too. It is plain data, so it
+            can be stored with toJSON and applied to many devices without
+            being recomputed.
+        """
+        fields = self.fields()
+        if self.plan is not None and self.planFields == fields:
+            return self.plan
+        if self.validate():
+            return None
+
+        gpio = self.gpio | self.interrupt
+        plan = [[C.CSE_CS_ENABLE0, self.capsense & 0xFF, 0xFF],
+                [C.CSE_CS_ENABLE1, self.capsense >> 8, 0xFF],
+                [C.CSE_GPIO_ENABLE0, gpio & 0xFF, 0xFF],
+                [C.CSE_GPIO_ENABLE1, gpio >> 8, 0xFF]]
+
+        if self.interrupt:
+            port = 1 if self.interrupt > 0xFF else 0
+            bit = (self.interrupt >> (port * 8))
+            pin = len(bin(bit)) - 3
+
+            # strong drive, so the line needs no pull-up
+            plan.append([C.CSE_DM_STRONG0 + port * 4, bit, bit])
+            plan.append([C.CSE_DM_HIGHZ0 + port * 4, 0x00, bit])
+
+            # output = OR of every capsense input
+            op_sel = C.CSE_OP_SEL_00 + 5 * (port * 5 + pin)
+            plan.append([op_sel, C.CSE_OP_SEL_ENABLE, 0xFF])
+            plan.append([op_sel + 1, self.capsense & 0xFF, 0xFF])
+            plan.append([op_sel + 2, self.capsense >> 8, 0xFF])
+
+        # OTH_SET has to be set before the per-sensor registers
+        plan.append([C.CSE_CS_OTH_SET,
+                     self.extCap | self.clock |
+                     (C.CSE_OTH_SET_SENSOR_RESET if self.sensorReset else C.CSE_OTH_SET_NO_SENSOR_RESET),
+                     0xFF])
+
+        for (base, values) in ((C.CSE_CS_SCAN_POS_00, self.scanPosition),
+                               (C.CSE_CS_FINGER_TH_00, self.fingerThreshold),
+                               (C.CSE_CS_IDAC_00, self.idac)):
+            if values is not None:
+                plan.extend([base + i, values[i], 0xFF] for i in range(10))
+
+        if self.slider is not None:
+            plan.append([C.CS_SLID_CONFIG, self.slider, 0xFF])
+        if self.sliderMultiplier is not None:
+            multiplier = int(round(self.sliderMultiplier * 256))
+            plan.append([C.CS_SLID_MULM, multiplier >> 8, 0xFF])
+            plan.append([C.CS_SLID_MULL, multiplier & 0xFF, 0xFF])
+
+        self.plan = plan
+        self.planFields = fields
+        return plan
+
+    def toDict(self):
+        return dict((name, getattr(self, name)) for (name, default) in FIELDS)
+
+    def toJSON(self, includePlan=True):
+        """
+        Serializes the configuration, and its compiled plan unless includePlan
+        is False.
+        """
+        data = {'config': self.toDict()}
+        if includePlan:
+            data['plan'] = self.compile()
+        return json.dumps(data, sort_keys=True)
+
+    @staticmethod
+    def fromJSON(text):
+        """
+        Builds a CapsenseConfig from toJSON output. A stored plan is reused
+        as is, without recompiling.
+        """
+        data = json.loads(text)
+        config = CapsenseConfig(**dict((str(k), v) for (k, v) in data['config'].items()))
+        if data.get('plan') is not None:
+            config.plan = data['plan']
+            config.planFields = config.fields()
+        return config
@@ -0,0 +1,330 @@
+#!/usr/bin/python
+
+import argparse
+import glob
+import json
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import CypressCapsense_Transport
+from CypressCapsense_I2C import CypressCapsense_I2C
+
+# ===========================================================================
+# discover and provision
+# Finds every Cypress Capsense C8YC201xx on every I2C bus at once, by
+# register signature, and gives factory default (0x00) chips unique
+# addresses one after the other. Also a command line tool:
+#
+#   python CypressCapsense_Discover.py
+#   python CypressCapsense_Discover.py --bus 1 --provision 0x10 --count 12
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+C = CypressCapsense_I2C
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+try:
+    prompt = raw_input
+except NameError: # python 3
+    prompt = input
+
+FACTORY_ADDRESS = 0x00
+
+# the factory default, then every address i2cdetect scans by default; the
+# rest are reserved by the I2C specification
+ADDRESSES = [FACTORY_ADDRESS] + list(range(0x03, 0x78))
+
+# DEVICE_ID, the last two digits of the part number: CY8C20110, 20180,
+# 20160, 20140, 20142 and 201A0
+DEVICE_IDS = {0x10: 'CY8C20110', 0x80: 'CY8C20180', 0x60: 'CY8C20160',
+              0x40: 'CY8C20140', 0x42: 'CY8C20142', 0xA0: 'CY8C201A0'}
+
+DEVICE_ID = 0x7A
+DEVICE_STATUS = 0x7B
+
+FoundDevice = namedtuple('FoundDevice', 'busnum address part deviceStatus')
+
+def probe(bus, address):
+    """
+    Parameters:
+        bus - open bus
+        address - 7 Bit address to try
+
+    Return Value:
+        (part, deviceStatus) - part number and DEVICE_STATUS of the chip at
+            address, or None if nothing there looks like a CY8C201xx
+
+    Errors:
+        none
+
+    Description:
+        Reads I2C_DEV_LOCK, DEVICE_ID and DEVICE_STATUS in one block read.
+        A chip matches if its lock register holds nothing but the lock bit
+        and its DEVICE_ID is a known part number. Only reads, so other
+        devices on the bus are left alone.
+    """
+    try:
+        try:
+            values = bus.read_i2c_block_data(address, C.CSE_I2C_DEV_LOCK, 3)
+        except AttributeError:
+            values = [bus.read_byte_data(address, register_address)
+                      for register_address in range(C.CSE_I2C_DEV_LOCK, DEVICE_STATUS + 1)]
+    except IOError:
+        return None
+
+    (lock, deviceId, deviceStatus) = values[:3]
+    if lock & ~0x01 or deviceId not in DEVICE_IDS:
+        return None
+    return (DEVICE_IDS[deviceId], deviceStatus)
+
+def scanBus(bus, addresses=ADDRESSES):
+    """
+    Every CY8C201xx among addresses on one bus, as (address, part,
+    deviceStatus) tuples.
+    """
+    found = []
+    for address in addresses:
+        result = probe(bus, address)
+        if result is not None:
+            found.append((address,) + result)
+    return found
+
+def availableBuses():
+    """
+    The numbers of the I2C buses this machine has (/dev/i2c-N).
+    """
+    busnums = []
+    for path in glob.glob('/dev/i2c-*'):
+        match = re.match(r'/dev/i2c-(\d+)$', path)
+        if match:
+            busnums.append(int(match.group(1)))
+    return sorted(busnums)
+
+def discover(busnums=None, transport='smbus', buses=None, addresses=ADDRESSES, timeout=0.01):
+    """
+    Parameters:
+        busnums - bus numbers to scan; every bus on the machine by default
+        transport - which transport to open them with
+        buses - optional dict of busnum -> already open bus (e.g. a
+                SimulatedBus) to scan instead of opening busnums
+        addresses - addresses to probe on every bus
+        timeout - seconds a transfer may take, on transports with setTimeout
+
+    Return Value:
+        list - FoundDevice(busnum, address, part, deviceStatus) for every
+            chip found, ordered by bus and address
+
+    Errors:
+        A bus that can't be opened is left out
+
+    Description:
+        Every bus is scanned on its own thread, at the same time. A missing
+        device NACKs its address straight away, so a bus takes a few
+        milliseconds; the timeout bounds how long a stuck one can hold a
+        scan up. Buses opened here are closed again.
+    """
+    if buses is None:
+        buses = {}
+        for busnum in (busnums if busnums is not None else availableBuses()):
+            try:
+                buses[busnum] = CypressCapsense_Transport.openBus(busnum, transport)
+            except (IOError, OSError):
+                continue
+            if hasattr(buses[busnum], 'setTimeout'):
+                try:
+                    buses[busnum].setTimeout(timeout)
+                except IOError:
+                    pass
+        opened = True
+    else:
+        opened = False
+
+    results = {}
+    def scan(busnum):
+        results[busnum] = scanBus(buses[busnum], addresses)
+
+    threads = [threading.Thread(target=scan, args=(busnum,), name="CapsenseScan%d" % busnum)
+               for busnum in buses]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if opened:
+        for bus in buses.values():
+            bus.close()
+
+    return [FoundDevice(busnum, address, part, deviceStatus)
+            for busnum in sorted(results)
+            for (address, part, deviceStatus) in results[busnum]]
+
+def waitForChip(bus, address=FACTORY_ADDRESS, timeout=None, interval=0.05):
+    """
+    Polls address until a CY8C201xx answers there. Returns True when one
+    does, False if timeout seconds pass first.
+    """
+    deadline = None if timeout is None else clock() + timeout
+    while probe(bus, address) is None:
+        if deadline is not None and clock() > deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+def provision(bus, addresses, ready=None, store=True):
+    """
+    Parameters:
+        bus - open bus the chips are attached to
+        addresses - the addresses to give them, in order
+        ready - called as ready(n, address) before the n-th chip is
+                addressed; it should return once that chip (and only that
+                one) is at 0x00, e.g. after it has been plugged in or
+                powered up. Returning False stops. By default, waits for a
+                chip to show up at 0x00.
+        store - store each new address to the chip's NVM
+
+    Return Value:
+        list - The addresses given out, in order
+
+    Errors:
+        Stops at the first chip that can't be readdressed, or doesn't answer
+        at its new address afterwards
+
+    Description:
+        Every chip at 0x00 takes the new address at once, so the chips have
+        to be brought up one at a time. Each is checked at its new address
+        before moving on to the next.
+    """
+    if ready is None:
+        ready = lambda n, address: waitForChip(bus)
+
+    done = []
+    for n in range(len(addresses)):
+        address = addresses[n]
+        if ready(n, address) is False:
+            break
+        if probe(bus, FACTORY_ADDRESS) is None:
+            break
+
+        device = CypressCapsense_I2C(FACTORY_ADDRESS, bus=bus)
+        if not device.changeDeviceAddress(address, store):
+            break
+        if probe(bus, address) is None:
+            break
+        done.append(address)
+
+    return done
+
+def freeAddresses(start, count, taken):
+    """
+    count addresses from start on, skipping those in taken and the
+    reserved ones.
+    """
+    addresses = []
+    address = start
+    while len(addresses) < count and address < 0x78:
+        if address >= 0x03 and address not in taken:
+            addresses.append(address)
+        address += 1
+    return addresses
+
+def simulatedBuses():
+    from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+    buses = {}
+    for busnum in (1, 2):
+        buses[busnum] = SimulatedBus(latency=0.0001)
+        for address in (0x5D, 0x5E):
+            buses[busnum].addChip(SimulatedCapsense(address))
+    return buses
+
+def attachSimulatedChip(bus):
+    from CypressCapsense_Simulator import SimulatedCapsense
+    bus.addChip(SimulatedCapsense(FACTORY_ADDRESS))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Find Cypress Capsense CY8C201xx chips, and give new ones addresses")
+    parser.add_argument('--bus', type=int, action='append', dest='buses',
+                        help="bus to scan (repeatable; default every bus)")
+    parser.add_argument('--transport', default='smbus', choices=CypressCapsense_Transport.TRANSPORTS)
+    parser.add_argument('--timeout', type=float, default=0.01,
+                        help="seconds a transfer may take, where the transport allows")
+    parser.add_argument('--sim', action='store_true', help="scan simulated buses")
+    parser.add_argument('--provision', type=lambda s: int(s, 0), metavar='ADDRESS',
+                        help="give chips at 0x00 addresses from ADDRESS on, one at a time")
+    parser.add_argument('--count', type=int, default=1, help="chips to provision")
+    parser.add_argument('--wait', action='store_true',
+                        help="wait for each chip to appear at 0x00, instead of asking")
+    parser.add_argument('--json', action='store_true', help="print the chips found as JSON")
+    args = parser.parse_args(argv)
+
+    buses = simulatedBuses() if args.sim else None
+    started = clock()
+    found = discover(args.buses, args.transport, buses, timeout=args.timeout)
+    elapsed = clock() - started
+
+    if args.json:
+        print(json.dumps([device._asdict() for device in found]))
+    else:
+        for device in found:
+            note = " (factory default)" if device.address == FACTORY_ADDRESS else ""
+            print("bus %d  0x%02X  %s  status 0x%02X%s" % (device.busnum, device.address,
+                                                          device.part, device.deviceStatus, note))
+        print("%d chip(s) in %.3f s" % (len(found), elapsed))
+
+    if args.provision is None:
+        return 0
+
+    if args.sim:
+        bus = buses[1]
+        busnum = 1
+    else:
+        busnum = args.buses[0] if args.buses else 1
+        bus = CypressCapsense_Transport.openBus(busnum, args.transport)
+    taken = set(device.address for device in found if device.busnum == busnum)
+    addresses = freeAddresses(args.provision, args.count, taken)
+    if len(addresses) < args.count:
+        print("only %d free address(es) from 0x%02X" % (len(addresses), args.provision))
+
+    def ready(n, address):
+        if args.sim:
+            attachSimulatedChip(bus)
+            return True
+        if args.wait:
+            print("waiting for chip %d at 0x00..." % (n + 1))
+            return waitForChip(bus)
+        try:
+            prompt("attach chip %d alone at 0x00 and press Enter (Ctrl-D to stop) " % (n + 1))
+        except EOFError:
+            return False
+        return True
+
+    done = provision(bus, addresses, ready)
+    for address in done:
+        print("bus %d  0x%02X  provisioned" % (busnum, address))
+    bus.close()
+    return 0 if len(done) == len(addresses) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
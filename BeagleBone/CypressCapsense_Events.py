@@ -0,0 +1,133 @@
+#!/usr/bin/python
+
+import time
+from collections import namedtuple
+
+# ===========================================================================
+# TouchEventDetector Class
+# Turns successive Cypress Capsense C8YC20xx touch status masks into
+# press/release events.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+PRESS = 1
+RELEASE = 0
+
+TouchEvent = namedtuple('TouchEvent', 'kind port sensor timestamp')
+
+# fetchTouchStatus puts port 0 in the MSB and port 1 in the LSB.
+# bit -> (port, sensor), for the ten bits that can be set.
+STATUS_BITS = [(bit, (0 if bit >= 8 else 1, bit & 0x7))
+               for bit in (8, 9, 10, 11, 12, 0, 1, 2, 3, 4)]
+
+NO_EVENTS = ()
+
+class TouchEventDetector :
+
+    def __init__(self, debounce=0, initial=0):
+        """
+        Parameters:
+            debounce - number of extra consecutive frames a change must hold
+                       before it is reported (0 reports it right away)
+            initial - the status mask to diff the first frame against
+        """
+        self.debounce = debounce
+        self.stable = initial   # last reported status
+        self.pending = 0        # bits that differ from stable, not yet reported
+        self.counts = [0] * 16  # frames each pending bit has held
+
+    def update(self, status, timestamp=None):
+        """
+        Parameters:
+            status - touch status mask, as returned by fetchTouchStatus
+            timestamp - time of the frame (default: now)
+
+        Return Value:
+            tuple of TouchEvent - one per sensor that was pressed or released.
+                Empty if nothing changed.
+
+        Errors:
+            Negative (error) statuses are ignored, and return no events.
+
+        Description:
+            Diffs status against the last reported state with XOR, so a frame
+            where nothing changed costs a single comparison.
+        """
+        if status < 0:
+            return NO_EVENTS
+
+        diff = status ^ self.stable
+        if not diff and not self.pending:
+            return NO_EVENTS
+
+        if self.debounce:
+            counts = self.counts
+            # bits that bounced back before being reported start over
+            bounced = self.pending & ~diff
+            if bounced:
+                for (bit, where) in STATUS_BITS:
+                    if bounced & (1 << bit):
+                        counts[bit] = 0
+
+            changed = 0
+            for (bit, where) in STATUS_BITS:
+                if diff & (1 << bit):
+                    counts[bit] += 1
+                    if counts[bit] > self.debounce:
+                        changed |= (1 << bit)
+                        counts[bit] = 0
+            self.pending = diff & ~changed
+        else:
+            changed = diff
+
+        if not changed:
+            return NO_EVENTS
+
+        if timestamp is None:
+            timestamp = clock()
+
+        events = []
+        for (bit, (port, sensor)) in STATUS_BITS:
+            if changed & (1 << bit):
+                events.append(TouchEvent(PRESS if status & (1 << bit) else RELEASE,
+                                         port, sensor, timestamp))
+
+        self.stable ^= changed
+        return tuple(events)
+
+    def poll(self, device):
+        """
+        Parameters:
+            device - CypressCapsense_I2C to read
+
+        Return Value:
+            tuple of TouchEvent - see update
+
+        Errors:
+            none
+
+        Description:
+            Fetches the touch status from device and diffs it.
+        """
+        status = device.fetchTouchStatus()
+        return self.update(status, clock())
@@ -1,6 +1,9 @@
 #!/usr/bin/python
 
-import smbus
+import errno
+from array import array
+
+import CypressCapsense_Transport
 
 # ===========================================================================
 # CypressCapsense_I2C Class
@@ -60,6 +63,9 @@ class CypressCapsense_I2C :
     unlock = [ 0x3C, 0xA5, 0x69 ]
     lock = [ 0x96, 0x5A, 0xC3 ]
 
+    # errnos an adapter answers a transfer it can't do with
+    UNSUPPORTED_ERRNOS = (errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS)
+
     # register addresses
     CSE_CS_ENABLE0 = 0x06
     CSE_CS_ENABLE1 = 0x07
@@ -67,6 +73,18 @@ class CypressCapsense_I2C :
     CSE_GPIO_ENABLE0 = 0x08
     CSE_GPIO_ENABLE1 = 0x09
 
+    CSE_DM_PULL_UP0 = 0x10 # drive modes, port 1 registers are 4 higher
+    CSE_DM_STRONG0 = 0x11
+    CSE_DM_HIGHZ0 = 0x12
+    CSE_DM_OD_LOW0 = 0x13
+    CSE_DM_PULL_UP1 = 0x14
+    CSE_DM_STRONG1 = 0x15
+    CSE_DM_HIGHZ1 = 0x16
+    CSE_DM_OD_LOW1 = 0x17
+
+    CSE_OP_SEL_00 = 0x1C # each GPIO gets 5 registers: OP_SEL, OPR1_PRT0/1, OPR2_PRT0/1
+    CSE_OP_SEL_ENABLE = 0x80 # 0b10000000, single operand, OR of the selected pins
+
     CSE_I2C_DEV_LOCK = 0x79
     CSE_I2C_ADDR_DM = 0x7C
     CSE_COMMAND_REG = 0xA0
@@ -112,9 +130,15 @@ class CypressCapsense_I2C :
     CSE_CS_IDAC_14 = 0x74
 
     CS_SLID_CONFIG = 0x75
+    CS_SLID_CONFIG_ENABLE = 0x01 # 0b00000001
+    CS_SLID_CONFIG_10 = 0x02     # 0b00000010, 10 sensors rather than 5
     CS_SLID_MULM = 0x77
     CS_SLID_MULL = 0x78
 
+    # the plain configuration registers; writing one again with the value it
+    # already holds has no side effect, so writeRegisters may bridge them
+    CONFIG_REGISTERS = frozenset(range(CSE_CS_ENABLE0, CS_SLID_MULL + 1))
+
     CSE_CS_OTH_SET = 0x51
     CSE_OTH_SET_DISABLE_EXT_CAP = 0x02 # 0b00000010
     CSE_OTH_SET_ENABLE_EXT_CAP = 0x02  # 0b00000010
@@ -128,6 +152,11 @@ class CypressCapsense_I2C :
     CSE_CS_READ_STATUS0 = 0x88 # on off
     CSE_CS_READ_STATUS1 = 0x89
 
+    CSE_CS_READ_CEN_POSM = 0x8A # slider centroid position
+    CSE_CS_READ_CEN_POSL = 0x8B
+    CSE_CS_READ_CEN_PEAKM = 0x8C # difference count of the centroid's peak
+    CSE_CS_READ_CEN_PEAKL = 0x8D
+
     # commands
     SETUP_OPERATION_MODE = 0x08
     STORE_CURRENT_CONFIGURATION_TO_NVM = 0x01
@@ -137,15 +166,126 @@ class CypressCapsense_I2C :
     GET_FIRMWARE_REVISION = 0x00
     CS_FILTERING_TOUCH_BASELINE_RESET = 0x40 # 0b01000000
 
-    def __init__(self, address, busnum=-1, debug=False):
+    def __init__(self, address, busnum=-1, debug=False, bus=None, transport='smbus', retry=None):
+        """
+        Parameters:
+            address - 7 Bit device address
+            busnum - I2C bus number to open (default 1). With bus, the number
+                     of that bus, if known; it only labels the device's metrics
+            debug - trace every transaction (see startTrace) and print
+                    what setup and maintenance calls do
+            bus - An already open SMBus (or other transport, see
+                  CypressCapsense_Transport) to share with other devices. If
+                  given, it isn't opened or reopened, and transport is ignored.
+            transport - which transport to open busnum with
+            retry - RetryPolicy (see CypressCapsense_Retry) for retrying
+                    failed transactions; by default an error returns -1
+                    straight away
+        """
         self.address = address
-        self.bus = smbus.SMBus(busnum if busnum >= 0 else 1)
+        self.rawBus = bus if bus is not None else CypressCapsense_Transport.openBus(busnum, transport)
+        self.busnum = busnum if busnum >= 0 else (1 if bus is None else None) # None if unknown
+        self.ownBus = bus is None # whether we opened rawBus ourselves
+        self.transport = transport
+        self.bus = self.rawBus # rawBus, wrapped for tracing and metrics when on
         self.debug = debug
-
-    def errMsg(self):
-        print "Error accessing 0x%02X: Check your I2C address" % self.address
+        self.blockRead = None # None until probed, then True/False
+        self.rawCountPlans = {} # transport batch plans, keyed by (address, sensor mask)
+        self.shadow = {} # register -> last value written, for skipping redundant writes
+        self.unfinished = False # True after an applyConfig failed part way
+        self.trace = None # TraceBuffer, while tracing
+        self.metrics = None # DeviceMetrics, once enabled
+        self.retry = None # RetryPolicy
+        self.breaker = None # CircuitBreaker, with a RetryPolicy
+
+        if retry is not None:
+            self.setRetryPolicy(retry)
+        if debug:
+            self.startTrace()
+
+    def errMsg(self, err=None):
+        """
+        Called from the IOError handlers. Returns -1, or re-raises the error
+        being handled if the retry policy says so. Transactions skipped by
+        an open circuit are not reported.
+        """
+        if self.retry is not None and self.retry.raiseErrors:
+            raise
+        if self.breaker is None or not self.breaker.isOpen():
+            print("Error accessing 0x%02X: Check your I2C address" % self.address)
         return -1
 
+    def setRetryPolicy(self, policy):
+        """
+        Parameters:
+            policy - RetryPolicy, or None to stop retrying
+
+        Return Value:
+            none
+
+        Errors:
+            none
+
+        Description:
+            Failed transactions are retried with bounded exponential backoff.
+            Once policy.failureThreshold transactions in a row have failed
+            anyway, the device's circuit opens: for policy.cooldown seconds
+            every call fails at once, without touching the bus, so a dead
+            chip doesn't eat the bus time of the others. If the failure looked
+            like the bus (not a NACK), recoverBus is called too.
+        """
+        self.retry = policy
+        self.breaker = None
+        if policy is not None:
+            from CypressCapsense_Retry import CircuitBreaker
+            self.breaker = CircuitBreaker(policy.failureThreshold, policy.cooldown)
+        self.wrapBus()
+
+    def recoverBus(self, err=None):
+        """
+        Parameters:
+            err - the IOError that opened the circuit, if any
+
+        Return Value:
+            True if the bus handle was replaced
+
+        Errors:
+            If reopening the bus fails, return False
+
+        Description:
+            Reinitializes the bus handle: through the retry policy's recover
+            hook if it has one, otherwise by closing and reopening the bus,
+            if this object opened it. A bus shared with other devices is left
+            alone unless the hook handles it (see CapsenseArray.recoverBus).
+        """
+        if err is not None:
+            from CypressCapsense_Retry import NACK_ERRNOS
+            if err.errno in NACK_ERRNOS:
+                return False # the chip isn't answering; the bus is fine
+
+        try:
+            if self.retry is not None and self.retry.recover is not None:
+                bus = self.retry.recover(self)
+            elif self.ownBus:
+                try:
+                    self.rawBus.close()
+                except IOError as closeErr:
+                    pass
+                bus = CypressCapsense_Transport.openBus(self.busnum, self.transport)
+            else:
+                return False
+        except IOError as openErr:
+            return False
+
+        if bus is None:
+            return False
+        self.rawBus = bus
+        self.blockRead = None
+        self.wrapBus()
+        if self.debug:
+            print("I2C: reopened the bus of device 0x%02X" % self.address)
+        return True
+
     def read(self, register_address):
         """
         Parameters:
@@ -162,13 +302,9 @@ class CypressCapsense_I2C :
             to get the data at that location and returns a byte
         """
         try:
-            result = self.bus.read_byte_data(self.address, register_address)
-            if self.debug:
-                print ("I2C: Device 0x%02X returned 0x%02X from reg 0x%02X" %
-                            (self.address, result & 0xFF, register_address))
-            return result
-        except IOError, err:
-            return self.errMsg()
+            return self.bus.read_byte_data(self.address, register_address)
+        except IOError as err:
+            return self.errMsg(err)
 
     def readString(self, register_address, size):
         """
@@ -187,15 +323,9 @@ class CypressCapsense_I2C :
             from the given register_address 
         """
         try:
-            results = self.bus.read_i2c_block_data(self.address, register_address, 
-                                                   length)
-            if self.debug:
-                print ("I2C: Device 0x%02X returned the following from reg 0x%02X" %
-                       (self.address, register_address))
-            print ' '.join('{:02x}'.format(x) for x in results)
-            return results
-        except IOError, err:
-            return self.errMsg()
+            return self.bus.read_i2c_block_data(self.address, register_address, size)
+        except IOError as err:
+            return self.errMsg(err)
 
 #    def readBuffer(self):
 #        """
@@ -213,10 +343,10 @@ class CypressCapsense_I2C :
 #            buffer was primed in a previous separate command.
 #        """
 #        try:
-#            print "0x%02X" % self.address
+#            print("0x%02X" % self.address)
 #
 #            if self.debug:
-#                print "I2C: Reading buffer" 
+#                print("I2C: Reading buffer")
 #
 #            results = []
 #            while(True):
@@ -234,11 +364,11 @@ class CypressCapsense_I2C :
 #            if self.debug:
 #                print ("I2C: Device 0x%02X returned the following from reg 0x%02X" %
 #                       (self.address, register_address))
-#                print ' '.join('{:02x}'.format(x) for x in results)
+#                print(' '.join('{:02x}'.format(x) for x in results))
 #            return results
 #
-#        except IOError, err:
-#            return self.errMsg()
+#        except IOError as err:
+#            return self.errMsg(err)
 
     def write(self, register_address, data):
         """
@@ -256,10 +386,9 @@ class CypressCapsense_I2C :
         """
         try:
             self.bus.write_byte_data(self.address, register_address, data)
-            if self.debug:
-                print "I2C: Wrote 0x%02X to register 0x%02X" % (data, register_address)
-        except IOError, err:
-            return self.errMsg()
+            self.shadow[register_address] = data
+        except IOError as err:
+            return self.errMsg(err)
 
     def writeString(self, register_address, data):
         """
@@ -280,107 +409,360 @@ class CypressCapsense_I2C :
 
         """
         try:
-            if self.debug:
-                print "I2C: Writing list to register 0x%02X:" % register_address
-                print ' '.join('{:02x}'.format(x) for x in results)
-
             if len(data) > 64:
                 data = data[:64]
 
             self.bus.write_i2c_block_data(self.address, register_address, data)
-        except IOError, err:
-            return self.errMsg()
+        except IOError as err:
+            return self.errMsg(err)
 
-    def changeDeviceAddress(self, new_address):
+    def writeRegisters(self, values):
+        """
+        Parameters:
+            values - (register_address, data) pairs, in the order they must
+                     reach the device
+
+        Return Value:
+            int - The number of bus transactions it took
+
+        Errors:
+            On an I2C error, return -1
+
+        Description:
+            Writes several registers at once. Registers whose value in the
+            shadow register map (self.shadow) already matches are skipped, and
+            runs of consecutive addresses are coalesced into block writes of up
+            to 32 bytes. Short gaps of known configuration registers (see
+            CONFIG_REGISTERS) are rewritten with their current value to keep a
+            run together; command, lock and status registers never are.
+
+            The shadow map only knows what this object has written, so call
+            clearShadow if something else may have changed the device.
+        """
+        runs = []
+        known = dict(self.shadow) # what each register will hold, as runs are queued
+        for (register_address, data) in values:
+            if known.get(register_address) == data:
+                continue
+            if runs:
+                (start, run) = runs[-1]
+                end = start + len(run)
+                # bridge a short gap of configuration registers whose values we
+                # know, rather than starting another transaction
+                gap = range(end, register_address)
+                if (register_address >= end and len(gap) <= 4 and len(run) + len(gap) < 32 and
+                        all(reg in known and reg in CypressCapsense_I2C.CONFIG_REGISTERS
+                            for reg in gap)):
+                    run.extend(known[reg] for reg in gap)
+                    run.append(data)
+                    known[register_address] = data
+                    continue
+            runs.append((register_address, [data]))
+            known[register_address] = data
+
+        try:
+            for (register_address, data) in runs:
+                if len(data) == 1:
+                    self.bus.write_byte_data(self.address, register_address, data[0])
+                else:
+                    self.bus.write_i2c_block_data(self.address, register_address, data)
+
+                for i in range(len(data)):
+                    self.shadow[register_address + i] = data[i]
+        except IOError as err:
+            return self.errMsg(err)
+
+        return len(runs)
+
+    def clearShadow(self):
+        """
+        Forget every register value remembered by writeRegisters, so the next
+        setupDevice writes everything again.
+        """
+        self.shadow = {}
+
+    def changeDeviceAddress(self, new_address, store=True):
         """
         Parameters:
             new_address - 7 Bit new device address to set
-            
+            store - also store the configuration to NVM, so the new address
+                    survives a power cycle
+
         Return Value:
-            none
+            True on success
 
         Errors:
-            none
+            On an I2C error, return False
 
         Description:
             Sends command to device to unlock the address register, change the address
-            value, and re-lock the register.
+            value, and re-lock the register. The chip only answers at the new
+            address once the register is locked again. Every chip sharing the
+            old address takes the new one, so change a factory default (0x00)
+            chip while it is the only one at 0x00 (see CypressCapsense_Discover).
 
         """
-
-        self.writeString(CypressCapsense_I2C.CSE_I2C_DEV_LOCK, unlock, 3)
+        if self.writeString(CypressCapsense_I2C.CSE_I2C_DEV_LOCK, CypressCapsense_I2C.unlock) == -1:
+            return False
         # ORed with MSB 1 to set open drain
-        self.write(CypressCapsense_I2C.CSE_I2C_ADDR_DM, (0x80|new_address))
-        self.writeString(CypressCapsense_I2C.CSE_I2C_DEV_LOCK, lock, 3)
+        if self.write(CypressCapsense_I2C.CSE_I2C_ADDR_DM, (0x80|new_address)) == -1:
+            return False
+        if self.writeString(CypressCapsense_I2C.CSE_I2C_DEV_LOCK, CypressCapsense_I2C.lock) == -1:
+            return False
         self.address = new_address
 
-    def setupDevice(self, gpio=0x0, capsense=0x1F1F): #, slider_buttons=[]):
+        if store:
+            for command in (CypressCapsense_I2C.SETUP_OPERATION_MODE,
+                            CypressCapsense_I2C.STORE_CURRENT_CONFIGURATION_TO_NVM,
+                            CypressCapsense_I2C.NORMAL_OPERATION_MODE):
+                if self.write(CypressCapsense_I2C.CSE_COMMAND_REG, command) == -1:
+                    return False
+
+        return True
+
+    def readRegisters(self, registers):
+        """
+        Parameters:
+            registers - 8 Bit register addresses to read
+
+        Return Value:
+            dict - register address -> value
+
+        Errors:
+            On an I2C error, return -1
+
+        Description:
+            Reads several registers at once, coalescing nearby addresses into
+            block reads of up to 32 bytes (or one read per register, if the
+            adapter can't do block reads). What is read is recorded in the
+            shadow register map, so a following writeRegisters only writes
+            what actually differs.
+        """
+        if self.blockRead is None:
+            self.probeBlockRead()
+
+        runs = []
+        for register_address in sorted(set(registers)):
+            if runs and register_address - runs[-1][1] <= 4 and register_address - runs[-1][0] < 32:
+                runs[-1][1] = register_address
+            else:
+                runs.append([register_address, register_address])
+
+        values = {}
+        try:
+            for (first, last) in runs:
+                if self.blockRead and last > first:
+                    results = self.bus.read_i2c_block_data(self.address, first, last - first + 1)
+                else:
+                    results = [self.bus.read_byte_data(self.address, register_address)
+                               for register_address in range(first, last + 1)]
+
+                for i in range(len(results)):
+                    values[first + i] = results[i]
+        except IOError as err:
+            return self.errMsg(err)
+
+        self.shadow.update(values)
+        return values
+
+    def setupDevice(self, gpio=0x0, capsense=0x1F1F, interrupt=0x0, diff=None, force=False,
+                    slider=None, sliderResolution=100):
         """
         Parameters:
             gpio - 16 bits to turn on as GPIO xxxBBBBBxxxBBBBB
                    (LSB 8 bits (LSB 5 bits) for GPIO0, MSB 8 bits (LSB 5 bits) GPIO1)
             capsense - 16 bits to turn on as Capsense xxxBBBBBxxxBBBBB
                        (LSB 8 bits (LSB 5 bits) for GPIO0, MSB 8 bits (LSB 5 bits) GPIO1)
+            interrupt - a single bit, in the same layout, naming a pin to drive
+                        high while any capsense sensor is touched. The pin is
+                        turned on as GPIO for you. 0 for none.
+            diff - optional dict, filled in with register -> (current, wanted)
+                   for every register that had to change
+            force - write and store everything, without reading the device first
+            slider - optional list of 5 or 10 capsense pins, in the same layout,
+                     in order along a slider (see CapsenseConfig.setSlider)
+            sliderResolution - slider positions run from 0 to this
 
         Return Value:
-            none
+            True on success
 
         Errors:
-            If the pin settings conflict, return false
+            If the pin settings conflict, or a read or write fails, return
+            False. The device is put back in normal mode.
 
         Description:
             Sets the pins to be used as capsense or GPIO on ports 0 and 1. A pin may not be
             both capsense and gpio at the same time.
 
+            The current configuration is read back first, and if it already
+            matches, nothing is written. Otherwise only the registers that
+            differ are written, and the configuration is stored to NVM. This
+            makes it cheap to call on every start, and spares the flash.
+
+            The interrupt pin is the OR of every capsense pin, computed on the chip,
+            so the host can wait on it (see CypressCapsense_Interrupt) instead of
+            polling while nothing is touched.
+
+            With slider, the chip computes the position of a finger along those
+            pins itself; read it with fetchSliderPosition (or see
+            CypressCapsense_Slider).
+
+        """
+        from CypressCapsense_Config import CapsenseConfig
+
+        config = CapsenseConfig(gpio=gpio, capsense=capsense, interrupt=interrupt)
+        if slider:
+            try:
+                config.setSlider(slider, sliderResolution)
+            except ValueError as err:
+                if self.debug:
+                    print("I2C: %s" % err)
+                return False
+
+        return self.applyConfig(config, diff, force)
+
+    def applyConfig(self, config, diff=None, force=False):
         """
-        gpio0 = (gpio & 0xFF) # LSB
-        gpio1 = (gpio >> 8) # MSB
-
-        capsense0 = (capsense & 0xFF) # LSB
-        capsense1 = (capsense >> 8) # MSB
-
-        # check for error condition!
-        if ((gpio0 & capsense0 > 0x00) or (gpio1 & capsense1 > 0x00)):
-            return false
-
-        self.write(CypressCapsense_I2C.CSE_COMMAND_REG, SETUP_OPERATION_MODE)
-
-        # wipe the previous setting.
-        self.write(CypressCapsense_I2C.CSE_GPIO_ENABLE0, 0x00)
-        self.write(CypressCapsense_I2C.CSE_GPIO_ENABLE1, 0x00)
-        self.write(CypressCapsense_I2C.CSE_CS_ENABLE0, 0x00)
-        self.write(CypressCapsense_I2C.CSE_CS_ENABLE1, 0x00)
-        self.write(CypressCapsense_I2C.CSE_GPIO_ENABLE0, gpio0)
-        self.write(CypressCapsense_I2C.CSE_GPIO_ENABLE1, gpio1)
-        self.write(CypressCapsense_I2C.CSE_CS_ENABLE0, capsense0)
-        self.write(CypressCapsense_I2C.CSE_CS_ENABLE1, capsense1)
-
-        # set some sensible defaults
-        self.write(CypressCapsense_I2C.CSE_CS_OTH_SET, 
-            (CypressCapsense_I2C.CSE_OTH_SET_DISABLE_EXT_CAP | 
-            CypressCapsense_I2C.CSE_OTH_SET_SENSOR_RESET | 
-            CypressCapsense_I2C.CSE_OTH_SET_CLOCK_IMO))
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_00, 15)
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_01, 15)
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_02, 15)
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_03, 15)
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_04, 15)
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_10, 15)
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_11, 15)
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_12, 15)
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_13, 15)
-        self.write(CypressCapsense_I2C.CSE_CS_IDAC_14, 15)
-
-        # TODO - setup sliders
-        #   look at the documentation for CS_SCAN_POS and CS_SLID_CONFIG
-        #for i in range(len(slider_buttons)):
-        #    self.write(slider_buttons[i], i)
-
-        self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.STORE_CURRENT_CONFIGURATION_TO_NVM)
-        self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.RECONFIGURE_DEVICE)
-        self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.NORMAL_OPERATION_MODE)
-
-        return true;
+        Parameters:
+            config - CapsenseConfig, or a plan compiled from one
+            diff - optional dict, filled in with register -> (current, wanted)
+                   for every register that had to change
+            force - write and store everything, without reading the device first
+
+        Return Value:
+            True on success
+
+        Errors:
+            If the configuration doesn't validate, or a read or write fails,
+            return False. The device is put back in normal mode, and the
+            registers that weren't written are left out of the shadow map.
+
+        Description:
+            Reads back every register in the plan, and if the device already
+            matches, does nothing else. Otherwise the registers that differ are
+            written in a handful of block writes, and the configuration is
+            stored to NVM.
+        """
+        plan = config.compile() if hasattr(config, 'compile') else config
+        if plan is None:
+            return False
+
+        if force:
+            self.clearShadow()
+            registers = [register_address for (register_address, data, mask) in plan if mask != 0xFF]
+        else:
+            registers = [register_address for (register_address, data, mask) in plan]
+        if registers and self.readRegisters(registers) == -1:
+            return False
+
+        wanted = [(register_address, (self.shadow.get(register_address, 0x00) & ~mask) | data)
+                  for (register_address, data, mask) in plan]
+
+        changes = [(register_address, data) for (register_address, data) in wanted
+                   if self.shadow.get(register_address) != data]
+        if diff is not None:
+            diff.clear()
+            diff.update((register_address, (self.shadow.get(register_address), data))
+                        for (register_address, data) in changes)
+
+        if not changes and not self.unfinished:
+            if self.debug:
+                print("I2C: device 0x%02X already configured" % self.address)
+            return True
+
+        # until the commands below all go through, the device may hold
+        # registers that aren't in NVM, or be left in setup mode, so the next
+        # call goes through them again even if every register matches
+        self.unfinished = True
+        if self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.SETUP_OPERATION_MODE) == -1:
+            return False
+
+        # A pin moving between capsense and GPIO has to be released before it
+        # is claimed, so first drop whatever is going away (everything, if we
+        # don't know the current setting).
+        enables = [(register_address, data) for (register_address, data) in wanted
+                   if CypressCapsense_I2C.CSE_CS_ENABLE0 <= register_address <= CypressCapsense_I2C.CSE_GPIO_ENABLE1]
+        enablesChanged = [change for change in changes if change in enables]
+
+        # Changing the enables reloads the scan positions, finger thresholds and
+        # IDACs from flash, so we no longer know what they hold. Forgotten
+        # before writing, so that holds even if a write below fails.
+        if enablesChanged:
+            for register_address in range(CypressCapsense_I2C.CSE_CS_SCAN_POS_00,
+                                          CypressCapsense_I2C.CSE_CS_IDAC_14 + 1):
+                self.shadow.pop(register_address, None)
+
+        # Writing a scan position swaps it with whichever sensor held it.
+        scanPositions = range(CypressCapsense_I2C.CSE_CS_SCAN_POS_00,
+                              CypressCapsense_I2C.CSE_CS_SCAN_POS_14 + 1)
+        scanPositionsChanged = [change for change in changes if change[0] in scanPositions]
+
+        # The shadow only takes the registers whose writes got through, so
+        # after a failure the next applyConfig writes the rest again.
+        for values in ([(register_address, self.shadow.get(register_address, 0x00) & data)
+                        for (register_address, data) in enables],
+                       enables,
+                       [(register_address, data) for (register_address, data) in wanted
+                        if (register_address, data) not in enables]):
+            if self.writeRegisters(values) == -1:
+                if scanPositionsChanged:
+                    for register_address in scanPositions:
+                        self.shadow.pop(register_address, None)
+                self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.NORMAL_OPERATION_MODE)
+                return False
+
+        if scanPositionsChanged:
+            for register_address in scanPositions:
+                self.shadow.pop(register_address, None)
+
+        for command in (CypressCapsense_I2C.STORE_CURRENT_CONFIGURATION_TO_NVM,
+                        CypressCapsense_I2C.RECONFIGURE_DEVICE,
+                        CypressCapsense_I2C.NORMAL_OPERATION_MODE):
+            if self.write(CypressCapsense_I2C.CSE_COMMAND_REG, command) == -1:
+                if command != CypressCapsense_I2C.NORMAL_OPERATION_MODE:
+                    self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.NORMAL_OPERATION_MODE)
+                return False
+
+        self.unfinished = False
+        return True
+
+    def probeBlockRead(self):
+        """
+        Parameters:
+            none
+
+        Return Value:
+            bool - True if the adapter and device answer block reads, None
+                if the probe failed for some other reason
+
+        Errors:
+            none
+
+        Description:
+            Attempts a two byte block read of the status registers. If the
+            adapter refuses it (or the bus object has no block read at all),
+            fetchTouchStatus falls back to one read per status register. The
+            result is cached in self.blockRead, so the probe is only paid once.
+            Set self.blockRead yourself to skip the probe.
+
+            Any other error (no answer from the chip, a glitch on the bus)
+            says nothing about the adapter, so self.blockRead is left None
+            and the probe runs again on the next read.
+        """
+        try:
+            results = self.bus.read_i2c_block_data(self.address,
+                                                   CypressCapsense_I2C.CSE_CS_READ_STATUS0, 2)
+            self.blockRead = (len(results) == 2)
+        except AttributeError as err:
+            self.blockRead = False
+        except IOError as err:
+            self.blockRead = False if err.errno in CypressCapsense_I2C.UNSUPPORTED_ERRNOS else None
+
+        if self.debug and self.blockRead is not None:
+            print("I2C: block reads %s on device 0x%02X" %
+                  ("supported" if self.blockRead else "not supported", self.address))
+
+        return self.blockRead
 
     def fetchTouchStatus(self):
         """
@@ -393,72 +775,299 @@ class CypressCapsense_I2C :
             none
 
         Description:
-            Fetches the touch true/false status from the sensors
+            Fetches the touch true/false status from the sensors. Where the
+            adapter supports it, both status registers are read in a single
+            combined transaction, so the two ports can't tear between reads.
 
         """
+        if self.blockRead is None:
+            self.probeBlockRead()
+
         try:
-            if self.debug:
-                print "I2C: fetching touch status from registers 0x%02X and 0x%02X:" % \
-                (CypressCapsense_I2C.CSE_CS_READ_STATUS0, CypressCapsense_I2C.CSE_CS_READ_STATUS1)
+            if self.blockRead:
+                status = self.bus.read_i2c_block_data(self.address,
+                                                      CypressCapsense_I2C.CSE_CS_READ_STATUS0, 2)
+                tmp3 = (status[0] << 8) | (status[1])
+            else:
+                tmp = self.bus.read_byte_data(self.address, CypressCapsense_I2C.CSE_CS_READ_STATUS0)
+                #print("0x%02X" % tmp)
 
+                tmp2 = self.bus.read_byte_data(self.address, CypressCapsense_I2C.CSE_CS_READ_STATUS1)
+                #print("0x%02X" % tmp2)
 
-            tmp = self.read(CypressCapsense_I2C.CSE_CS_READ_STATUS0)
-            #print "0x%02X" % tmp
-            
-            tmp2 = self.read(CypressCapsense_I2C.CSE_CS_READ_STATUS1)
-            #print "0x%02X" % tmp2
+                tmp3 = (tmp << 8) | (tmp2)
 
-            tmp3 = (tmp << 8) | (tmp2)
+        except IOError as err:
+            return self.errMsg(err)
 
-            if self.debug:
-                print tmp3
 
-        except IOError, err:
-            return self.errMsg()
+        return tmp3
+
+    def fetchSliderPosition(self):
+        """
+        Parameters:
+            none
 
+        Return Value:
+            (status, position) - The touch status, as from fetchTouchStatus,
+                and the slider's centroid position, from 0 to the resolution
+                it was set up with. The position only means something while
+                one of the slider's sensors is touched.
 
-        return tmp3
+        Errors:
+            On an I2C error, return -1
+
+        Description:
+            The status and centroid registers are adjacent, so where the
+            adapter supports block reads both come back in one four byte
+            transaction, and the position always belongs to the status.
+        """
+        if self.blockRead is None:
+            self.probeBlockRead()
+
+        try:
+            if self.blockRead:
+                results = self.bus.read_i2c_block_data(self.address,
+                                                       CypressCapsense_I2C.CSE_CS_READ_STATUS0, 4)
+            else:
+                results = [self.bus.read_byte_data(self.address, register_address)
+                           for register_address in range(CypressCapsense_I2C.CSE_CS_READ_STATUS0,
+                                                         CypressCapsense_I2C.CSE_CS_READ_CEN_POSL + 1)]
+        except IOError as err:
+            return self.errMsg(err)
+
+        return ((results[0] << 8) | results[1], (results[2] << 8) | results[3])
 
     def fetchRawCounts(self, port, sensor):
         """
         Parameters:
             port - Which port to query (0 or 1)
-            sensor - Which sensor to query (0-4)
+            sensor - Which sensor of that port to query (0-4), by index
 
         Return Value:
             uint16_t - The raw count of the sensor.
 
         Errors:
-            If port > 1, or sensor > 4, return 0
+            ValueError if port isn't 0 or 1, or sensor isn't 0 to 4.
+            On an I2C error, return -1
 
         Description:
-            Fetches the raw count values from the sensor
+            Fetches the raw count values from the sensor. On a transport with
+            batched transfers, the select write and the two byte read go to
+            the kernel together (see fetchRawCountsMask).
 
         """
-        capsensePort = port
-        capsenseSensor = sensor
+        if port not in (0, 1) or sensor not in (0, 1, 2, 3, 4):
+            raise ValueError("no sensor %r on port %r" % (sensor, port))
 
-        if (port > 255):
-            capsenseSensor = ( port >> 8 )
-            capsensePort = 1
+        if hasattr(self.bus, 'prepare'):
+            counts = self.fetchRawCountsMask(1 << ((port << 3) | sensor))
+            if counts == -1:
+                return -1
+            return counts[port * 5 + sensor]
 
-        port_sensor_select = (capsensePort << 7) | (capsenseSensor)
+        port_sensor_select = (port << 7) | (1 << sensor)
 
         try:
-            if self.debug:
-                print "I2C: fetching raw count from register 0x%02X, port %d, sensor %d:" % (CypressCapsense_I2C.CSE_CS_READ_BUTTON, port, sensor)  
+            self.bus.write_byte_data(self.address, CypressCapsense_I2C.CSE_CS_READ_BUTTON,
+                                     port_sensor_select)
 
-            self.write(CypressCapsense_I2C.CSE_CS_READ_BUTTON, port_sensor_select)
+            tmp = self.bus.read_byte_data(self.address, CypressCapsense_I2C.CSE_CS_READ_RAWM) << 8
+            tmp |= self.bus.read_byte_data(self.address, CypressCapsense_I2C.CSE_CS_READ_RAWL)
 
-            tmp = (self.read(CypressCapsense_I2C.CSE_CS_READ_RAWM)) << 8
-            tmp |= self.read(CypressCapsense_I2C.CSE_CS_READ_RAWL)
+            return tmp
+        except IOError as err:
+            return self.errMsg(err)
 
-            if self.debug:
-                print tmp
+    def fetchAllRawCounts(self, out=None):
+        """
+        Parameters:
+            out - Optional buffer of at least 10 uint16 slots to fill in place
+                  (an array('H'), a numpy uint16 vector, or a list)
 
-            return tmp
-        except IOError, err:
-            return self.errMsg()
+        Return Value:
+            array('H') - Raw counts for all ten sensors, indexed port * 5 + sensor.
+                         If out was given, out is returned instead.
+
+        Errors:
+            On an I2C error, return -1
+
+        Description:
+            Fetches the raw count values from every sensor. See fetchRawCountsMask.
+        """
+        return self.fetchRawCountsMask(0x1F1F, out)
+
+    def fetchRawCountsMask(self, mask, out=None):
+        """
+        Parameters:
+            mask - 16 bits selecting the sensors to scan xxxBBBBBxxxBBBBB
+                   (LSB 8 bits (LSB 5 bits) for port 0, MSB 8 bits (LSB 5 bits) port 1),
+                   the same layout as the capsense argument of setupDevice
+            out - Optional buffer of at least 10 uint16 slots to fill in place
+
+        Return Value:
+            array('H') - Raw counts indexed port * 5 + sensor. Sensors not in
+                         the mask are left at 0 (or untouched, if out was given).
+
+        Errors:
+            On an I2C error, return -1
+
+        Description:
+            Fetches the raw count values from several sensors at once. If the
+            transport supports batched transfers (see CypressCapsense_Transport),
+            the select/read sequence for every sensor goes to the kernel as a
+            single batch of messages. Otherwise each
+            sensor costs a select write plus a two byte block read (or two single
+            byte reads, if the adapter can't do block reads).
+        """
+        if out is None:
+            out = array('H', [0] * 10)
+
+        sensors = [(port, sensor) for port in (0, 1) for sensor in range(5)
+                   if mask & (1 << ((port << 3) | sensor))]
+
+        if self.blockRead is None:
+            self.probeBlockRead()
+
+        try:
+            if hasattr(self.bus, 'prepare'):
+                key = (self.address, mask)
+                plan = self.rawCountPlans.get(key)
+                if plan is None:
+                    batch = []
+                    for (port, sensor) in sensors:
+                        batch.append(([CypressCapsense_I2C.CSE_CS_READ_BUTTON, (port << 7) | (1 << sensor)], 0))
+                        batch.append(([CypressCapsense_I2C.CSE_CS_READ_RAWM], 2))
+                    plan = self.bus.prepare(self.address, batch)
+                    self.rawCountPlans[key] = plan
+
+                results = self.bus.run(plan)
+
+                for i in range(len(sensors)):
+                    (port, sensor) = sensors[i]
+                    raw = results[i]
+                    out[port * 5 + sensor] = (raw[0] << 8) | raw[1]
+            else:
+                for (port, sensor) in sensors:
+                    self.bus.write_byte_data(self.address, CypressCapsense_I2C.CSE_CS_READ_BUTTON,
+                                             (port << 7) | (1 << sensor))
+                    if self.blockRead:
+                        raw = self.bus.read_i2c_block_data(self.address,
+                                                           CypressCapsense_I2C.CSE_CS_READ_RAWM, 2)
+                    else:
+                        raw = (self.bus.read_byte_data(self.address, CypressCapsense_I2C.CSE_CS_READ_RAWM),
+                               self.bus.read_byte_data(self.address, CypressCapsense_I2C.CSE_CS_READ_RAWL))
+                    out[port * 5 + sensor] = (raw[0] << 8) | raw[1]
+
+            return out
+        except IOError as err:
+            return self.errMsg(err)
+
+    def startTrace(self, size=4096):
+        """
+        Parameters:
+            size - number of register transfers the trace keeps
+
+        Return Value:
+            TraceBuffer - The trace. Print it with dump(), or decode it with
+                records().
+
+        Errors:
+            none
+
+        Description:
+            Records every register this object reads or writes, with a
+            timestamp, into a binary ring buffer (see CypressCapsense_Trace).
+            Recording costs well under a microsecond per byte and nothing is
+            formatted until the trace is dumped, so it can be left running to
+            catch a fault in the field. Replaces any trace already running.
+        """
+        from CypressCapsense_Trace import TraceBuffer
+        self.trace = TraceBuffer(size)
+        self.wrapBus()
+        return self.trace
+
+    def stopTrace(self):
+        """
+        Stop tracing, returning the TraceBuffer (or None if not tracing).
+        """
+        trace = self.trace
+        self.trace = None
+        self.wrapBus()
+        return trace
+
+    def enableMetrics(self):
+        """
+        Parameters:
+            none
+
+        Return Value:
+            DeviceMetrics - The counters, which stats() takes snapshots of
+
+        Errors:
+            none
+
+        Description:
+            Counts every transaction, byte and error on this device, and keeps
+            a latency histogram per kind of transaction, in preallocated
+            arrays (see CypressCapsense_Metrics). Export them with a
+            MetricsServer. Once enabled, metrics stay on; calling this again
+            keeps the existing counters.
+        """
+        if self.metrics is None:
+            from CypressCapsense_Metrics import DeviceMetrics
+            self.metrics = DeviceMetrics(self.address, self.busnum)
+            self.wrapBus()
+        return self.metrics
+
+    def stats(self):
+        """
+        A snapshot of this device's counters (see DeviceMetrics.stats), or
+        None if metrics aren't enabled.
+        """
+        if self.metrics is None:
+            return None
+        return self.metrics.stats()
+
+    def wrapBus(self):
+        """
+        Rebuild self.bus from self.rawBus: metered if metrics are enabled,
+        traced if tracing, and retried under the retry policy. Prepared batches belong to the old wrapping, so
+        they are dropped.
+        """
+        bus = self.rawBus
+        if self.metrics is not None:
+            from CypressCapsense_Metrics import MeteredBus
+            bus = MeteredBus(bus, self.metrics)
+        if self.trace is not None:
+            from CypressCapsense_Trace import TracingBus
+            bus = TracingBus(bus, self.trace)
+        if self.retry is not None:
+            from CypressCapsense_Retry import RetryingBus
+            bus = RetryingBus(bus, self.retry, self.breaker, self.metrics, self.recoverBus)
+        self.bus = bus
+        self.rawCountPlans = {}
+
+    def startPolling(self, rateHz, size=1024):
+        """
+        Parameters:
+            rateHz - polls per second
+            size - number of slots in the ring buffer; the last size - 1
+                   frames can be read back
+
+        Return Value:
+            CapsensePoller - The running poller. Read frames from it with
+                latest() or readSince(), and stop it with stop().
+
+        Errors:
+            none
+
+        Description:
+            Polls fetchTouchStatus from a background thread into a
+            preallocated ring buffer of timestamped frames.
+        """
+        from CypressCapsense_Poller import CapsensePoller
+        return CapsensePoller(self, size).start(rateHz)
 
     def reset(self):
         """
@@ -466,10 +1075,10 @@ class CypressCapsense_I2C :
         """
         try:
             if self.debug:
-                print "I2C: resetting the touch sensor baseline at register 0x%02X with 0x%02X:" % (CypressCapsense_I2C.CSE_CS_FILTERING, CypressCapsense_I2C.CS_FILTERING_TOUCH_BASELINE_RESET)
+                print("I2C: resetting the touch sensor baseline at register 0x%02X with 0x%02X:" % (CypressCapsense_I2C.CSE_CS_FILTERING, CypressCapsense_I2C.CS_FILTERING_TOUCH_BASELINE_RESET))
             self.write(CypressCapsense_I2C.CSE_CS_FILTERING, CypressCapsense_I2C.CS_FILTERING_TOUCH_BASELINE_RESET)
-        except IOError, err:
-            return self.errMsg()
+        except IOError as err:
+            return self.errMsg(err)
 
     def reboot(self):
         """
@@ -477,13 +1086,13 @@ class CypressCapsense_I2C :
         """
         try:      
             if self.debug:
-                print "I2C: rebooting, at register 0x%02X, with commands 0x%02X, 0x%02X and 0x%02X:" % (CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.SETUP_OPERATION_MODE, 
-                               RECONFIGURE_DEVICE, CypressCapsense_I2C.ORMAL_OPERATION_MODE)
+                print("I2C: rebooting, at register 0x%02X, with commands 0x%02X, 0x%02X and 0x%02X:" % (CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.SETUP_OPERATION_MODE, 
+                               CypressCapsense_I2C.RECONFIGURE_DEVICE, CypressCapsense_I2C.NORMAL_OPERATION_MODE))
             self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.SETUP_OPERATION_MODE)
-            self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.ECONFIGURE_DEVICE)
+            self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.RECONFIGURE_DEVICE)
             self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.NORMAL_OPERATION_MODE)
-        except IOError, err:
-            return self.errMsg()
+        except IOError as err:
+            return self.errMsg(err)
 
 #    def fetchFirmwareRevision(self):
 #        """
@@ -491,16 +1100,16 @@ class CypressCapsense_I2C :
 #        """
 #        try:
 #            if self.debug:
-#                print "I2C: fetching the firmware revision at register 0x%02X with 0x%02X:" % (CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.GET_FIRMWARE_REVISION)
+#                print("I2C: fetching the firmware revision at register 0x%02X with 0x%02X:" % (CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.GET_FIRMWARE_REVISION))
 #
 #            self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.GET_FIRMWARE_REVISION)
 #            tmp = self.readBuffer()
 #            if self.debug:
-#                print ' '.join('{:02x}'.format(x) for x in results) 
+#                print(' '.join('{:02x}'.format(x) for x in results))
 #            return tmp
 #
-#        except IOError, err:
-#            return self.errMsg()
+#        except IOError as err:
+#            return self.errMsg(err)
 #
 #    def fetchDeviceInformation(self):
 #        """
@@ -508,20 +1117,20 @@ class CypressCapsense_I2C :
 #        """
 #        try:
 #            if self.debug:
-#                print "I2C: fetching configuration information at register 0x%02X with 0x%02X:" % (CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.READ_DEVICE_CONFIGURATION)
+#                print("I2C: fetching configuration information at register 0x%02X with 0x%02X:" % (CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.READ_DEVICE_CONFIGURATION))
 #            self.write(CypressCapsense_I2C.CSE_COMMAND_REG, CypressCapsense_I2C.READ_DEVICE_CONFIGURATION)
 #            results = self.readBuffer()
 #
 #            if self.debug:
-#                print ' '.join('{:02x}'.format(x) for x in results) 
+#                print(' '.join('{:02x}'.format(x) for x in results))
 #
 #            return results
-#        except IOError, err:
-#            return self.errMsg()
+#        except IOError as err:
+#            return self.errMsg(err)
 
 if __name__ == '__main__':
     try:
         bus = CypressCapsense_I2C(address=0)
-        print "Default I2C bus is accessible"
+        print("Default I2C bus is accessible")
     except:
-        print "Error accessing default I2C bus"
+        print("Error accessing default I2C bus")
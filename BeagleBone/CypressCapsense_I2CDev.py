@@ -0,0 +1,183 @@
+#!/usr/bin/python
+
+import ctypes
+import ctypes.util
+import math
+import os
+import threading
+
+from CypressCapsense_Transport import I2C_RDWR_IOCTL_MAX_MSGS, I2C_RETRIES, I2C_TIMEOUT
+
+# ===========================================================================
+# I2CDevTransport Class
+# Talks to /dev/i2c-N directly with I2C_RDWR ioctls, using preallocated
+# ctypes message structures instead of python-smbus.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+# linux/i2c-dev.h, linux/i2c.h
+I2C_RDWR = 0x0707
+I2C_M_RD = 0x0001
+
+class i2c_msg(ctypes.Structure):
+    _fields_ = [('addr', ctypes.c_uint16),
+                ('flags', ctypes.c_uint16),
+                ('len', ctypes.c_uint16),
+                ('buf', ctypes.POINTER(ctypes.c_uint8))]
+
+class i2c_rdwr_ioctl_data(ctypes.Structure):
+    _fields_ = [('msgs', ctypes.POINTER(i2c_msg)),
+                ('nmsgs', ctypes.c_uint32)]
+
+libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+class I2CDevPlan :
+
+    def __init__(self, address, batch):
+        """
+        Every structure and buffer a batch of transfers needs, allocated once.
+        See CypressCapsense_Transport for the batch format.
+        """
+        count = sum(2 if length else 1 for (data, length) in batch)
+        self.msgs = (i2c_msg * count)()
+        self.buffers = [] # keep the buffers alive as long as the messages
+        self.results = [] # read buffers, in batch order
+
+        n = 0
+        for (data, length) in batch:
+            self.setMessage(n, address, 0, (ctypes.c_uint8 * len(data))(*data))
+            n += 1
+            if length:
+                buf = (ctypes.c_uint8 * length)()
+                self.setMessage(n, address, I2C_M_RD, buf)
+                self.results.append(buf)
+                n += 1
+
+        # the kernel takes at most I2C_RDWR_IOCTL_MAX_MSGS per call, and a
+        # write must stay in the same call as the read it sets up
+        self.calls = []
+        start = 0
+        while start < count:
+            end = min(count, start + I2C_RDWR_IOCTL_MAX_MSGS)
+            if end < count and self.msgs[end].flags & I2C_M_RD:
+                end -= 1
+            msgs = ctypes.cast(ctypes.byref(self.msgs, start * ctypes.sizeof(i2c_msg)),
+                               ctypes.POINTER(i2c_msg))
+            self.calls.append(i2c_rdwr_ioctl_data(msgs, end - start))
+            start = end
+
+    def setMessage(self, n, address, flags, buf):
+        self.buffers.append(buf)
+        self.msgs[n].addr = address
+        self.msgs[n].flags = flags
+        self.msgs[n].len = len(buf)
+        self.msgs[n].buf = ctypes.cast(buf, ctypes.POINTER(ctypes.c_uint8))
+
+class I2CDevTransport :
+
+    def __init__(self, busnum):
+        """
+        Parameters:
+            busnum - I2C bus number, for /dev/i2c-<busnum>
+        """
+        self.fd = os.open('/dev/i2c-%d' % busnum, os.O_RDWR)
+        self.plans = {} # (address, register, length) -> I2CDevPlan for reads
+
+        # The transport may be shared by devices on several threads (a
+        # CapsenseArray, the asyncio executors), and the write message and
+        # the cached read plans are reused by every call, so each transfer
+        # holds this while it fills them in and copies the results out.
+        self.lock = threading.Lock()
+
+        # one reusable message for every write
+        self.writeBuffer = (ctypes.c_uint8 * 33)()
+        self.writeMsg = (i2c_msg * 1)()
+        self.writeMsg[0].buf = ctypes.cast(self.writeBuffer, ctypes.POINTER(ctypes.c_uint8))
+        self.writeCall = i2c_rdwr_ioctl_data(self.writeMsg, 1)
+
+    def ioctl(self, call):
+        if libc.ioctl(self.fd, I2C_RDWR, ctypes.byref(call)) < 0:
+            err = ctypes.get_errno()
+            raise IOError(err, os.strerror(err))
+
+    def setTimeout(self, seconds, retries=0):
+        """
+        Sets how long the adapter waits on a stuck transfer, and how often
+        it retries one, for this bus. Rounded up to 10 ms.
+        """
+        for (request, value) in ((I2C_TIMEOUT, max(1, int(math.ceil(seconds * 100)))),
+                                 (I2C_RETRIES, retries)):
+            if libc.ioctl(self.fd, request, ctypes.c_ulong(value)) < 0:
+                err = ctypes.get_errno()
+                raise IOError(err, os.strerror(err))
+
+    def prepare(self, address, batch):
+        return I2CDevPlan(address, batch)
+
+    def run(self, plan):
+        """
+        Runs a prepared plan. Its result buffers are reused by the next run
+        of the same plan, so a plan belongs to one thread at a time (as a
+        device's own plans do).
+        """
+        with self.lock:
+            for call in plan.calls:
+                self.ioctl(call)
+        return plan.results
+
+    def readPlan(self, address, register, length):
+        key = (address, register, length)
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = I2CDevPlan(address, [([register], length)])
+            self.plans[key] = plan
+        return plan
+
+    def write(self, address, register, values):
+        with self.lock:
+            self.writeMsg[0].addr = address
+            self.writeMsg[0].len = len(values) + 1
+            self.writeBuffer[0] = register
+            for i in range(len(values)):
+                self.writeBuffer[i + 1] = values[i]
+            self.ioctl(self.writeCall)
+
+    def read(self, address, register, length):
+        plan = self.readPlan(address, register, length)
+        with self.lock:
+            self.ioctl(plan.calls[0])
+            return list(plan.results[0])
+
+    # python-smbus interface, each call a single combined transaction
+
+    def read_byte_data(self, address, register):
+        return self.read(address, register, 1)[0]
+
+    def write_byte_data(self, address, register, value):
+        self.write(address, register, (value,))
+
+    def read_i2c_block_data(self, address, register, length=32):
+        return self.read(address, register, min(length, 32))
+
+    def write_i2c_block_data(self, address, register, values):
+        self.write(address, register, values[:32])
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+
+import fcntl
+import os
+import select
+import struct
+import time
+from array import array
+
+# ===========================================================================
+# CapsenseInterruptReader Class
+# Reads a Cypress Capsense C8YC20xx device only when its interrupt pin (see
+# setupDevice) changes, instead of polling the bus continuously.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+# Every line type below offers the same small interface:
+#   fileno()      - descriptor to poll
+#   pollEvents    - poll mask that means "the line changed"
+#   acknowledge() - consume the pending change(s), so the next poll blocks
+#   close()
+
+class SysfsGpioLine :
+
+    def __init__(self, gpio, edge='both', root='/sys/class/gpio'):
+        """
+        Parameters:
+            gpio - kernel GPIO number (on the BeagleBone, 32 * bank + pin)
+            edge - 'rising', 'falling' or 'both'
+            root - sysfs gpio directory
+        """
+        path = os.path.join(root, 'gpio%d' % gpio)
+        if not os.path.exists(path):
+            with open(os.path.join(root, 'export'), 'w') as f:
+                f.write(str(gpio))
+
+        with open(os.path.join(path, 'direction'), 'w') as f:
+            f.write('in')
+        with open(os.path.join(path, 'edge'), 'w') as f:
+            f.write(edge)
+
+        self.fd = os.open(os.path.join(path, 'value'), os.O_RDONLY | os.O_NONBLOCK)
+        self.pollEvents = select.POLLPRI | select.POLLERR
+        self.acknowledge() # sysfs reports the line as changed until first read
+
+    def fileno(self):
+        return self.fd
+
+    def acknowledge(self):
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        return os.read(self.fd, 8)
+
+    def close(self):
+        os.close(self.fd)
+
+class CdevGpioLine :
+
+    # linux/gpio.h, v1 ABI
+    GPIO_GET_LINEEVENT_IOCTL = 0xC030B404
+    GPIOHANDLE_REQUEST_INPUT = 0x01
+    GPIOEVENT_REQUEST_BOTH_EDGES = 0x03
+    GPIOEVENT_REQUEST = '=III32si'
+    GPIOEVENT_DATA_SIZE = 16
+
+    def __init__(self, offset, chip='/dev/gpiochip0',
+                 edges=GPIOEVENT_REQUEST_BOTH_EDGES, label='capsense'):
+        """
+        Parameters:
+            offset - line number on the chip
+            chip - gpio character device
+            edges - GPIOEVENT_REQUEST_* flags
+            label - consumer name, shown by gpioinfo
+        """
+        request = array('B', struct.pack(CdevGpioLine.GPIOEVENT_REQUEST, offset,
+                                         CdevGpioLine.GPIOHANDLE_REQUEST_INPUT, edges,
+                                         label.encode('ascii')[:31], 0))
+        chipfd = os.open(chip, os.O_RDONLY)
+        try:
+            fcntl.ioctl(chipfd, CdevGpioLine.GPIO_GET_LINEEVENT_IOCTL, request, True)
+        finally:
+            os.close(chipfd)
+
+        self.fd = struct.unpack_from(CdevGpioLine.GPIOEVENT_REQUEST, request)[4]
+        flags = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+        fcntl.fcntl(self.fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self.pollEvents = select.POLLIN
+
+    def fileno(self):
+        return self.fd
+
+    def acknowledge(self):
+        try:
+            while os.read(self.fd, CdevGpioLine.GPIOEVENT_DATA_SIZE * 16):
+                pass
+        except OSError:
+            pass # drained
+
+    def close(self):
+        os.close(self.fd)
+
+class FakeGpioLine :
+
+    def __init__(self):
+        """
+        A pipe standing in for a GPIO line, for testing without hardware.
+        Call trigger() wherever the real pin would change.
+        """
+        (self.fd, self.writefd) = os.pipe()
+        flags = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+        fcntl.fcntl(self.fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self.pollEvents = select.POLLIN
+
+    def trigger(self):
+        os.write(self.writefd, b'\x01')
+
+    def fileno(self):
+        return self.fd
+
+    def acknowledge(self):
+        try:
+            while os.read(self.fd, 64):
+                pass
+        except OSError:
+            pass # drained
+
+    def close(self):
+        os.close(self.fd)
+        os.close(self.writefd)
+
+class CapsenseInterruptReader :
+
+    def __init__(self, device, line, activeRateHz=100):
+        """
+        Parameters:
+            device - CypressCapsense_I2C, set up with an interrupt pin
+            line - SysfsGpioLine, CdevGpioLine or FakeGpioLine wired to that pin
+            activeRateHz - polls per second while something is touched
+        """
+        self.device = device
+        self.line = line
+        self.activePeriod = 1.0 / activeRateHz
+
+        self.poller = select.poll()
+        self.poller.register(line.fileno(), line.pollEvents)
+
+        self.status = device.fetchTouchStatus()
+
+    def waitForChange(self, timeout=None):
+        """
+        Parameters:
+            timeout - seconds to wait, or None to wait forever
+
+        Return Value:
+            uint16_t - The new touch status, or None if the timeout ran out
+
+        Errors:
+            none
+
+        Description:
+            While nothing is touched, sleeps on the interrupt line without
+            touching the bus. The line is the OR of every sensor, so it can't
+            report a second touch while another sensor is held; while anything
+            is touched (or the last read failed), the device is also polled at
+            activeRateHz.
+        """
+        deadline = None if timeout is None else clock() + timeout
+
+        while True:
+            wait = None
+            if self.status != 0:
+                wait = self.activePeriod
+            if deadline is not None:
+                remaining = max(0.0, deadline - clock())
+                wait = remaining if wait is None else min(wait, remaining)
+
+            fired = self.poller.poll(None if wait is None else int(wait * 1000))
+            if fired:
+                self.line.acknowledge()
+
+            if fired or self.status != 0:
+                status = self.device.fetchTouchStatus()
+                if status != self.status:
+                    self.status = status
+                    return status
+
+            if deadline is not None and clock() >= deadline:
+                return None
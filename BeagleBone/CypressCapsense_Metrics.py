@@ -0,0 +1,314 @@
+#!/usr/bin/python
+
+import errno
+import threading
+import time
+from array import array
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+except ImportError: # python 3
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+# ===========================================================================
+# DeviceMetrics, MeteredBus and MetricsServer Classes
+# Per-device transaction counters and latency histograms, kept in
+# preallocated arrays, with an optional Prometheus text exposition endpoint.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.perf_counter
+except AttributeError: # python 2
+    clock = time.time
+
+# transaction kinds, each with its own latency histogram
+READ = 0
+WRITE = 1
+BLOCK_READ = 2
+BLOCK_WRITE = 3
+BATCH = 4
+KINDS = ['read', 'write', 'block_read', 'block_write', 'batch']
+
+# error types, by errno
+NACK = 0 # no device answered
+TIMEOUT = 1
+BUSY = 2 # arbitration lost, adapter busy
+IO = 3 # anything else
+ERROR_TYPES = ['nack', 'timeout', 'busy', 'io']
+ERRNO_TYPES = {errno.ENXIO: NACK, errno.EREMOTEIO: NACK,
+               errno.ETIMEDOUT: TIMEOUT,
+               errno.EAGAIN: BUSY, errno.EBUSY: BUSY}
+
+# upper bounds of the latency buckets, in seconds; one more bucket catches the rest
+BUCKETS = [0.00005, 0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05]
+
+class DeviceMetrics :
+
+    def __init__(self, address, busnum=None):
+        """
+        Parameters:
+            address - 7 Bit device address, used as a label when exported
+            busnum - I2C bus number, the other label; None if unknown
+        """
+        self.address = address
+        self.busnum = busnum
+        nkinds = len(KINDS)
+        self.counts = array('L', [0] * nkinds)
+        self.errors = array('L', [0] * len(ERROR_TYPES))
+        self.bytes = 0
+        self.retries = 0 # counted by the device, not the bus
+        self.latencySums = array('d', [0.0] * nkinds)
+        # histograms[kind * (len(BUCKETS) + 1) + bucket], not cumulative
+        self.histograms = array('L', [0] * (nkinds * (len(BUCKETS) + 1)))
+
+    def record(self, kind, nbytes, seconds):
+        self.counts[kind] += 1
+        self.bytes += nbytes
+        self.latencySums[kind] += seconds
+        bucket = 0
+        while bucket < len(BUCKETS) and seconds > BUCKETS[bucket]:
+            bucket += 1
+        self.histograms[kind * (len(BUCKETS) + 1) + bucket] += 1
+
+    def error(self, err):
+        self.errors[ERRNO_TYPES.get(err.errno, IO)] += 1
+
+    def stats(self):
+        """
+        Return Value:
+            dict - A snapshot of every counter: transactions by kind, bytes,
+                retries, errors by type, and per kind latency count, sum and
+                cumulative buckets as (upper bound, count) pairs.
+
+        Errors:
+            none
+
+        Description:
+            Copies the counters out, so the snapshot doesn't change under you.
+        """
+        latency = {}
+        nbuckets = len(BUCKETS) + 1
+        for kind in range(len(KINDS)):
+            counts = self.histograms[kind * nbuckets:(kind + 1) * nbuckets]
+            cumulative = []
+            total = 0
+            for bucket in range(nbuckets):
+                total += counts[bucket]
+                bound = BUCKETS[bucket] if bucket < len(BUCKETS) else float('inf')
+                cumulative.append((bound, total))
+            latency[KINDS[kind]] = {'count': total, 'sum': self.latencySums[kind],
+                                    'buckets': cumulative}
+
+        return {
+            'address': self.address,
+            'bus': self.busnum,
+            'transactions': dict(zip(KINDS, self.counts)),
+            'bytes': self.bytes,
+            'retries': self.retries,
+            'errors': dict(zip(ERROR_TYPES, self.errors)),
+            'latency': latency,
+            }
+
+class MeteredBus :
+
+    def __init__(self, bus, metrics):
+        """
+        Parameters:
+            bus - the transport to measure
+            metrics - DeviceMetrics to count into
+
+        Wraps a transport, counting and timing every transaction made
+        through it. Failed transactions are counted as errors instead.
+        """
+        self.bus = bus
+        self.metrics = metrics
+        if hasattr(bus, 'prepare'):
+            self.prepare = self.meteredPrepare
+            self.run = self.meteredRun
+
+    def __getattr__(self, name):
+        return getattr(self.bus, name)
+
+    def read_byte_data(self, address, register):
+        start = clock()
+        try:
+            value = self.bus.read_byte_data(address, register)
+        except IOError as err:
+            self.metrics.error(err)
+            raise
+        self.metrics.record(READ, 1, clock() - start)
+        return value
+
+    def write_byte_data(self, address, register, value):
+        start = clock()
+        try:
+            self.bus.write_byte_data(address, register, value)
+        except IOError as err:
+            self.metrics.error(err)
+            raise
+        self.metrics.record(WRITE, 2, clock() - start)
+
+    def read_i2c_block_data(self, address, register, length=32):
+        start = clock()
+        try:
+            values = self.bus.read_i2c_block_data(address, register, length)
+        except IOError as err:
+            self.metrics.error(err)
+            raise
+        self.metrics.record(BLOCK_READ, len(values), clock() - start)
+        return values
+
+    def write_i2c_block_data(self, address, register, values):
+        start = clock()
+        try:
+            self.bus.write_i2c_block_data(address, register, values)
+        except IOError as err:
+            self.metrics.error(err)
+            raise
+        self.metrics.record(BLOCK_WRITE, len(values) + 1, clock() - start)
+
+    def meteredPrepare(self, address, batch):
+        nbytes = sum(len(data) + length for (data, length) in batch)
+        return (self.bus.prepare(address, batch), nbytes)
+
+    def meteredRun(self, plan):
+        (plan, nbytes) = plan
+        start = clock()
+        try:
+            results = self.bus.run(plan)
+        except IOError as err:
+            self.metrics.error(err)
+            raise
+        self.metrics.record(BATCH, nbytes, clock() - start)
+        return results
+
+def exposition(devices):
+    """
+    Parameters:
+        devices - CypressCapsense_I2C devices (or a CapsenseArray)
+
+    Return Value:
+        str - The metrics of every device with metrics enabled, in the
+            Prometheus text exposition format.
+
+    Errors:
+        none
+
+    Description:
+        Renders a snapshot of each device's counters. Devices are labelled by
+        bus number and address, so chips at the same address on different
+        buses are kept apart. A device whose bus number isn't known gets an
+        empty bus label.
+    """
+    devices = getattr(devices, 'devices', devices)
+    snapshots = [device.stats() for device in devices if device.metrics is not None]
+
+    lines = []
+    def family(name, kind, help):
+        lines.append("# HELP %s %s" % (name, help))
+        lines.append("# TYPE %s %s" % (name, kind))
+
+    def deviceLabels(stats):
+        return [('bus', '' if stats['bus'] is None else stats['bus']),
+                ('address', '0x%02X' % stats['address'])]
+
+    def sample(name, labels, value):
+        lines.append("%s{%s} %s" % (name, ','.join('%s="%s"' % label for label in labels),
+                                    repr(float(value)) if isinstance(value, float) else value))
+
+    family('capsense_transactions_total', 'counter', 'I2C transactions by kind')
+    for stats in snapshots:
+        for kind in KINDS:
+            sample('capsense_transactions_total',
+                   deviceLabels(stats) + [('kind', kind)],
+                   stats['transactions'][kind])
+
+    family('capsense_bytes_total', 'counter', 'Bytes transferred')
+    for stats in snapshots:
+        sample('capsense_bytes_total', deviceLabels(stats), stats['bytes'])
+
+    family('capsense_retries_total', 'counter', 'Operations retried after an I2C error')
+    for stats in snapshots:
+        sample('capsense_retries_total', deviceLabels(stats), stats['retries'])
+
+    family('capsense_errors_total', 'counter', 'Failed I2C transactions by type')
+    for stats in snapshots:
+        for error in ERROR_TYPES:
+            sample('capsense_errors_total',
+                   deviceLabels(stats) + [('type', error)],
+                   stats['errors'][error])
+
+    family('capsense_latency_seconds', 'histogram', 'I2C transaction latency by kind')
+    for stats in snapshots:
+        for kind in KINDS:
+            labels = deviceLabels(stats) + [('kind', kind)]
+            histogram = stats['latency'][kind]
+            for (bound, count) in histogram['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                sample('capsense_latency_seconds_bucket', labels + [('le', le)], count)
+            sample('capsense_latency_seconds_sum', labels, histogram['sum'])
+            sample('capsense_latency_seconds_count', labels, histogram['count'])
+
+    return '\n'.join(lines) + '\n'
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = exposition(self.server.devices).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer :
+
+    def __init__(self, devices, port=9464, host='127.0.0.1'):
+        """
+        Parameters:
+            devices - CypressCapsense_I2C devices (or a CapsenseArray) to export
+            port - TCP port to listen on (0 for any free port)
+            host - interface to listen on; only localhost by default
+        """
+        self.httpd = HTTPServer((host, port), MetricsHandler)
+        self.httpd.devices = devices
+        self.port = self.httpd.server_address[1]
+        self.thread = None
+
+    def start(self):
+        """
+        Serve /metrics from a daemon thread. Returns self.
+        """
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="CapsenseMetrics")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.httpd.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.httpd.server_close()
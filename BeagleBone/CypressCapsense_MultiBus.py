@@ -0,0 +1,259 @@
+#!/usr/bin/python
+
+import ctypes
+import heapq
+import multiprocessing
+import threading
+import time
+
+import CypressCapsense_Transport
+from CypressCapsense_I2C import CypressCapsense_I2C
+
+# ===========================================================================
+# MultiBusRunner Class
+# Polls Cypress Capsense C8YC20xx devices on several I2C buses in parallel,
+# one worker thread or process per bus, and merges their frames into one
+# time-ordered stream through shared memory.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+# CLOCK_MONOTONIC is system wide, so timestamps from different worker
+# processes can be compared
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+class SharedFrameRing :
+
+    def __init__(self, size):
+        """
+        Parameters:
+            size - number of frames kept
+
+        A single-writer ring buffer of (timestamp, address, status) frames in
+        shared memory, readable from any process forked after it was made.
+        Each slot carries the sequence number of the frame in it, written
+        last, so a reader can tell a slot that was overwritten under it.
+        """
+        self.size = size
+        self.timestamps = multiprocessing.RawArray(ctypes.c_double, size)
+        self.addresses = multiprocessing.RawArray(ctypes.c_int, size)
+        self.statuses = multiprocessing.RawArray(ctypes.c_int, size)
+        self.sequences = multiprocessing.RawArray(ctypes.c_longlong, size)
+        self.written = multiprocessing.RawValue(ctypes.c_longlong, 0)
+
+    def append(self, timestamp, address, status):
+        n = self.written.value
+        slot = n % self.size
+        self.sequences[slot] = -1 # being written
+        self.timestamps[slot] = timestamp
+        self.addresses[slot] = address
+        self.statuses[slot] = status
+        self.sequences[slot] = n
+        self.written.value = n + 1
+
+    def latestTimestamp(self):
+        n = self.written.value
+        if n == 0:
+            return None
+        return self.timestamps[(n - 1) % self.size]
+
+    def readSince(self, seq, until):
+        """
+        Frames from seq on with timestamps up to until. Returns (nextSeq,
+        frames, lost), frames being (timestamp, address, status) tuples.
+        """
+        written = self.written.value
+        lost = 0
+        if written - seq > self.size:
+            lost = written - seq - self.size
+            seq = written - self.size
+
+        frames = []
+        while seq < written:
+            slot = seq % self.size
+            timestamp = self.timestamps[slot]
+            address = self.addresses[slot]
+            status = self.statuses[slot]
+            if self.sequences[slot] != seq:
+                # lapped by the writer while we read; skip ahead
+                lost += 1
+                seq += 1
+                continue
+            if timestamp > until:
+                break
+            frames.append((timestamp, address, status))
+            seq += 1
+
+        return (seq, frames, lost)
+
+def pollBus(busnum, addresses, transport, bus, rateHz, ring, running):
+    """
+    Worker body: polls every device on one bus at rateHz into ring, until
+    running is cleared. Runs in a thread or a child process. A bus passed in
+    belongs to the caller and is left open.
+    """
+    ownBus = bus is None
+    if ownBus:
+        bus = CypressCapsense_Transport.openBus(busnum, transport)
+    devices = [CypressCapsense_I2C(address, busnum, bus=bus) for address in addresses]
+
+    period = 1.0 / rateHz
+    deadline = clock()
+    while running.value:
+        for device in devices:
+            status = device.fetchTouchStatus()
+            ring.append(clock(), device.address, status)
+
+        deadline += period
+        delay = deadline - clock()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            deadline += int(-delay / period) * period
+
+    if ownBus:
+        bus.close()
+
+class MultiBusRunner :
+
+    def __init__(self, rateHz=500, processes=False, size=4096):
+        """
+        Parameters:
+            rateHz - polls per second of every device
+            processes - run each bus in its own process instead of a thread,
+                        so the buses don't share one interpreter lock
+            size - frames buffered per bus
+        """
+        self.rateHz = rateHz
+        self.processes = processes
+        self.size = size
+        self.buses = [] # (busnum, addresses, transport, bus)
+        self.rings = []
+        self.workers = []
+        self.running = multiprocessing.RawValue(ctypes.c_int, 0)
+
+    def addBus(self, busnum, addresses, transport='smbus', bus=None):
+        """
+        Parameters:
+            busnum - I2C bus number
+            addresses - 7 Bit addresses of the devices on that bus
+            transport - which transport the worker opens the bus with
+            bus - optional already open bus (e.g. a SimulatedBus) to use
+                  instead; with processes, each worker gets a forked copy.
+                  It stays open after stop().
+
+        Return Value:
+            none
+
+        Errors:
+            none
+
+        Description:
+            Adds a bus and its devices. Call before start(). The bus is
+            opened in the worker, so a worker process owns its own handle.
+        """
+        self.buses.append((busnum, list(addresses), transport, bus))
+        self.rings.append(SharedFrameRing(self.size))
+
+    def start(self):
+        """
+        Starts one worker per bus. Returns self.
+        """
+        if self.running.value:
+            return self
+        self.running.value = 1
+        for i in range(len(self.buses)):
+            (busnum, addresses, transport, bus) = self.buses[i]
+            args = (busnum, addresses, transport, bus, self.rateHz, self.rings[i], self.running)
+            if self.processes:
+                worker = multiprocessing.Process(target=pollBus, args=args,
+                                                 name="CapsenseBus%d" % busnum)
+            else:
+                worker = threading.Thread(target=pollBus, args=args,
+                                          name="CapsenseBus%d" % busnum)
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+        return self
+
+    def stop(self):
+        """
+        Stops every worker, and waits for them to finish.
+        """
+        self.running.value = 0
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+    def failedBuses(self):
+        """
+        The bus numbers whose worker has died while running, e.g. because
+        its bus couldn't be opened. Their frames stop, and readSince no
+        longer waits for them.
+        """
+        if not self.running.value:
+            return []
+        return [self.buses[i][0] for i in range(len(self.workers))
+                if not self.workers[i].is_alive()]
+
+    def readSince(self, cursor=None):
+        """
+        Parameters:
+            cursor - what the previous call returned, or None to start from
+                     the first frame
+
+        Return Value:
+            (cursor, frames, lost) - frames is a list of (timestamp, busnum,
+                address, status) tuples in timestamp order across all buses,
+                cursor is what to pass next time, and lost is how many frames
+                were overwritten before they were read.
+
+        Errors:
+            none
+
+        Description:
+            Merges the frames of every bus. A frame is only returned once
+            every bus has polled past its timestamp, so a slower bus can't
+            later produce a frame older than one already returned. A bus
+            whose worker has died (see failedBuses) can't produce any more
+            frames, so it is left out of that, rather than holding every
+            other bus up for good.
+        """
+        if cursor is None:
+            cursor = [0] * len(self.rings)
+
+        failed = self.failedBuses()
+        latest = [self.rings[i].latestTimestamp() for i in range(len(self.rings))
+                  if self.buses[i][1] and self.buses[i][0] not in failed]
+        if None in latest:
+            return (cursor, [], 0)
+        watermark = min(latest) if latest else float('inf')
+
+        cursor = list(cursor)
+        streams = []
+        lost = 0
+        for i in range(len(self.rings)):
+            (cursor[i], frames, ringLost) = self.rings[i].readSince(cursor[i], watermark)
+            lost += ringLost
+            busnum = self.buses[i][0]
+            streams.append([(timestamp, busnum, address, status)
+                            for (timestamp, address, status) in frames])
+
+        return (cursor, list(heapq.merge(*streams)), lost)
@@ -0,0 +1,198 @@
+#!/usr/bin/python
+
+import threading
+import time
+from array import array
+
+# ===========================================================================
+# CapsensePoller Class
+# Polls a Cypress Capsense C8YC20xx device from a background thread into a
+# fixed-size ring buffer of timestamped touch frames.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+try:
+    clock_ns = time.monotonic_ns
+except AttributeError: # python < 3.7
+    clock_ns = lambda: int(clock() * 1000000000)
+
+class CapsensePoller :
+
+    def __init__(self, device, size=1024):
+        """
+        Parameters:
+            device - CypressCapsense_I2C (or anything with fetchTouchStatus) to poll
+            size - number of slots in the ring buffer; the last size - 1
+                   frames can be read back
+        """
+        self.device = device
+        self.size = size
+
+        # frame n lives in slot n % size. Timestamps are monotonic nanoseconds,
+        # kept as doubles since array has no portable 64 bit integer type.
+        # The slot after the latest frame may be half written, so only the
+        # last size - 1 frames can be read.
+        self.timestamps = array('d', [0.0] * size)
+        self.statuses = array('i', [0] * size)
+        self.written = 0 # frames written so far; only the poll thread changes it
+
+        self.rateHz = 0
+        self.dropped = 0 # frames skipped because a poll overran its slot
+        self.startTime = 0
+        self.running = False
+        self.thread = None
+
+    def start(self, rateHz):
+        """
+        Parameters:
+            rateHz - polls per second
+
+        Return Value:
+            self
+
+        Errors:
+            none
+
+        Description:
+            Starts polling on a daemon thread. Does nothing if already running.
+        """
+        if self.running:
+            return self
+
+        self.rateHz = rateHz
+        self.dropped = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="CapsensePoller")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops polling, and waits for the poll thread to finish.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        period = 1.0 / self.rateHz
+        fetch = self.device.fetchTouchStatus
+        timestamps = self.timestamps
+        statuses = self.statuses
+        size = self.size
+
+        self.startTime = clock()
+        deadline = self.startTime
+        written = self.written
+
+        while self.running:
+            status = fetch()
+            slot = written % size
+            timestamps[slot] = clock_ns()
+            statuses[slot] = status
+            # publish only once the slot is complete
+            written += 1
+            self.written = written
+
+            deadline += period
+            delay = deadline - clock()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # we're behind; skip the slots we missed instead of bursting
+                missed = int(-delay / period)
+                self.dropped += missed
+                deadline += missed * period
+
+    def latest(self):
+        """
+        Parameters:
+            none
+
+        Return Value:
+            (seq, timestamp, status) - The most recent frame, or None if
+                nothing has been polled yet.
+
+        Errors:
+            none
+
+        Description:
+            Never blocks the poll thread.
+        """
+        written = self.written
+        if written == 0:
+            return None
+        slot = (written - 1) % self.size
+        return (written - 1, int(self.timestamps[slot]), self.statuses[slot])
+
+    def readSince(self, seq):
+        """
+        Parameters:
+            seq - sequence number of the next frame you want (0 for the first)
+
+        Return Value:
+            (nextSeq, frames, lost) - frames is a list of (timestamp, status)
+                tuples, nextSeq is what to pass next time, and lost is how many
+                frames were overwritten before you got to them.
+
+        Errors:
+            none
+
+        Description:
+            Reads every frame written since seq, without locking. If the poll
+            thread laps the reader, the oldest frames are lost and counted.
+            Frames that were overwritten while being copied are counted as
+            lost too. At most size - 1 frames are kept, since the poll thread
+            may be part way through writing the slot of the oldest one.
+        """
+        written = self.written
+        lost = 0
+        if written - seq > self.size - 1:
+            lost = written - seq - (self.size - 1)
+            seq = written - (self.size - 1)
+
+        frames = []
+        for n in range(seq, written):
+            slot = n % self.size
+            frames.append((int(self.timestamps[slot]), self.statuses[slot]))
+
+        # anything the poll thread overwrote while we copied is stale,
+        # including the slot of the frame it is writing now. Frames past the
+        # ones copied are left for the next call to count.
+        overrun = min(self.written + 1 - seq - self.size, len(frames))
+        if overrun > 0:
+            del frames[:overrun]
+            lost += overrun
+
+        return (written, frames, lost)
+
+    def achievedRate(self):
+        """
+        Returns the average number of frames per second since polling started.
+        """
+        elapsed = clock() - self.startTime
+        if self.startTime == 0 or elapsed <= 0:
+            return 0.0
+        return self.written / elapsed
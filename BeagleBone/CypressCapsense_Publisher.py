@@ -0,0 +1,284 @@
+#!/usr/bin/python
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+
+# ===========================================================================
+# FramePublisher and FrameReader Classes
+# One process owns a Cypress Capsense C8YC20xx device and publishes its
+# touch status and raw counts into a memory-mapped ring; any number of other
+# processes read it from there, without touching the I2C bus.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+# File layout, little endian:
+#   header, HEADER_SIZE bytes: magic, version, slots, frame size, frames written
+#   slots * FRAME_SIZE bytes of frames: sequence number + 1 (0 while the slot
+#   is being written), timestamp, device address, flags, touch status, and
+#   the raw counts of the ten sensors, indexed port * 5 + sensor
+MAGIC = b'CSPB'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIQ')
+HEADER_SIZE = 64
+WRITTEN_OFFSET = 16
+FRAME = struct.Struct('<QdHHi10H')
+FRAME_SIZE = 48
+SEQUENCE = struct.Struct('<Q')
+COUNTER = struct.Struct('<Q')
+
+FLAG_RAW = 0x0001 # the raw counts were fetched with this frame
+
+def sharedPath(name):
+    """
+    Where the ring called name lives: in /dev/shm where there is one, so it
+    never touches the disk.
+    """
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'capsense-%s' % name)
+
+def frameDtype():
+    """
+    The NumPy structured dtype of one frame. Needs numpy.
+    """
+    import numpy
+    return numpy.dtype({'names': ['seq', 'timestamp', 'address', 'flags', 'status', 'raw'],
+                        'formats': ['<u8', '<f8', '<u2', '<u2', '<i4', ('<u2', 10)],
+                        'offsets': [0, 8, 16, 18, 20, 24],
+                        'itemsize': FRAME_SIZE})
+
+class FramePublisher :
+
+    def __init__(self, device, name='capsense', slots=1024, rawEvery=0):
+        """
+        Parameters:
+            device - CypressCapsense_I2C to own and poll
+            name - name readers attach to (see sharedPath)
+            slots - frames the ring holds
+            rawEvery - also fetch the raw counts every rawEvery frames (0 for never)
+        """
+        self.device = device
+        self.name = name
+        self.path = sharedPath(name)
+        self.slots = slots
+        self.rawEvery = rawEvery
+        self.raw = array('H', [0] * 10)
+        self.written = 0
+
+        size = HEADER_SIZE + slots * FRAME_SIZE
+        self.file = open(self.path, 'w+b')
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, slots, FRAME_SIZE, 0)
+
+        self.running = False
+        self.thread = None
+
+    def publish(self):
+        """
+        Parameters:
+            none
+
+        Return Value:
+            int - The touch status published
+
+        Errors:
+            A failed fetch is published with status -1
+
+        Description:
+            Polls the device once (raw counts too, every rawEvery frames) and
+            writes the frame into the next slot. The slot is marked as being
+            written first and given its sequence number last, so a reader
+            never mistakes a half written frame for a whole one.
+        """
+        n = self.written
+        flags = 0
+        status = self.device.fetchTouchStatus()
+        if self.rawEvery and n % self.rawEvery == 0:
+            if self.device.fetchAllRawCounts(self.raw) != -1:
+                flags |= FLAG_RAW
+        raw = self.raw
+
+        offset = HEADER_SIZE + (n % self.slots) * FRAME_SIZE
+        FRAME.pack_into(self.map, offset, 0, clock(), self.device.address, flags, status,
+                        raw[0], raw[1], raw[2], raw[3], raw[4],
+                        raw[5], raw[6], raw[7], raw[8], raw[9])
+        SEQUENCE.pack_into(self.map, offset, n + 1)
+
+        self.written = n + 1
+        COUNTER.pack_into(self.map, WRITTEN_OFFSET, self.written)
+        return status
+
+    def start(self, rateHz):
+        """
+        Publishes rateHz frames per second from a daemon thread. Returns self.
+        """
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self.run, args=(rateHz,), name="CapsensePublisher")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def run(self, rateHz):
+        period = 1.0 / rateHz
+        deadline = clock()
+        while self.running:
+            self.publish()
+            deadline += period
+            delay = deadline - clock()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline += int(-delay / period) * period
+
+    def stop(self):
+        """
+        Stops publishing, and waits for the thread to finish.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def close(self, unlink=True):
+        """
+        Stops publishing and unmaps the ring, removing it unless unlink is
+        False. Readers already attached keep their mapping.
+        """
+        self.stop()
+        self.map.close()
+        self.file.close()
+        if unlink:
+            os.unlink(self.path)
+
+class FrameReader :
+
+    def __init__(self, name='capsense'):
+        """
+        Parameters:
+            name - name the publisher was given
+
+        Errors:
+            IOError if there is no such ring, ValueError if the file isn't one
+        """
+        self.path = sharedPath(name)
+        self.file = open(self.path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.slots, frameSize, written) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or frameSize != FRAME_SIZE:
+            raise ValueError("%s is not a capsense frame ring" % self.path)
+
+    def written(self):
+        """
+        Frames published so far.
+        """
+        return COUNTER.unpack_from(self.map, WRITTEN_OFFSET)[0]
+
+    def frame(self, seq):
+        """
+        Frame number seq as (timestamp, address, flags, status, raw counts),
+        or None if it was overwritten (or not written yet).
+        """
+        offset = HEADER_SIZE + (seq % self.slots) * FRAME_SIZE
+        fields = FRAME.unpack_from(self.map, offset)
+        if fields[0] != seq + 1 or SEQUENCE.unpack_from(self.map, offset)[0] != seq + 1:
+            return None
+        return (fields[1], fields[2], fields[3], fields[4], fields[5:])
+
+    def latest(self):
+        """
+        The most recent frame as (seq, timestamp, address, flags, status, raw
+        counts), or None if nothing has been published.
+        """
+        for i in range(3): # the writer may overtake us; try again
+            written = self.written()
+            if written == 0:
+                return None
+            frame = self.frame(written - 1)
+            if frame is not None:
+                return (written - 1,) + frame
+        return None
+
+    def readSince(self, seq):
+        """
+        Parameters:
+            seq - sequence number of the next frame you want (0 for the first)
+
+        Return Value:
+            (nextSeq, frames, lost) - frames is a list of (timestamp, address,
+                flags, status, raw counts) tuples, nextSeq is what to pass next
+                time, and lost is how many frames were overwritten before you
+                got to them.
+
+        Errors:
+            none
+
+        Description:
+            Reads every frame published since seq, without locking and
+            without any I2C traffic.
+        """
+        written = self.written()
+        lost = 0
+        if written - seq > self.slots:
+            lost = written - seq - self.slots
+            seq = written - self.slots
+
+        frames = []
+        for n in range(seq, written):
+            frame = self.frame(n)
+            if frame is None:
+                lost += 1
+            else:
+                frames.append(frame)
+        return (written, frames, lost)
+
+    def view(self):
+        """
+        The whole ring as a NumPy structured array (see frameDtype) over the
+        shared mapping. Nothing is copied, so the publisher keeps writing
+        into it; check a frame's seq field (sequence number + 1) before and
+        after using it. Copy what you want to keep (numpy.array(view[i:j])),
+        and drop every view, and arrays sliced from it, before close().
+        Needs numpy.
+        """
+        import numpy
+        return numpy.frombuffer(self.map, dtype=frameDtype(), count=self.slots,
+                                offset=HEADER_SIZE)
+
+    def close(self):
+        """
+        Unmaps the ring. Raises BufferError, leaving it mapped, while an
+        array from view() is still alive.
+        """
+        try:
+            self.map.close()
+        except BufferError:
+            raise BufferError("%s is still in use by an array from view(); "
+                              "delete it (or copy what you need) before close()" % self.path)
+        self.file.close()
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+
+import errno
+import time
+
+# ===========================================================================
+# RetryPolicy, CircuitBreaker and RetryingBus Classes
+# Retries failed I2C transactions with bounded exponential backoff, and
+# stops talking to a device that keeps failing so it can't hog a shared bus.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+# no device answered; retrying may help, reopening the bus won't
+NACK_ERRNOS = set([errno.ENXIO, errno.EREMOTEIO])
+
+class CircuitOpen(IOError):
+    """
+    Raised instead of touching the bus while a device's circuit is open.
+    """
+    pass
+
+class RetryPolicy :
+
+    def __init__(self, retries=2, backoff=0.0005, maxBackoff=0.01,
+                 failureThreshold=5, cooldown=1.0, recover=None, raiseErrors=False):
+        """
+        Parameters:
+            retries - extra attempts per transaction after the first fails
+            backoff - seconds to wait before the first retry, doubling
+                      for every further retry
+            maxBackoff - longest wait between two attempts
+            failureThreshold - transactions in a row that may fail (after
+                               retries) before the device's circuit opens
+            cooldown - seconds an open circuit skips the device before one
+                       transaction is let through to test it
+            recover - called as recover(device) when the circuit opens on a
+                      bus error (not a NACK). Return a fresh bus handle to
+                      use, or None. Default: reopen the bus if the device
+                      opened it itself.
+            raiseErrors - raise the IOError out of the device's methods
+                          instead of returning -1
+
+        A policy holds no state, so one can be shared by many devices.
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self.failureThreshold = failureThreshold
+        self.cooldown = cooldown
+        self.recover = recover
+        self.raiseErrors = raiseErrors
+
+    def delay(self, attempt):
+        """
+        Seconds to wait before retry number attempt (counting from 0).
+        """
+        return min(self.maxBackoff, self.backoff * (1 << attempt))
+
+class CircuitBreaker :
+
+    def __init__(self, threshold, cooldown):
+        """
+        Parameters:
+            threshold - consecutive failures that open the circuit
+            cooldown - seconds the circuit stays open
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0 # consecutive failed transactions
+        self.openUntil = 0 # clock() time the circuit closes again, 0 if closed
+        self.trips = 0 # times the circuit opened
+
+    def allow(self):
+        """
+        True if a transaction may go on the bus. Once the cooldown has
+        passed, transactions are let through again; the first failure
+        opens the circuit straight back up.
+        """
+        return not self.openUntil or clock() >= self.openUntil
+
+    def isOpen(self):
+        return not self.allow()
+
+    def success(self):
+        self.failures = 0
+        self.openUntil = 0
+
+    def failure(self):
+        """
+        Count a failed transaction. Returns True if that opened the circuit.
+        """
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.openUntil = clock() + self.cooldown
+            self.trips += 1
+            return True
+        return False
+
+class RetryingBus :
+
+    def __init__(self, bus, policy, breaker, metrics=None, onTrip=None):
+        """
+        Parameters:
+            bus - the transport to retry on
+            policy - RetryPolicy
+            breaker - the device's CircuitBreaker
+            metrics - optional DeviceMetrics, to count retries in
+            onTrip - called as onTrip(err) when the circuit opens
+        """
+        self.bus = bus
+        self.policy = policy
+        self.breaker = breaker
+        self.metrics = metrics
+        self.onTrip = onTrip
+        if hasattr(bus, 'prepare'):
+            self.run = self.retryingRun
+
+    def __getattr__(self, name):
+        return getattr(self.bus, name)
+
+    def attempt(self, func, *args):
+        """
+        Call func(*args), retrying on IOError as the policy allows.
+        """
+        breaker = self.breaker
+        if breaker.openUntil and not breaker.allow():
+            raise CircuitOpen(errno.EAGAIN, "Circuit open, device skipped")
+
+        retry = 0
+        while True:
+            try:
+                result = func(*args)
+            except IOError as err:
+                if retry >= self.policy.retries:
+                    if breaker.failure() and self.onTrip is not None:
+                        self.onTrip(err)
+                    raise
+                time.sleep(self.policy.delay(retry))
+                retry += 1
+                if self.metrics is not None:
+                    self.metrics.retries += 1
+                continue
+            if breaker.failures:
+                breaker.success()
+            return result
+
+    def read_byte_data(self, address, register):
+        return self.attempt(self.bus.read_byte_data, address, register)
+
+    def write_byte_data(self, address, register, value):
+        return self.attempt(self.bus.write_byte_data, address, register, value)
+
+    def read_i2c_block_data(self, address, register, length=32):
+        return self.attempt(self.bus.read_i2c_block_data, address, register, length)
+
+    def write_i2c_block_data(self, address, register, values):
+        return self.attempt(self.bus.write_i2c_block_data, address, register, values)
+
+    def retryingRun(self, plan):
+        return self.attempt(self.bus.run, plan)
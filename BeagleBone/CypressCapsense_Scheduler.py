@@ -0,0 +1,291 @@
+#!/usr/bin/python
+
+import threading
+import time
+from array import array
+
+# ===========================================================================
+# BusScheduler Class
+# Interleaves polling jobs for many Cypress Capsense C8YC20xx devices on one
+# I2C bus, each at its own rate, earliest deadline first.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+class ScheduledJob :
+
+    # weight of the newest sample in the running cost estimate
+    COST_WEIGHT = 0.1
+
+    def __init__(self, device, task, rateHz, callback=None):
+        """
+        Parameters:
+            device - CypressCapsense_I2C to poll
+            task - 'status' for fetchTouchStatus, 'raw' for fetchAllRawCounts,
+                   or a function called with the device
+            rateHz - runs per second
+            callback - optional, called as callback(timestamp, value) after
+                       every run, on the scheduler thread
+        """
+        self.device = device
+        self.rateHz = float(rateHz)
+        self.period = 1.0 / rateHz
+        self.callback = callback
+
+        if task == 'status':
+            self.name = 'status'
+            self.call = device.fetchTouchStatus
+        elif task == 'raw':
+            self.name = 'raw'
+            counts = array('H', [0] * 10) # reused for every run
+            self.call = lambda: device.fetchAllRawCounts(counts)
+        else:
+            self.name = getattr(task, '__name__', 'task')
+            self.call = lambda: task(device)
+
+        self.release = 0.0 # when the job may next run
+        self.cost = 0.0 # estimated seconds per run; 0 until measured
+        self.resetStats()
+
+    def resetStats(self):
+        """
+        Zero the counters, keeping the cost estimate.
+        """
+        self.value = None # result of the latest run
+        self.timestamp = 0.0 # when the latest run finished
+        self.runs = 0
+        self.errors = 0 # runs that returned -1
+        self.missed = 0 # releases skipped because the job fell a period behind
+        self.maxLateness = 0.0 # worst start time after release, in seconds
+        self.totalLateness = 0.0
+        self.firstRun = 0.0
+
+    def updateCost(self, cost):
+        self.cost = cost if not self.cost else self.cost + (cost - self.cost) * self.COST_WEIGHT
+
+    def measure(self):
+        """
+        Runs the task once to update the cost estimate only: no callback,
+        and no change to the value or the counters.
+        """
+        start = clock()
+        self.call()
+        self.updateCost(clock() - start)
+
+    def execute(self, now):
+        lateness = now - self.release
+        value = self.call()
+        finished = clock()
+
+        self.updateCost(finished - now)
+        if self.runs == 0:
+            self.firstRun = now
+        self.runs += 1
+        if value == -1:
+            self.errors += 1
+        if lateness > self.maxLateness:
+            self.maxLateness = lateness
+        self.totalLateness += lateness
+        self.value = value
+        self.timestamp = finished
+
+        if self.callback is not None:
+            self.callback(finished, value)
+
+        # stay on the release grid, so jitter doesn't accumulate
+        self.release += self.period
+        if finished - self.release > self.period:
+            missed = int((finished - self.release) / self.period)
+            self.missed += missed
+            self.release += missed * self.period
+
+    def stats(self):
+        elapsed = self.timestamp - self.firstRun
+        return {
+            'address': self.device.address,
+            'task': self.name,
+            'rateHz': self.rateHz,
+            'achievedHz': (self.runs - 1) / elapsed if self.runs > 1 and elapsed > 0 else 0.0,
+            'cost': self.cost,
+            'utilization': self.cost * self.rateHz,
+            'runs': self.runs,
+            'errors': self.errors,
+            'missed': self.missed,
+            'maxLateness': self.maxLateness,
+            'meanLateness': self.totalLateness / self.runs if self.runs else 0.0,
+            }
+
+class BusScheduler :
+
+    def __init__(self, headroom=0.9, onOverload=None):
+        """
+        Parameters:
+            headroom - fraction of the bus time the jobs may use before the
+                       schedule counts as overloaded
+            onOverload - optional, called as onOverload(utilization, report)
+                         from the scheduler thread when the jobs start needing
+                         more than headroom of the bus
+        """
+        self.jobs = []
+        self.headroom = headroom
+        self.onOverload = onOverload
+        self.overloaded = False
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def add(self, device, task, rateHz, callback=None):
+        """
+        Parameters:
+            device - CypressCapsense_I2C on this scheduler's bus
+            task - 'status', 'raw', or a function called with the device
+            rateHz - runs per second
+            callback - optional, called as callback(timestamp, value) after
+                       every run
+
+        Return Value:
+            ScheduledJob - Read its value and timestamp for the latest
+                result, or stats() for how well it is keeping up.
+
+        Errors:
+            none
+
+        Description:
+            Adds a job to the schedule. Jobs may be added while running;
+            a new job is first released straight away.
+        """
+        job = ScheduledJob(device, task, rateHz, callback)
+        with self.lock:
+            job.release = clock()
+            self.jobs.append(job)
+        return job
+
+    def remove(self, job):
+        with self.lock:
+            self.jobs.remove(job)
+
+    def calibrate(self, runs=3):
+        """
+        Runs each job that has no cost estimate yet a few times to measure
+        it, and returns the resulting utilization. Callbacks aren't called,
+        and jobs already measured aren't run again. start() does this.
+        """
+        for job in [job for job in list(self.jobs) if not job.cost]:
+            for i in range(runs):
+                job.measure()
+            job.release = clock()
+        return self.checkCapacity()
+
+    def utilization(self):
+        """
+        Fraction of the bus time the jobs need at their requested rates,
+        from their measured costs. Above 1.0 the rates can't all be met.
+        """
+        return sum(job.cost * job.rateHz for job in self.jobs)
+
+    def checkCapacity(self):
+        utilization = self.utilization()
+        overloaded = utilization > self.headroom
+        if overloaded and not self.overloaded and self.onOverload is not None:
+            self.onOverload(utilization, self.report())
+        self.overloaded = overloaded
+        return utilization
+
+    def report(self):
+        """
+        Return Value:
+            dict - 'utilization', 'overloaded', and 'jobs', the stats() of
+                every job
+
+        Errors:
+            none
+
+        Description:
+            Compare each job's achievedHz with its rateHz, and its missed
+            count, to see which rates the bus isn't keeping up with.
+        """
+        return {
+            'utilization': self.utilization(),
+            'overloaded': self.overloaded,
+            'jobs': [job.stats() for job in self.jobs],
+            }
+
+    def step(self):
+        """
+        Runs the released job with the earliest deadline, or sleeps until the
+        next release if none is due. Returns the job run, or None.
+        """
+        now = clock()
+        best = None
+        nextRelease = None
+        with self.lock:
+            for job in self.jobs:
+                if job.release <= now:
+                    if best is None or job.release + job.period < best.release + best.period:
+                        best = job
+                elif nextRelease is None or job.release < nextRelease:
+                    nextRelease = job.release
+
+        if best is None:
+            if nextRelease is not None:
+                time.sleep(nextRelease - now)
+            else:
+                time.sleep(0.01)
+            return None
+
+        best.execute(now)
+        return best
+
+    def run(self):
+        checked = clock()
+        while self.running:
+            self.step()
+            if clock() - checked > 1.0:
+                self.checkCapacity()
+                checked = clock()
+
+    def start(self):
+        """
+        Starts the schedule on a daemon thread. Does nothing if already
+        running. Returns self.
+
+        Jobs don't preempt each other, so a job can start late by at most
+        the longest job on the bus; lateness doesn't accumulate, because
+        releases stay on each job's grid.
+        """
+        if self.running:
+            return self
+        self.calibrate()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="CapsenseScheduler")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the schedule, and waits for the scheduler thread to finish.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,284 @@
+#!/usr/bin/python
+
+import errno
+import random
+import time
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+
+# ===========================================================================
+# SimulatedBus and SimulatedCapsense Classes
+# An in-memory I2C bus and register-level model of the Cypress Capsense
+# C8YC201xx, for testing and benchmarking without hardware.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+C = CypressCapsense_I2C
+
+# registers the master may write outside of setup mode
+ALWAYS_WRITABLE = set([0x04, 0x05, # OUTPUT_PORT0/1
+                       C.CSE_CS_FILTERING, C.CSE_I2C_DEV_LOCK, C.CSE_I2C_ADDR_DM,
+                       C.CSE_CS_READ_BUTTON, C.CSE_COMMAND_REG])
+
+# registers the chip reloads from flash whenever the enables are written
+PER_SENSOR = range(C.CSE_CS_SCAN_POS_00, C.CSE_CS_IDAC_14 + 1)
+
+class SimulatedCapsense :
+
+    # raw counts = COUNT_SCALE * capacitance / IDAC, which puts an untouched
+    # sensor with the setupDevice IDAC of 15 at 1000 counts
+    COUNT_SCALE = 15000
+
+    def __init__(self, address=0x00, deviceId=0x10, noise=2.0, seed=None):
+        """
+        Parameters:
+            address - 7 Bit I2C address (factory default 0x00)
+            deviceId - DEVICE_ID register, the last two digits of the part
+                       number (0x10 for the CY8C20110)
+            noise - standard deviation of the raw counts, in counts
+            seed - random seed for the noise
+        """
+        self.address = address
+        self.regs = [0] * 256
+        self.regs[C.CSE_CS_FINGER_TH_00:C.CSE_CS_FINGER_TH_14 + 1] = [0x64] * 10
+        self.regs[C.CSE_CS_IDAC_00:C.CSE_CS_IDAC_14 + 1] = [0x0A] * 10
+        self.regs[C.CSE_CS_SCAN_POS_00:C.CSE_CS_SCAN_POS_14 + 1] = [0xFF] * 10
+        self.regs[0x7A] = deviceId
+        self.nvm = list(self.regs)
+
+        self.setupMode = False
+        self.unlocked = False
+        self.nvmWrites = 0
+        self.rejectedWrites = 0 # config writes outside of setup mode
+
+        self.noise = noise
+        self.random = random.Random(seed)
+        self.capacitance = [1.0] * 10 # per sensor, port * 5 + sensor
+        self.touchDelta = 0.15        # capacitance a finger adds
+        self.touched = [0.0] * 10     # how much of a finger is on each sensor
+        self.centroid = (0, 0)        # last slider (position, peak) read
+
+    # -- the physical world --------------------------------------------------
+
+    def touch(self, port, sensor, touched=True):
+        self.touched[port * 5 + sensor] = 1.0 if touched else 0.0
+
+    def release(self, port, sensor):
+        self.touch(port, sensor, False)
+
+    def touchSlider(self, position):
+        """
+        Put a finger on the slider at position, 0.0 at one end to 1.0 at the
+        other, shared between the two nearest sensors; None lifts it.
+        """
+        sensors = self.sliderSensors()
+        for k in range(len(sensors)):
+            if position is None:
+                self.touched[sensors[k]] = 0.0
+            else:
+                self.touched[sensors[k]] = max(0.0, 1.0 - abs(position * (len(sensors) - 1) - k))
+
+    def sliderSensors(self):
+        count = 10 if self.regs[C.CS_SLID_CONFIG] & C.CS_SLID_CONFIG_10 else 5
+        return sorted(range(10), key=lambda i: self.regs[C.CSE_CS_SCAN_POS_00 + i])[:count]
+
+    def sliderCentroid(self):
+        """
+        (position, peak) as the chip computes them: the centroid of the peak
+        sensor and its neighbours, scaled by the multiplier. The position
+        holds while no slider sensor is over its finger threshold.
+        """
+        if not self.regs[C.CS_SLID_CONFIG] & C.CS_SLID_CONFIG_ENABLE:
+            return (0, 0)
+        sensors = self.sliderSensors()
+        diffs = [max(0, self.rawCount(i) - self.baseline(i)) for i in sensors]
+        peak = diffs.index(max(diffs))
+        if diffs[peak] <= self.regs[C.CSE_CS_FINGER_TH_00 + sensors[peak]]:
+            return (self.centroid[0], diffs[peak])
+
+        left = diffs[peak - 1] if peak > 0 else 0
+        right = diffs[peak + 1] if peak < len(diffs) - 1 else 0
+        multiplier = ((self.regs[C.CS_SLID_MULM] << 8) | self.regs[C.CS_SLID_MULL]) / 256.0
+        offset = float(right - left) / (left + diffs[peak] + right)
+        return (max(0, int(round((peak + offset) * multiplier))), diffs[peak])
+
+    def enabled(self, i):
+        return self.regs[C.CSE_CS_ENABLE0 + i // 5] & (1 << (i % 5))
+
+    def baseline(self, i):
+        return int(SimulatedCapsense.COUNT_SCALE * self.capacitance[i] /
+                   max(1, self.regs[C.CSE_CS_IDAC_00 + i]))
+
+    def rawCount(self, i):
+        capacitance = self.capacitance[i] + self.touchDelta * self.touched[i]
+        raw = SimulatedCapsense.COUNT_SCALE * capacitance / max(1, self.regs[C.CSE_CS_IDAC_00 + i])
+        if self.noise:
+            raw += self.random.gauss(0, self.noise)
+        return max(0, min(0xFFFF, int(round(raw))))
+
+    def status(self, port):
+        bits = 0
+        for sensor in range(5):
+            i = port * 5 + sensor
+            if self.enabled(i) and self.touched[i]:
+                if self.rawCount(i) - self.baseline(i) > self.regs[C.CSE_CS_FINGER_TH_00 + i]:
+                    bits |= (1 << sensor)
+        return bits
+
+    def selected(self):
+        select = self.regs[C.CSE_CS_READ_BUTTON]
+        mask = select & 0x1F
+        if not mask or mask & (mask - 1):
+            return None
+        return (select >> 7) * 5 + len(bin(mask)) - 3
+
+    # -- registers -----------------------------------------------------------
+
+    def readRegister(self, reg):
+        if reg in (C.CSE_CS_READ_STATUS0, C.CSE_CS_READ_STATUS1):
+            return self.status(reg - C.CSE_CS_READ_STATUS0)
+        if reg in (0x00, 0x01): # INPUT_PORT0/1
+            return self.status(reg)
+        if reg in (C.CSE_CS_READ_CEN_POSM, C.CSE_CS_READ_CEN_PEAKM):
+            self.centroid = self.sliderCentroid()
+        if C.CSE_CS_READ_CEN_POSM <= reg <= C.CSE_CS_READ_CEN_PEAKL:
+            value = self.centroid[(reg - C.CSE_CS_READ_CEN_POSM) // 2]
+            return (value >> 8) if reg % 2 == 0 else (value & 0xFF)
+        if 0x82 <= reg <= 0x87:
+            i = self.selected()
+            if i is None:
+                return 0
+            raw = self.rawCount(i)
+            value = [self.baseline(i), max(0, raw - self.baseline(i)), raw][(reg - 0x82) // 2]
+            return (value >> 8) if reg % 2 == 0 else (value & 0xFF)
+        return self.regs[reg]
+
+    def writeRegister(self, reg, value):
+        if reg == C.CSE_COMMAND_REG:
+            self.command(value)
+        elif reg == C.CSE_I2C_DEV_LOCK:
+            pass # handled by writeBlock, which sees the whole sequence
+        elif reg == C.CSE_I2C_ADDR_DM:
+            if self.unlocked:
+                self.regs[reg] = value # takes effect when locked again
+        elif reg in ALWAYS_WRITABLE or self.setupMode:
+            self.regs[reg] = value
+            if reg in (C.CSE_CS_ENABLE0, C.CSE_CS_ENABLE1):
+                for r in PER_SENSOR:
+                    self.regs[r] = self.nvm[r]
+        else:
+            self.rejectedWrites += 1
+
+    def writeBlock(self, reg, values):
+        if reg == C.CSE_I2C_DEV_LOCK:
+            if list(values) == C.unlock:
+                self.unlocked = True
+            elif list(values) == C.lock:
+                if self.unlocked and self.regs[C.CSE_I2C_ADDR_DM]:
+                    self.address = self.regs[C.CSE_I2C_ADDR_DM] & 0x7F
+                self.unlocked = False
+            return
+        for i in range(len(values)):
+            self.writeRegister((reg + i) & 0xFF, values[i])
+
+    def command(self, value):
+        if value == C.SETUP_OPERATION_MODE:
+            self.setupMode = True
+        elif value == C.NORMAL_OPERATION_MODE:
+            self.setupMode = False
+        elif value == C.STORE_CURRENT_CONFIGURATION_TO_NVM:
+            self.nvm = list(self.regs)
+            self.nvmWrites += 1
+
+    def powerCycle(self):
+        """
+        Lose everything that wasn't stored to NVM.
+        """
+        address = self.nvm[C.CSE_I2C_ADDR_DM] & 0x7F if self.nvm[C.CSE_I2C_ADDR_DM] else self.address
+        self.regs = list(self.nvm)
+        self.address = address
+        self.setupMode = False
+        self.unlocked = False
+
+class SimulatedBus :
+
+    def __init__(self, chips=(), latency=0.0, failRate=0.0, seed=None):
+        """
+        Parameters:
+            chips - SimulatedCapsense devices on the bus
+            latency - seconds each transaction takes (a kernel round trip plus
+                      the bytes on the wire)
+            failRate - probability of any transaction failing with an IOError
+            seed - random seed for failures
+        """
+        self.chips = list(chips)
+        self.latency = latency
+        self.failRate = failRate
+        self.random = random.Random(seed)
+        self.transactions = 0
+        self.bytes = 0
+
+    def addChip(self, chip):
+        self.chips.append(chip)
+        return chip
+
+    def transaction(self, address, nbytes):
+        self.transactions += 1
+        self.bytes += nbytes
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failRate and self.random.random() < self.failRate:
+            raise IOError(errno.EIO, "Simulated bus error")
+        for chip in self.chips:
+            if chip.address == address:
+                return chip
+        raise IOError(errno.EREMOTEIO, "No device at 0x%02X" % address)
+
+    # python-smbus interface
+
+    def read_byte_data(self, address, register):
+        return self.transaction(address, 3).readRegister(register)
+
+    def write_byte_data(self, address, register, value):
+        self.transaction(address, 3).writeRegister(register, value & 0xFF)
+
+    def read_i2c_block_data(self, address, register, length=32):
+        chip = self.transaction(address, 2 + length)
+        return [chip.readRegister((register + i) & 0xFF) for i in range(min(length, 32))]
+
+    def write_i2c_block_data(self, address, register, values):
+        self.transaction(address, 2 + len(values)).writeBlock(register, values[:32])
+
+    def close(self):
+        pass
+
+    # batched transfers; the whole plan is one transaction
+
+    def prepare(self, address, batch):
+        return (address, [(list(data), length) for (data, length) in batch])
+
+    def run(self, plan):
+        (address, batch) = plan
+        chip = self.transaction(address, sum(len(data) + length + 1 for (data, length) in batch))
+        results = []
+        for (data, length) in batch:
+            if len(data) > 1:
+                chip.writeBlock(data[0], data[1:])
+            if length:
+                results.append([chip.readRegister((data[0] + i) & 0xFF) for i in range(length)])
+        return results
@@ -0,0 +1,166 @@
+#!/usr/bin/python
+
+from array import array
+
+from CypressCapsense_Config import sensorIndex
+
+# ===========================================================================
+# SliderReader Class
+# Reads the position of a finger along a linear slider made of Cypress
+# Capsense C8YC20xx sensors, either from the chip's own centroid registers
+# or from a centroid computed on the host from batched raw counts.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+class SliderReader :
+
+    def __init__(self, device, pins, resolution=100, mode='chip', threshold=30, alpha=0.01):
+        """
+        Parameters:
+            device - CypressCapsense_I2C the slider is on
+            pins - single bit capsense pins xxxBBBBBxxxBBBBB, in order along
+                   the slider; for mode 'chip', the ones given to setupDevice
+            resolution - positions run from 0 to this
+            mode - 'chip' reads the chip's centroid registers; 'host' computes
+                   the centroid from raw counts, and works for any number of
+                   pins (2 to 10) without the chip's slider being set up
+            threshold - for 'host', counts above the baseline the peak sensor
+                        must read to count as touched
+            alpha - for 'host', weight of each untouched frame in the baseline
+
+        Errors:
+            ValueError if a pin isn't a single capsense pin, or mode is unknown
+        """
+        if mode not in ('chip', 'host'):
+            raise ValueError("mode must be 'chip' or 'host'")
+        sensors = [sensorIndex(pin) for pin in pins]
+        if None in sensors or len(sensors) < 2:
+            raise ValueError("a slider needs at least 2 single capsense pins")
+
+        self.device = device
+        self.mode = mode
+        self.sensors = sensors
+        self.resolution = resolution
+        self.threshold = threshold
+        self.alpha = alpha
+
+        self.mask = 0
+        self.statusMask = 0 # the slider's bits in fetchTouchStatus layout (port 0 high)
+        for pin in pins:
+            self.mask |= pin
+            self.statusMask |= ((pin & 0xFF) << 8) | (pin >> 8)
+
+        # lookup tables, so a frame costs no more than a few list lookups
+        # and one division: the position of each sensor along the slider,
+        # and each sensor's neighbours (None past the ends)
+        step = float(resolution) / (len(sensors) - 1)
+        self.positions = [k * step for k in range(len(sensors))]
+        self.neighbours = [(k - 1 if k > 0 else None, k + 1 if k < len(sensors) - 1 else None)
+                           for k in range(len(sensors))]
+
+        self.counts = array('H', [0] * 10)
+        self.diffs = [0.0] * len(sensors)
+        self.baseline = None
+        self.value = None # latest position
+
+    def calibrate(self, frames=16):
+        """
+        Parameters:
+            frames - frames of raw counts to average
+
+        Return Value:
+            list - The baseline of each slider sensor, in pin order
+
+        Errors:
+            On an I2C error, return -1
+
+        Description:
+            Takes the host baseline, for mode 'host', from the median of a
+            few frames. Nothing may touch the slider meanwhile. The first
+            position() calibrates for you if this wasn't called.
+        """
+        samples = [[] for k in self.sensors]
+        for frame in range(frames):
+            if self.device.fetchRawCountsMask(self.mask, self.counts) == -1:
+                return -1
+            for k in range(len(self.sensors)):
+                samples[k].append(self.counts[self.sensors[k]])
+        self.baseline = [float(sorted(values)[len(values) // 2]) for values in samples]
+        return self.baseline
+
+    def position(self):
+        """
+        Parameters:
+            none
+
+        Return Value:
+            int - The finger's position, from 0 to the resolution, or None
+                while the slider isn't touched
+
+        Errors:
+            On an I2C error, return -1
+
+        Description:
+            One I2C transaction in mode 'chip' (the status and centroid
+            registers in one block read), or one batched raw count fetch in
+            mode 'host', so positions can be read at the full poll rate.
+
+            In mode 'host' the centroid is taken over the peak sensor and
+            its two neighbours, from their counts above baseline. While
+            untouched, the baseline follows the raw counts slowly.
+        """
+        if self.mode == 'chip':
+            result = self.device.fetchSliderPosition()
+            if result == -1:
+                return -1
+            (status, position) = result
+            self.value = position if status & self.statusMask else None
+            return self.value
+
+        if self.baseline is None and self.calibrate() == -1:
+            return -1
+        if self.device.fetchRawCountsMask(self.mask, self.counts) == -1:
+            return -1
+
+        counts = self.counts
+        sensors = self.sensors
+        baseline = self.baseline
+        diffs = self.diffs
+        peak = 0
+        for k in range(len(sensors)):
+            diffs[k] = counts[sensors[k]] - baseline[k]
+            if diffs[k] > diffs[peak]:
+                peak = k
+
+        if diffs[peak] <= self.threshold:
+            alpha = self.alpha
+            for k in range(len(sensors)):
+                baseline[k] += diffs[k] * alpha
+            self.value = None
+            return None
+
+        (left, right) = self.neighbours[peak]
+        total = diffs[peak]
+        weighted = diffs[peak] * self.positions[peak]
+        for k in (left, right):
+            if k is not None and diffs[k] > 0:
+                total += diffs[k]
+                weighted += diffs[k] * self.positions[k]
+
+        self.value = int(round(weighted / total))
+        return self.value
@@ -0,0 +1,191 @@
+#!/usr/bin/python
+
+import errno
+import sys
+import time
+from array import array
+
+# ===========================================================================
+# TraceBuffer and TracingBus Classes
+# Records every I2C register transfer into a fixed size binary ring buffer,
+# cheap enough to leave on in the field, and decodes it only when dumped.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+# record kinds
+READ = 0
+WRITE = 1
+ERROR = 2 # value is the errno
+
+KINDS = ['R', 'W', 'E']
+
+class TraceBuffer :
+
+    def __init__(self, size=4096):
+        """
+        Parameters:
+            size - number of records kept; older ones are overwritten
+        """
+        self.size = size
+        self.count = 0 # records ever made
+        self.times = array('d', [0.0]) * size
+        self.kinds = array('B', [0]) * size
+        self.addresses = array('B', [0]) * size
+        self.registers = array('B', [0]) * size
+        self.values = array('H', [0]) * size
+
+    def record(self, kind, address, register, value):
+        i = self.count % self.size
+        self.times[i] = clock()
+        self.kinds[i] = kind
+        self.addresses[i] = address
+        self.registers[i] = register
+        self.values[i] = value
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def clear(self):
+        self.count = 0
+
+    def records(self):
+        """
+        Return Value:
+            list - (timestamp, kind, address, register, value) for every
+                record still in the buffer, oldest first
+
+        Errors:
+            none
+
+        Description:
+            Decodes the buffer. Nothing is formatted until this is called.
+        """
+        first = self.count - len(self)
+        results = []
+        for n in range(first, self.count):
+            i = n % self.size
+            results.append((self.times[i], self.kinds[i], self.addresses[i],
+                            self.registers[i], self.values[i]))
+        return results
+
+    def dump(self, out=None):
+        """
+        Print the buffer, oldest record first, times relative to the first.
+        """
+        if out is None:
+            out = sys.stdout
+        records = self.records()
+        if self.count > self.size:
+            out.write("(%d earlier records overwritten)\n" % (self.count - self.size))
+        for (timestamp, kind, address, register, value) in records:
+            if kind == ERROR:
+                detail = errno.errorcode.get(value, str(value))
+                out.write("%12.6f 0x%02X E 0x%02X %s\n" %
+                          (timestamp - records[0][0], address, register, detail))
+            else:
+                out.write("%12.6f 0x%02X %s 0x%02X 0x%02X\n" %
+                          (timestamp - records[0][0], address, KINDS[kind], register, value))
+
+class TracingBus :
+
+    def __init__(self, bus, trace):
+        """
+        Parameters:
+            bus - the transport to trace
+            trace - TraceBuffer to record into
+
+        Wraps a transport, recording every register read or written through
+        it, one record per byte. A failed transfer records its errno.
+        """
+        self.bus = bus
+        self.trace = trace
+        if hasattr(bus, 'prepare'):
+            self.prepare = self.tracedPrepare
+            self.run = self.tracedRun
+
+    def __getattr__(self, name):
+        return getattr(self.bus, name)
+
+    def error(self, address, register, err):
+        self.trace.record(ERROR, address, register, err.errno or errno.EIO)
+
+    def read_byte_data(self, address, register):
+        try:
+            value = self.bus.read_byte_data(address, register)
+        except IOError as err:
+            self.error(address, register, err)
+            raise
+        self.trace.record(READ, address, register, value)
+        return value
+
+    def write_byte_data(self, address, register, value):
+        try:
+            self.bus.write_byte_data(address, register, value)
+        except IOError as err:
+            self.error(address, register, err)
+            raise
+        self.trace.record(WRITE, address, register, value)
+
+    def read_i2c_block_data(self, address, register, length=32):
+        try:
+            values = self.bus.read_i2c_block_data(address, register, length)
+        except IOError as err:
+            self.error(address, register, err)
+            raise
+        record = self.trace.record
+        for i in range(len(values)):
+            record(READ, address, (register + i) & 0xFF, values[i])
+        return values
+
+    def write_i2c_block_data(self, address, register, values):
+        try:
+            self.bus.write_i2c_block_data(address, register, values)
+        except IOError as err:
+            self.error(address, register, err)
+            raise
+        record = self.trace.record
+        for i in range(len(values)):
+            record(WRITE, address, (register + i) & 0xFF, values[i])
+
+    def tracedPrepare(self, address, batch):
+        return (self.bus.prepare(address, batch), address, batch)
+
+    def tracedRun(self, plan):
+        (plan, address, batch) = plan
+        try:
+            results = self.bus.run(plan)
+        except IOError as err:
+            self.error(address, batch[0][0][0], err)
+            raise
+        record = self.trace.record
+        n = 0
+        for (data, length) in batch:
+            for i in range(1, len(data)):
+                record(WRITE, address, (data[0] + i - 1) & 0xFF, data[i])
+            if length:
+                values = results[n]
+                for i in range(length):
+                    record(READ, address, (data[0] + i) & 0xFF, values[i])
+                n += 1
+        return results
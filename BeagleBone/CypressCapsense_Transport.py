@@ -0,0 +1,124 @@
+#!/usr/bin/python
+
+# ===========================================================================
+# Bus transports for CypressCapsense_I2C
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+# A transport is anything that offers the python-smbus calls the driver uses:
+#
+#   read_byte_data(address, register)
+#   write_byte_data(address, register, value)
+#   read_i2c_block_data(address, register, length)
+#   write_i2c_block_data(address, register, values)
+#   close()
+#
+# and raises IOError when the device doesn't answer. smbus.SMBus qualifies
+# as is. A transport may also offer batched combined transfers:
+#
+#   prepare(address, batch) - batch is a list of (write bytes, read length)
+#       pairs. Each pair is a write, followed (if read length > 0) by a read
+#       after a repeated start. Returns an opaque plan, built once and reused.
+#   run(plan) - performs every transfer in the plan in as few kernel calls as
+#       possible, and returns the bytes read, one sequence per read.
+#
+# The driver uses prepare/run where it can, to scan raw counts in one go.
+#
+# And a transport may offer setTimeout(seconds, retries), to bound how long
+# a transfer to a stuck or missing device can take (see CypressCapsense_Discover).
+
+# The kernel refuses I2C_RDWR calls with more messages than this
+I2C_RDWR_IOCTL_MAX_MSGS = 42
+
+# linux/i2c-dev.h: adapter retries, and adapter timeout in units of 10 ms
+I2C_RETRIES = 0x0701
+I2C_TIMEOUT = 0x0702
+
+TRANSPORTS = ['smbus', 'smbus2', 'i2cdev']
+
+def openBus(busnum=-1, transport='smbus'):
+    """
+    Parameters:
+        busnum - I2C bus number (default 1)
+        transport - one of TRANSPORTS
+
+    Return Value:
+        An open transport for that bus
+
+    Errors:
+        ValueError for an unknown transport, ImportError if the module it
+        needs isn't installed
+
+    Description:
+        Only the module for the transport asked for is imported.
+    """
+    busnum = busnum if busnum >= 0 else 1
+
+    if transport == 'smbus':
+        import smbus
+        return smbus.SMBus(busnum)
+    if transport == 'smbus2':
+        return SMBus2Transport(busnum)
+    if transport == 'i2cdev':
+        from CypressCapsense_I2CDev import I2CDevTransport
+        return I2CDevTransport(busnum)
+
+    raise ValueError("unknown transport '%s'" % transport)
+
+class SMBus2Transport :
+
+    def __init__(self, busnum):
+        """
+        smbus2, with prepare/run built on its i2c_rdwr.
+        """
+        import smbus2
+        self.i2c_msg = smbus2.i2c_msg
+        self.bus = smbus2.SMBus(busnum)
+
+        # straight through, with no extra call overhead
+        self.read_byte_data = self.bus.read_byte_data
+        self.write_byte_data = self.bus.write_byte_data
+        self.read_i2c_block_data = self.bus.read_i2c_block_data
+        self.write_i2c_block_data = self.bus.write_i2c_block_data
+        self.close = self.bus.close
+
+    def setTimeout(self, seconds, retries=0):
+        """
+        Sets how long the adapter waits on a stuck transfer, and how often
+        it retries one, for this bus. Rounded up to 10 ms.
+        """
+        import fcntl
+        import math
+        fcntl.ioctl(self.bus.fd, I2C_TIMEOUT, max(1, int(math.ceil(seconds * 100))))
+        fcntl.ioctl(self.bus.fd, I2C_RETRIES, retries)
+
+    def prepare(self, address, batch):
+        msgs = []
+        reads = []
+        for (data, length) in batch:
+            msgs.append(self.i2c_msg.write(address, data))
+            if length:
+                reads.append(len(msgs))
+                msgs.append(self.i2c_msg.read(address, length))
+        return (msgs, reads)
+
+    def run(self, plan):
+        (msgs, reads) = plan
+        for i in range(0, len(msgs), I2C_RDWR_IOCTL_MAX_MSGS):
+            self.bus.i2c_rdwr(*msgs[i:i + I2C_RDWR_IOCTL_MAX_MSGS])
+        return [list(msgs[i]) for i in reads]
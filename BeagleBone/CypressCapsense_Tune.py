@@ -0,0 +1,246 @@
+#!/usr/bin/python
+
+import math
+import time
+from array import array
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+
+# ===========================================================================
+# autoTune
+# Finds an IDAC setting for every sensor of a Cypress Capsense C8YC20xx that
+# puts its raw counts in a target window, by binary search over all sensors
+# at once, then sets the finger thresholds from the noise measured there.
+# ===========================================================================
+
+# ===========================================================================
+# Copyright (c) 2014 Rosangela Canino-Koning. All right reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# Lesser General Public License for more details.
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301 USA
+# ===========================================================================
+
+C = CypressCapsense_I2C
+
+try:
+    clock = time.monotonic
+except AttributeError: # python 2
+    clock = time.time
+
+IDAC_MIN = 1
+IDAC_MAX = 255
+THRESHOLD_MIN = 3
+THRESHOLD_MAX = 255
+
+def sensorsIn(mask):
+    """
+    Indexes (port * 5 + sensor) of the sensors in a capsense mask.
+    """
+    return [port * 5 + sensor for port in (0, 1) for sensor in range(5)
+            if mask & (1 << ((port << 3) | sensor))]
+
+def sample(device, mask, frames, settle=0.0, out=None):
+    """
+    Parameters:
+        device - CypressCapsense_I2C to read
+        mask - sensors to read, as for fetchRawCountsMask
+        frames - number of frames of raw counts to take
+        settle - seconds to wait first, for new settings to take effect
+        out - optional list of ten lists to append the counts to
+
+    Return Value:
+        list - Ten lists of counts, indexed port * 5 + sensor; empty for
+            the sensors not in mask. None if a read failed.
+
+    Errors:
+        On an I2C error, return None
+
+    Description:
+        Every frame is one batched fetchRawCountsMask into the same buffer.
+    """
+    if out is None:
+        out = [[] for i in range(10)]
+    sensors = sensorsIn(mask)
+    counts = array('H', [0] * 10)
+
+    if settle:
+        time.sleep(settle)
+    for frame in range(frames):
+        if device.fetchRawCountsMask(mask, counts) == -1:
+            return None
+        for i in sensors:
+            out[i].append(counts[i])
+    return out
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+def deviation(values):
+    mean = float(sum(values)) / len(values)
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+
+def autoTune(device, config, targetLow=800, targetHigh=1200, samples=8, noiseSamples=64,
+             thresholdSigma=5.0, minThreshold=10, signal=None, settle=0.005, timeout=10.0,
+             apply=False):
+    """
+    Parameters:
+        device - CypressCapsense_I2C to tune, with the sensors to tune already
+                 enabled; nothing may touch them while it runs
+        config - CapsenseConfig to tune. The sensors in config.capsense are
+                 tuned, and config.idac and config.fingerThreshold are filled
+                 in (the other sensors keep what the device holds now)
+        targetLow, targetHigh - window of raw counts to put every sensor in
+        samples - frames of raw counts taken at each step of the search; the
+                  median is used, so a noisy frame can't steer the search
+        noiseSamples - frames taken at the final settings to measure noise
+        thresholdSigma - finger threshold, in standard deviations of noise
+        minThreshold - smallest finger threshold to set, in counts
+        signal - optional counts a finger is known to add on this panel. The
+                 threshold is then 80% of it, if that clears the noise.
+        settle - seconds to wait after each IDAC change before sampling
+        timeout - seconds the search may take; when it runs out, every
+                  sensor gets the best setting measured so far
+        apply - also applyConfig the result, storing it to NVM
+
+    Return Value:
+        dict - 'idac' and 'fingerThreshold' (as set in config), 'counts' (the
+            median raw counts at the chosen IDAC), 'noise' (standard
+            deviation, in counts), 'converged' (whether each sensor reached the
+            window), 'steps' and 'elapsed'. Sensors that weren't tuned have
+            None for counts and noise, and False for converged.
+
+    Errors:
+        On an I2C error, return None. The device is put back in normal mode.
+
+    Description:
+        The IDACs are written in setup mode, all ten in one block write, and
+        every sensor's search advances on the same frames, so the whole chip
+        takes about ten steps of samples frames each, not one per sensor per
+        setting. Both ends of the IDAC range are measured first, which finds
+        which way the counts move with the IDAC and whether the window can be
+        reached at all; a sensor that can't reach it gets the end nearest to
+        it. The search then halves each sensor's range until its counts land
+        in the window.
+
+        The device's own IDACs are restored afterwards, so nothing changes
+        until the config is applied.
+    """
+    start = clock()
+    mask = config.capsense
+    sensors = sensorsIn(mask)
+    target = (targetLow + targetHigh) / 2.0
+    idacs = range(C.CSE_CS_IDAC_00, C.CSE_CS_IDAC_14 + 1)
+    thresholds = range(C.CSE_CS_FINGER_TH_00, C.CSE_CS_FINGER_TH_14 + 1)
+
+    current = device.readRegisters(list(idacs) + list(thresholds))
+    if current == -1:
+        return None
+    original = [current[register_address] for register_address in idacs]
+
+    measured = [{} for i in range(10)] # sensor -> {idac: median counts}
+    setting = list(original)
+    steps = [0]
+
+    def measure(values):
+        for i in sensors:
+            setting[i] = values[i]
+        if device.writeRegisters([(idacs[i], setting[i]) for i in range(10)]) == -1:
+            return False
+        counts = sample(device, mask, samples, settle)
+        if counts is None:
+            return False
+        for i in sensors:
+            measured[i][setting[i]] = median(counts[i])
+        steps[0] += 1
+        return True
+
+    def leave(result):
+        device.writeRegisters([(idacs[i], original[i]) for i in range(10)])
+        device.write(C.CSE_COMMAND_REG, C.NORMAL_OPERATION_MODE)
+        return result
+
+    if device.write(C.CSE_COMMAND_REG, C.SETUP_OPERATION_MODE) == -1:
+        return None
+
+    # the ends of the range
+    if not measure([IDAC_MIN] * 10) or not measure([IDAC_MAX] * 10):
+        return leave(None)
+
+    # (low, high) IDACs bracketing the target, for the sensors still searching
+    bounds = {}
+    for i in sensors:
+        atMin = measured[i][IDAC_MIN]
+        atMax = measured[i][IDAC_MAX]
+        if min(atMin, atMax) <= target <= max(atMin, atMax):
+            bounds[i] = [IDAC_MIN, IDAC_MAX]
+
+    while bounds and clock() - start < timeout:
+        values = list(setting)
+        for i in bounds:
+            values[i] = (bounds[i][0] + bounds[i][1]) // 2
+        if not measure(values):
+            return leave(None)
+
+        for i in list(bounds):
+            (low, high) = bounds[i]
+            middle = values[i]
+            counts = measured[i][middle]
+            if targetLow <= counts <= targetHigh or high - low <= 2:
+                del bounds[i]
+            # keep the half whose ends are on either side of the target
+            elif (measured[i][low] - target) * (counts - target) <= 0:
+                bounds[i][1] = middle
+            else:
+                bounds[i][0] = middle
+
+    # each sensor's setting nearest the middle of the window, of those measured
+    final = list(original)
+    for i in sensors:
+        final[i] = min(measured[i], key=lambda idac: (abs(measured[i][idac] - target), idac))
+
+    if not measure(final):
+        return leave(None)
+    noise = sample(device, mask, noiseSamples)
+    if noise is None:
+        return leave(None)
+
+    result = {
+        'idac': list(final),
+        'fingerThreshold': [current[register_address] for register_address in thresholds],
+        'counts': [None] * 10,
+        'noise': [None] * 10,
+        'converged': [False] * 10,
+        'steps': steps[0],
+        'elapsed': 0.0,
+        }
+    for i in sensors:
+        sigma = deviation(noise[i])
+        threshold = max(thresholdSigma * sigma, minThreshold)
+        if signal is not None:
+            threshold = max(0.8 * signal, threshold)
+        result['fingerThreshold'][i] = max(THRESHOLD_MIN, min(THRESHOLD_MAX, int(math.ceil(threshold))))
+        result['counts'][i] = measured[i][final[i]]
+        result['noise'][i] = sigma
+        result['converged'][i] = targetLow <= measured[i][final[i]] <= targetHigh
+
+    leave(None)
+    result['elapsed'] = clock() - start
+
+    config.idac = result['idac']
+    config.fingerThreshold = result['fingerThreshold']
+    if apply and not device.applyConfig(config):
+        return None
+    return result
@@ -0,0 +1,31 @@
+import sys
+import time
+
+import CypressCapsense_I2C
+from CypressCapsense_Capture import CaptureWriter, CaptureReader
+
+## record touch status and raw counts to a capture file, instead of printing them
+sensor = CypressCapsense_I2C.CypressCapsense_I2C(0x5D, debug=False)
+capture = CaptureWriter(sys.argv[1] if len(sys.argv) > 1 else "session.cap", raw=True)
+
+## reads that fail (-1) are counted and skipped, rather than recorded
+skipped = 0
+try:
+    while(True):
+        time.sleep(0.01)
+        status = sensor.fetchTouchStatus()
+        if status == -1:
+            skipped += 1
+            continue
+        raw = sensor.fetchAllRawCounts()
+        if isinstance(raw, int) and raw == -1:
+            skipped += 1
+            continue
+        capture.write(time.time(), sensor.address, status, raw)
+except KeyboardInterrupt:
+    capture.close()
+    print("skipped %d frames" % skipped)
+
+## later, with numpy:
+##   records = CaptureReader("session.cap").array()
+##   print(records[records['status'] != 0]['timestamp'])
@@ -0,0 +1,18 @@
+import time
+
+import CypressCapsense_I2C
+
+## this device has already been set up to use 0x5D as its address
+sensor = CypressCapsense_I2C.CypressCapsense_I2C(0x5D, debug=False)
+
+## poll at 200Hz on a background thread, instead of spinning on fetchTouchStatus
+poller = sensor.startPolling(200)
+
+seq = 0
+while(True):
+    time.sleep(0.1)
+    (seq, frames, lost) = poller.readSince(seq)
+    for (timestamp, status) in frames:
+        print("%d 0x%02X" % (timestamp, status))
+    if lost:
+        print("lost %d frames" % lost)
@@ -1,12 +1,23 @@
 from distutils.core import setup
 setup(name='CypressCapsense_I2C',
-      version='0.1.0',
+      version='0.2.0',
       description='Python module for communicating with Cypress Capsense CY8C201xx capacitive touch sensors over I2C',
       author='Rosangela Canino-Koning',
       author_email='cypresscapsensei2c@voidptr.net',
       url='https://github.com/voidptr/CypressCapsense/',
       license='GPL',
-      py_modules=['CypressCapsense_I2C'],
+      py_modules=['CypressCapsense_I2C', 'CypressCapsense_Array',
+                  'CypressCapsense_Poller', 'CypressCapsense_Async',
+                  'CypressCapsense_AsyncIO', 'CypressCapsense_Events',
+                  'CypressCapsense_Interrupt',
+                  'CypressCapsense_Config', 'CypressCapsense_Transport',
+                  'CypressCapsense_Simulator', 'CypressCapsense_I2CDev',
+                  'CypressCapsense_Benchmark', 'CypressCapsense_Trace',
+                  'CypressCapsense_Metrics', 'CypressCapsense_Retry',
+                  'CypressCapsense_Scheduler', 'CypressCapsense_MultiBus',
+                  'CypressCapsense_Publisher', 'CypressCapsense_Capture',
+                  'CypressCapsense_Baseline', 'CypressCapsense_Tune',
+                  'CypressCapsense_Slider', 'CypressCapsense_Discover'],
       requires=['smbus'],
       long_description="""
 Python Library for Cypress Capsense C8YC201xx over I2C
@@ -32,7 +43,7 @@ For example::
     sensor = CypressCapsense_I2C.CypressCapsense_I2C(0x5D, debug=False)
 
     while(True):
-        print "0x%02X" % sensor.fetchTouchStatus()
+        print("0x%02X" % sensor.fetchTouchStatus())
 
 
 External Documentation
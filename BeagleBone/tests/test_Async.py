@@ -0,0 +1,61 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import CypressCapsense_Async
+from CypressCapsense_I2C import CypressCapsense_I2C
+
+class ByteBus :
+
+    def __init__(self):
+        self.registers = {}
+
+    def read_byte_data(self, address, register):
+        return self.registers.get(register, 0)
+
+    def write_byte_data(self, address, register, value):
+        self.registers[register] = value
+
+    def close(self):
+        pass
+
+@unittest.skipIf(sys.version_info < (3, 6), "asyncio needs Python 3.6")
+class AsyncTest(unittest.TestCase) :
+
+    def setUp(self):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def testSharedBusSharesThread(self):
+        bus = ByteBus()
+        first = CypressCapsense_Async.AsyncCypressCapsense(CypressCapsense_I2C(0x5D, bus=bus))
+        second = CypressCapsense_Async.AsyncCypressCapsense(CypressCapsense_I2C(0x5E, bus=bus))
+        self.loop.run_until_complete(first.write(0x10, 7))
+        self.assertEqual(self.loop.run_until_complete(second.read(0x10)), 7)
+        self.assertTrue(first.executor is second.executor)
+
+        first.close()
+        self.assertEqual(self.loop.run_until_complete(second.read(0x10)), 7)
+        second.close()
+        self.assertFalse(id(bus) in CypressCapsense_Async.executors)
+
+    def testFollowsReopenedBus(self):
+        device = CypressCapsense_I2C(0x5D, bus=ByteBus())
+        dev = CypressCapsense_Async.AsyncCypressCapsense(device)
+        self.loop.run_until_complete(dev.read(0x10))
+        old = device.rawBus
+
+        device.rawBus = device.bus = ByteBus()
+        device.rawBus.registers[0x10] = 3
+        self.assertEqual(self.loop.run_until_complete(dev.read(0x10)), 3)
+        self.assertFalse(id(old) in CypressCapsense_Async.executors)
+        self.assertTrue(dev.bus is device.rawBus)
+        dev.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+try:
+    from CypressCapsense_Baseline import BaselineTracker
+except ImportError: # no numpy
+    BaselineTracker = None
+
+@unittest.skipIf(BaselineTracker is None, "needs numpy")
+class BaselineTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.chip = SimulatedCapsense(0x5D, noise=2.0, seed=1)
+        self.bus = SimulatedBus([self.chip])
+        self.device = CypressCapsense_I2C(0x5D, bus=self.bus)
+        self.device.blockRead = True
+
+    def tracker(self, devices=None, **kwargs):
+        return BaselineTracker(devices or [self.device], **kwargs)
+
+    def testTouchNotLearned(self):
+        tracker = self.tracker(alpha=0.1)
+        for n in range(50):
+            tracker.poll()
+        self.assertFalse(tracker.touched.any())
+        baseline = tracker.baseline[0, 3]
+
+        self.chip.touch(0, 3)
+        for n in range(50):
+            tracker.poll()
+        self.assertTrue(tracker.touched[0, 3])
+        self.assertEqual(tracker.touched.sum(), 1)
+        self.assertTrue(abs(tracker.baseline[0, 3] - baseline) < 5)
+
+    def testStuckTouchResets(self):
+        tracker = self.tracker(stuckFrames=20, cooldownFrames=1000)
+        tracker.poll()
+        self.chip.touch(1, 0)
+        for n in range(19):
+            self.assertFalse(tracker.poll().any())
+        self.assertTrue(tracker.poll()[0, 5])
+        self.assertEqual(tracker.resets[0], 1)
+        self.assertEqual(self.chip.regs[CypressCapsense_I2C.CSE_CS_FILTERING],
+                         CypressCapsense_I2C.CS_FILTERING_TOUCH_BASELINE_RESET)
+
+        # the finger is taken as the new baseline
+        tracker.poll()
+        self.assertFalse(tracker.touched.any())
+
+    def testBaselinedWithFinger(self):
+        self.chip.touch(0, 0)
+        tracker = self.tracker(autoReset=False)
+        tracker.poll()
+        self.chip.release(0, 0)
+        self.assertTrue(tracker.poll()[0, 0])
+        self.assertEqual(tracker.resets[0], 0)
+
+    def testFailedDeviceLeftOut(self):
+        missing = CypressCapsense_I2C(0x5E, bus=self.bus)
+        tracker = self.tracker([self.device, missing])
+        tracker.poll()
+        self.assertEqual(list(tracker.valid), [True, False])
+        self.assertEqual(list(tracker.seeded), [True, False])
+        self.assertEqual(tracker.baseline[1].sum(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_Capture import CaptureWriter, CaptureReader, HEADER, RAW_RECORD
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class CaptureTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'session.cap')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testRoundTrip(self):
+        writer = CaptureWriter(self.path, raw=True, batch=2)
+        writer.write(1.5, 0x5D, 0x0100, list(range(10)))
+        writer.write(2.5, 0x5E, -1)
+        writer.write(3.5, 0x5D, 0x0000, [7] * 10)
+        writer.close()
+
+        reader = CaptureReader(self.path)
+        self.assertEqual(len(reader), 3)
+        self.assertEqual(reader[0], (1.5, 0x5D, 1, 0x0100, tuple(range(10))))
+        self.assertEqual(reader[1], (2.5, 0x5E, 0, -1, None))
+        self.assertEqual(reader[-1][4], (7,) * 10)
+        self.assertRaises(IndexError, reader.__getitem__, 3)
+        reader.close()
+
+    def testAppendDropsTornRecord(self):
+        writer = CaptureWriter(self.path, raw=True)
+        writer.write(1.0, 0x5D, 0)
+        writer.close()
+        f = open(self.path, 'ab')
+        f.write(b'\1' * (RAW_RECORD.size // 2))
+        f.close()
+
+        writer = CaptureWriter(self.path, raw=True)
+        writer.write(2.0, 0x5D, 0)
+        writer.close()
+        reader = CaptureReader(self.path)
+        self.assertEqual([record[0] for record in (reader[0], reader[1])], [1.0, 2.0])
+        self.assertEqual(os.path.getsize(self.path), HEADER.size + 2 * RAW_RECORD.size)
+        reader.close()
+
+    def testDifferentKind(self):
+        CaptureWriter(self.path, raw=True).close()
+        self.assertRaises(ValueError, CaptureWriter, self.path, raw=False)
+
+        f = open(self.path, 'wb')
+        f.write(b'not a capture at all')
+        f.close()
+        self.assertRaises(ValueError, CaptureReader, self.path)
+
+    @unittest.skipIf(numpy is None, "needs numpy")
+    def testArray(self):
+        writer = CaptureWriter(self.path)
+        for n in range(5):
+            writer.write(float(n), 0x5D, n % 2)
+        writer.close()
+
+        reader = CaptureReader(self.path)
+        records = reader.array()
+        self.assertEqual(list(records[records['status'] == 1]['timestamp']), [1.0, 3.0])
+        self.assertRaises(BufferError, reader.close)
+        del records
+        reader.close()
+
+if __name__ == '__main__':
+    unittest.main()
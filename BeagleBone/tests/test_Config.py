@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_Config import CapsenseConfig
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+C = CypressCapsense_I2C
+
+def planValue(plan, register_address):
+    return [data for (reg, data, mask) in plan if reg == register_address][-1]
+
+class ConfigCacheTest(unittest.TestCase) :
+
+    def testCachedUntilChanged(self):
+        config = CapsenseConfig(idac=[8] * 10)
+        plan = config.compile()
+        self.assertTrue(config.compile() is plan)
+
+        config.clock = C.CSE_OTH_SET_CLOCK_IMO2
+        self.assertFalse(config.compile() is plan)
+
+    def testListChangedInPlace(self):
+        config = CapsenseConfig(idac=[8] * 10, fingerThreshold=[100] * 10)
+        self.assertEqual(planValue(config.compile(), C.CSE_CS_IDAC_00), 8)
+
+        config.idac[0] = 99
+        config.fingerThreshold[3] = 50
+        plan = config.compile()
+        self.assertEqual(planValue(plan, C.CSE_CS_IDAC_00), 99)
+        self.assertEqual(planValue(plan, C.CSE_CS_FINGER_TH_00 + 3), 50)
+
+    def testInPlaceChangeReachesDevice(self):
+        chip = SimulatedCapsense(0x5D, seed=1)
+        device = CypressCapsense_I2C(0x5D, bus=SimulatedBus([chip]))
+        config = CapsenseConfig(idac=[8] * 10)
+        self.assertTrue(device.applyConfig(config))
+
+        config.idac[2] = 40
+        self.assertTrue(device.applyConfig(config))
+        self.assertEqual(chip.regs[C.CSE_CS_IDAC_00 + 2], 40)
+
+    def testInvalidAfterInPlaceChange(self):
+        config = CapsenseConfig()
+        self.assertTrue(config.compile() is not None)
+        config.idac[0] = 0
+        self.assertEqual(config.compile(), None)
+
+    def testJSONPlanReused(self):
+        text = CapsenseConfig(idac=[8] * 10).toJSON()
+        config = CapsenseConfig.fromJSON(text)
+        plan = config.plan
+        self.assertTrue(config.compile() is plan)
+        config.idac[0] = 9
+        self.assertEqual(planValue(config.compile(), C.CSE_CS_IDAC_00), 9)
+
+class SliderMultiplierTest(unittest.TestCase) :
+
+    def testRange(self):
+        for (multiplier, valid) in ((0, True), (255.996, True), (65535 / 256.0, True),
+                                    (255.999, False), (256, False), (-1, False)):
+            config = CapsenseConfig(sliderMultiplier=multiplier)
+            self.assertEqual(not config.validate(), valid, multiplier)
+
+    def testLargestFits(self):
+        plan = CapsenseConfig(sliderMultiplier=255.997).compile()
+        self.assertEqual(planValue(plan, C.CS_SLID_MULM), 0xFF)
+        self.assertEqual(planValue(plan, C.CS_SLID_MULL), 0xFF)
+
+if __name__ == '__main__':
+    unittest.main()
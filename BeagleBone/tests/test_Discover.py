@@ -0,0 +1,53 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_Discover import discover, provision, freeAddresses, FoundDevice
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+C = CypressCapsense_I2C
+
+class DiscoverTest(unittest.TestCase) :
+
+    def testEveryBus(self):
+        buses = {1: SimulatedBus([SimulatedCapsense(0x5E), SimulatedCapsense(0x5D, deviceId=0x80)]),
+                 2: SimulatedBus([SimulatedCapsense(0x00)]),
+                 3: SimulatedBus()}
+        self.assertEqual(discover(buses=buses),
+                         [FoundDevice(1, 0x5D, 'CY8C20180', 0), FoundDevice(1, 0x5E, 'CY8C20110', 0),
+                          FoundDevice(2, 0x00, 'CY8C20110', 0)])
+
+    def testOtherDevicesIgnored(self):
+        stranger = SimulatedCapsense(0x50, deviceId=0x99)
+        unlocked = SimulatedCapsense(0x51)
+        unlocked.regs[C.CSE_I2C_DEV_LOCK] = 0x3C
+        self.assertEqual(discover(buses={1: SimulatedBus([stranger, unlocked])}), [])
+
+    def testProvision(self):
+        bus = SimulatedBus()
+        chips = []
+
+        def ready(n, address):
+            chips.append(bus.addChip(SimulatedCapsense(0x00)))
+
+        self.assertEqual(provision(bus, [0x20, 0x21], ready), [0x20, 0x21])
+        self.assertEqual([chip.address for chip in chips], [0x20, 0x21])
+        for chip in chips:
+            chip.powerCycle()
+        self.assertEqual([chip.address for chip in chips], [0x20, 0x21])
+
+    def testProvisionStops(self):
+        bus = SimulatedBus()
+        self.assertEqual(provision(bus, [0x20], lambda n, address: False), [])
+        # nobody at 0x00
+        self.assertEqual(provision(bus, [0x20], lambda n, address: True), [])
+
+    def testFreeAddresses(self):
+        self.assertEqual(freeAddresses(0x00, 3, set([0x04])), [0x03, 0x05, 0x06])
+        self.assertEqual(freeAddresses(0x76, 3, set()), [0x76, 0x77])
+
+if __name__ == '__main__':
+    unittest.main()
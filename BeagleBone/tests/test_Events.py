@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_Events import TouchEventDetector, PRESS, RELEASE
+
+class StatusDevice :
+    """
+    Answers fetchTouchStatus from a list of statuses.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+
+    def fetchTouchStatus(self):
+        return self.statuses.pop(0)
+
+def kinds(events):
+    return [(event.kind, event.port, event.sensor) for event in events]
+
+class EventsTest(unittest.TestCase) :
+
+    def testPressAndRelease(self):
+        detector = TouchEventDetector()
+        self.assertEqual(kinds(detector.update(0x0100, 1.0)), [(PRESS, 0, 0)])
+        self.assertEqual(detector.update(0x0100, 2.0), ())
+        self.assertEqual(kinds(detector.update(0x0104, 3.0)), [(PRESS, 1, 2)])
+        events = detector.update(0x0000, 4.0)
+        self.assertEqual(kinds(events), [(RELEASE, 0, 0), (RELEASE, 1, 2)])
+        self.assertEqual(events[0].timestamp, 4.0)
+
+    def testErrorsIgnored(self):
+        detector = TouchEventDetector(initial=0x0001)
+        self.assertEqual(detector.update(-1), ())
+        self.assertEqual(kinds(detector.update(0x0000)), [(RELEASE, 1, 0)])
+
+    def testDebounce(self):
+        detector = TouchEventDetector(debounce=2)
+        self.assertEqual(detector.update(0x0001), ())
+        self.assertEqual(detector.update(0x0001), ())
+        self.assertEqual(kinds(detector.update(0x0001)), [(PRESS, 1, 0)])
+
+    def testBounceStartsOver(self):
+        detector = TouchEventDetector(debounce=1)
+        for status in (0x0001, 0x0000, 0x0001):
+            self.assertEqual(detector.update(status), ())
+        self.assertEqual(kinds(detector.update(0x0001)), [(PRESS, 1, 0)])
+        self.assertEqual(detector.stable, 0x0001)
+
+    def testPoll(self):
+        detector = TouchEventDetector()
+        device = StatusDevice([0x1000, 0x1000, 0x0000])
+        self.assertEqual(kinds(detector.poll(device)), [(PRESS, 0, 4)])
+        self.assertEqual(detector.poll(device), ())
+        self.assertEqual(kinds(detector.poll(device)), [(RELEASE, 0, 4)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import errno
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+class RegisterBus :
+    """
+    Register-level stand-in for a chip on an smbus. blockError, if set, is
+    the errno every block read fails with.
+    """
+
+    def __init__(self, registers=None, blockError=None):
+        self.registers = dict(registers or {})
+        self.blockError = blockError
+        self.blockReads = 0
+        self.reads = 0
+        self.written = []
+
+    def read_byte_data(self, address, register):
+        self.reads += 1
+        return self.registers.get(register, 0)
+
+    def write_byte_data(self, address, register, value):
+        self.registers[register] = value
+        self.written.append(register)
+
+    def write_i2c_block_data(self, address, register, values):
+        for i in range(len(values)):
+            self.write_byte_data(address, register + i, values[i])
+
+    def read_i2c_block_data(self, address, register, length=32):
+        self.blockReads += 1
+        if self.blockError is not None:
+            raise IOError(self.blockError, os.strerror(self.blockError))
+        return [self.registers.get(register + i, 0) for i in range(length)]
+
+class TouchStatusTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.bus = RegisterBus({CypressCapsense_I2C.CSE_CS_READ_STATUS0: 0x04,
+                                CypressCapsense_I2C.CSE_CS_READ_STATUS1: 0x11})
+        self.device = CypressCapsense_I2C(0x5D, bus=self.bus)
+
+    def testBlockRead(self):
+        self.assertEqual(self.device.fetchTouchStatus(), 0x0411)
+        self.assertEqual(self.device.fetchTouchStatus(), 0x0411)
+        self.assertTrue(self.device.blockRead)
+        self.assertEqual(self.bus.reads, 0)
+        self.assertEqual(self.bus.blockReads, 3) # the probe, then one per read
+
+    def testUnsupported(self):
+        self.bus.blockError = errno.EOPNOTSUPP
+        self.assertEqual(self.device.fetchTouchStatus(), 0x0411)
+        self.assertEqual(self.device.fetchTouchStatus(), 0x0411)
+        self.assertEqual(self.device.blockRead, False)
+        self.assertEqual(self.bus.blockReads, 1) # probed once
+
+    def testProbedAgainAfterGlitch(self):
+        # a NACK says nothing about the adapter, so it is probed again
+        self.bus.blockError = errno.EREMOTEIO
+        self.device.fetchTouchStatus()
+        self.assertEqual(self.device.blockRead, None)
+
+        self.bus.blockError = None
+        self.assertEqual(self.device.fetchTouchStatus(), 0x0411)
+        self.assertTrue(self.device.blockRead)
+
+class WriteRegistersTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.bus = RegisterBus()
+        self.device = CypressCapsense_I2C(0x5D, bus=self.bus)
+
+    def testGapBridged(self):
+        C = CypressCapsense_I2C
+        self.device.shadow[C.CSE_CS_IDAC_01] = 8
+        self.assertEqual(self.device.writeRegisters([(C.CSE_CS_IDAC_00, 1), (C.CSE_CS_IDAC_02, 2)]), 1)
+        self.assertEqual(self.bus.written, [C.CSE_CS_IDAC_00, C.CSE_CS_IDAC_01, C.CSE_CS_IDAC_02])
+
+    def testLockRegisterNotBridged(self):
+        C = CypressCapsense_I2C
+        self.device.shadow[C.CSE_I2C_DEV_LOCK] = C.lock[2]
+        self.assertEqual(self.device.writeRegisters([(C.CS_SLID_MULL, 1), (C.CSE_I2C_DEV_LOCK + 1, 2)]), 2)
+        self.assertFalse(C.CSE_I2C_DEV_LOCK in self.bus.written)
+
+class SetupDeviceTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.bus = RegisterBus()
+        self.device = CypressCapsense_I2C(0x5D, bus=self.bus)
+
+    def testWritesFailing(self):
+        C = CypressCapsense_I2C
+        self.bus.write_byte_data = self.failWrite
+        self.assertFalse(self.device.setupDevice(capsense=0x1F1F))
+
+        # the next call goes through setup again, and stores
+        del self.bus.write_byte_data
+        self.assertTrue(self.device.setupDevice(capsense=0x1F1F))
+        self.assertEqual(self.bus.registers[C.CSE_CS_ENABLE0], 0x1F)
+        # setup, store, reconfigure and normal mode
+        self.assertEqual(self.bus.written.count(C.CSE_COMMAND_REG), 4)
+        self.assertEqual(self.bus.registers[C.CSE_COMMAND_REG], C.NORMAL_OPERATION_MODE)
+
+    def testUnchanged(self):
+        self.assertTrue(self.device.setupDevice(capsense=0x1F1F))
+        self.bus.written = []
+        self.assertTrue(self.device.setupDevice(capsense=0x1F1F))
+        self.assertEqual(self.bus.written, [])
+
+    def failWrite(self, address, register, value):
+        raise IOError(errno.EIO, os.strerror(errno.EIO))
+
+class RawCountsTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.bus = RegisterBus({CypressCapsense_I2C.CSE_CS_READ_RAWM: 0x12,
+                                CypressCapsense_I2C.CSE_CS_READ_RAWL: 0x34})
+        self.device = CypressCapsense_I2C(0x5D, bus=self.bus)
+
+    def testSensorIndex(self):
+        self.assertEqual(self.device.fetchRawCounts(1, 3), 0x1234)
+        self.assertEqual(self.bus.registers[CypressCapsense_I2C.CSE_CS_READ_BUTTON], 0x80 | 0x08)
+
+    def testOutOfRange(self):
+        for (port, sensor) in ((0, 5), (2, 0), (-1, 0), (0, 0x10), (0x100, 0)):
+            self.assertRaises(ValueError, self.device.fetchRawCounts, port, sensor)
+
+    def testOneTransactionWhenBatched(self):
+        chip = SimulatedCapsense(0x5D, noise=0, seed=1)
+        bus = SimulatedBus([chip])
+        device = CypressCapsense_I2C(0x5D, bus=bus)
+        device.blockRead = True
+        self.assertEqual(device.fetchRawCounts(1, 3), chip.rawCount(8))
+        self.assertEqual(bus.transactions, 1)
+
+if __name__ == '__main__':
+    unittest.main()
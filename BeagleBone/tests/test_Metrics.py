@@ -0,0 +1,28 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_Array import CapsenseArray
+from CypressCapsense_Metrics import exposition
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+class ExpositionTest(unittest.TestCase) :
+
+    def testSameAddressOnTwoBuses(self):
+        fleet = CapsenseArray()
+        for busnum in (1, 2):
+            fleet.setBus(busnum, SimulatedBus([SimulatedCapsense(0x5D, seed=busnum)]))
+            fleet.addDevice(0x5D, busnum)
+        fleet.enableMetrics()
+        fleet.pollAll()
+
+        series = [line.rsplit(' ', 1)[0] for line in exposition(fleet).splitlines()
+                  if not line.startswith('#')]
+        self.assertEqual(len(series), len(set(series)))
+        self.assertTrue('capsense_bytes_total{bus="1",address="0x5D"}' in series)
+        self.assertTrue('capsense_bytes_total{bus="2",address="0x5D"}' in series)
+
+if __name__ == '__main__':
+    unittest.main()
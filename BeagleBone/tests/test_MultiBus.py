@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_MultiBus import MultiBusRunner
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+class ClosingBus(SimulatedBus) :
+
+    def __init__(self, chips=()):
+        SimulatedBus.__init__(self, chips)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class CallersBusTest(unittest.TestCase) :
+
+    def testLeftOpen(self):
+        bus = ClosingBus([SimulatedCapsense(0x5D, seed=1)])
+        runner = MultiBusRunner(rateHz=500, size=256)
+        runner.addBus(1, [0x5D], bus=bus)
+        runner.start()
+        time.sleep(0.05)
+        runner.stop()
+        self.assertTrue(bus.transactions > 0)
+        self.assertFalse(bus.closed)
+
+class DeadWorkerTest(unittest.TestCase) :
+
+    def run(self, result=None):
+        # keep the dying worker's traceback out of the test output
+        stderr = sys.stderr
+        sys.stderr = open(os.devnull, 'w')
+        try:
+            return unittest.TestCase.run(self, result)
+        finally:
+            sys.stderr.close()
+            sys.stderr = stderr
+
+    def checkDeadWorker(self, processes):
+        runner = MultiBusRunner(rateHz=500, processes=processes, size=256)
+        runner.addBus(1, [0x5D], bus=SimulatedBus([SimulatedCapsense(0x5D, seed=1)]))
+        runner.addBus(2, [0x5D], transport='no such transport')
+        runner.start()
+        try:
+            frames = []
+            cursor = None
+            deadline = time.time() + 5
+            while not frames and time.time() < deadline:
+                time.sleep(0.02)
+                (cursor, frames, lost) = runner.readSince(cursor)
+            self.assertEqual(runner.failedBuses(), [2])
+            self.assertTrue(frames)
+            self.assertEqual(set(busnum for (timestamp, busnum, address, status) in frames), set([1]))
+        finally:
+            runner.stop()
+
+    def testThreads(self):
+        self.checkDeadWorker(False)
+
+    def testProcesses(self):
+        self.checkDeadWorker(True)
+
+if __name__ == '__main__':
+    unittest.main()
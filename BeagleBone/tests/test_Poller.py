@@ -0,0 +1,100 @@
+import os
+import sys
+import unittest
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_Poller import CapsensePoller
+
+IN_PROGRESS = -2 # status of a frame the poll thread is part way through
+
+def publish(poller, status):
+    # what the poll thread does for one frame
+    slot = poller.written % poller.size
+    poller.timestamps[slot] = float(poller.written)
+    poller.statuses[slot] = status
+    poller.written += 1
+
+class WriterDuringRead(array) :
+    """
+    A status array whose first read lets the poll thread publish frames,
+    then start on the next one, while the reader is copying.
+    """
+
+    def __getitem__(self, i):
+        if self.poller is not None:
+            (poller, self.poller) = (self.poller, None)
+            for n in range(self.publish):
+                publish(poller, poller.written)
+            slot = poller.written % poller.size
+            array.__setitem__(self, slot, IN_PROGRESS)
+        return array.__getitem__(self, i)
+
+class RingOverrunTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.poller = CapsensePoller(None, size=8)
+
+    def writerDuringRead(self, publish):
+        statuses = WriterDuringRead('i', self.poller.statuses)
+        statuses.poller = self.poller
+        statuses.publish = publish
+        self.poller.statuses = statuses
+
+    def checkFrames(self, start, frames, lost, written):
+        # frame n has status n; every frame is either returned or counted lost
+        self.assertFalse([status for (timestamp, status) in frames if status == IN_PROGRESS])
+        for (timestamp, status) in frames:
+            self.assertEqual(int(timestamp), status)
+        statuses = [status for (timestamp, status) in frames]
+        self.assertEqual(statuses, list(range(statuses[0], statuses[0] + len(statuses))) if statuses else [])
+        self.assertEqual(start + lost + len(frames), written)
+
+    def testInOrder(self):
+        for n in range(5):
+            publish(self.poller, n)
+        (seq, frames, lost) = self.poller.readSince(0)
+        self.assertEqual((seq, lost), (5, 0))
+        self.assertEqual([status for (timestamp, status) in frames], [0, 1, 2, 3, 4])
+
+    def testLapped(self):
+        for n in range(20):
+            publish(self.poller, n)
+        (seq, frames, lost) = self.poller.readSince(0)
+        self.assertEqual(seq, 20)
+        self.checkFrames(0, frames, lost, 20)
+        self.assertEqual(len(frames), self.poller.size - 1)
+
+    def testSlotBeingWritten(self):
+        # a full ring, and the poll thread starts on the next frame as the
+        # reader copies; the oldest frame's slot is the one being written
+        for n in range(self.poller.size):
+            publish(self.poller, n)
+        self.writerDuringRead(0)
+        (seq, frames, lost) = self.poller.readSince(0)
+        self.checkFrames(0, frames, lost, seq)
+
+    def testOverwrittenWhileCopying(self):
+        for publishing in range(1, 12):
+            self.setUp()
+            for n in range(self.poller.size):
+                publish(self.poller, n)
+            self.writerDuringRead(publishing)
+            (seq, frames, lost) = self.poller.readSince(0)
+            self.checkFrames(0, frames, lost, seq)
+
+    def testCountsAddUp(self):
+        seq = 0
+        total = 0
+        lostTotal = 0
+        for burst in (3, 7, 8, 9, 1, 15, 2):
+            for n in range(burst):
+                publish(self.poller, self.poller.written)
+            (seq, frames, lost) = self.poller.readSince(seq)
+            total += len(frames)
+            lostTotal += lost
+        self.assertEqual(total + lostTotal, self.poller.written)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Publisher import FramePublisher, FrameReader, FLAG_RAW
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+C = CypressCapsense_I2C
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class PublisherTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.chip = SimulatedCapsense(0x5D, noise=0, seed=1)
+        self.chip.regs[C.CSE_CS_ENABLE0] = 0x1F
+        self.device = CypressCapsense_I2C(0x5D, bus=SimulatedBus([self.chip]))
+        self.name = 'test-%d' % os.getpid()
+        self.publisher = FramePublisher(self.device, self.name, slots=4, rawEvery=2)
+        self.reader = FrameReader(self.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.publisher.close()
+
+    def testFrames(self):
+        self.assertEqual(self.reader.latest(), None)
+        self.chip.touch(0, 1)
+        self.assertEqual(self.publisher.publish(), 0x0200)
+        touched = [self.chip.rawCount(i) for i in range(10)]
+        self.chip.release(0, 1)
+        self.publisher.publish()
+
+        (seq, timestamp, address, flags, status, raw) = self.reader.latest()
+        self.assertEqual((seq, address, flags, status), (1, 0x5D, 0, 0))
+        (timestamp, address, flags, status, raw) = self.reader.frame(0)
+        self.assertEqual((flags, status), (FLAG_RAW, 0x0200))
+        self.assertEqual(list(raw), touched)
+        self.assertTrue(raw[1] > raw[0])
+
+    def testReadSince(self):
+        for n in range(3):
+            self.publisher.publish()
+        (seq, frames, lost) = self.reader.readSince(0)
+        self.assertEqual((seq, len(frames), lost), (3, 3, 0))
+
+        for n in range(6):
+            self.publisher.publish()
+        (seq, frames, lost) = self.reader.readSince(seq)
+        self.assertEqual((seq, len(frames), lost), (9, 4, 2))
+
+    def testNotARing(self):
+        path = self.publisher.path + '-bad'
+        f = open(path, 'wb')
+        f.write(b'\0' * 128)
+        f.close()
+        try:
+            self.assertRaises(ValueError, FrameReader, self.name + '-bad')
+        finally:
+            os.unlink(path)
+
+    @unittest.skipIf(numpy is None, "needs numpy")
+    def testViewBlocksClose(self):
+        self.publisher.publish()
+        view = self.reader.view()
+        self.assertEqual(view[0]['seq'], 1)
+        self.assertRaises(BufferError, self.reader.close)
+        del view
+        self.reader.close()
+        self.reader = FrameReader(self.name)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import errno
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Retry import RetryPolicy, CircuitOpen
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+C = CypressCapsense_I2C
+
+class FlakyBus(SimulatedBus) :
+    """
+    The next failures transactions fail with failErrno.
+    """
+
+    def __init__(self, chips=(), failures=0, failErrno=errno.EIO):
+        SimulatedBus.__init__(self, chips)
+        self.failures = failures
+        self.failErrno = failErrno
+
+    def transaction(self, address, nbytes):
+        if self.failures:
+            self.failures -= 1
+            self.transactions += 1
+            raise IOError(self.failErrno, os.strerror(self.failErrno))
+        return SimulatedBus.transaction(self, address, nbytes)
+
+class RetryTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.chip = SimulatedCapsense(0x5D, seed=1)
+        self.chip.regs[C.CSE_CS_IDAC_00] = 12
+        self.bus = FlakyBus([self.chip])
+
+    def device(self, **policy):
+        return CypressCapsense_I2C(0x5D, bus=self.bus, retry=RetryPolicy(backoff=0, **policy))
+
+    def testTransientErrorRetried(self):
+        device = self.device(retries=2)
+        self.bus.failures = 2
+        self.assertEqual(device.read(C.CSE_CS_IDAC_00), 12)
+        self.assertEqual(self.bus.transactions, 3)
+        self.assertEqual(device.breaker.failures, 0)
+
+    def testRetriesRunOut(self):
+        device = self.device(retries=1)
+        self.bus.failures = 2
+        self.assertEqual(device.read(C.CSE_CS_IDAC_00), -1)
+        self.assertEqual(self.bus.transactions, 2)
+        self.assertEqual(device.breaker.failures, 1)
+
+    def testCircuitOpens(self):
+        device = self.device(retries=0, failureThreshold=3, cooldown=60, raiseErrors=True,
+                             recover=lambda device: None)
+        self.bus.failures = 3
+        for n in range(3):
+            self.assertRaises(IOError, device.read, C.CSE_CS_IDAC_00)
+        self.assertTrue(device.breaker.isOpen())
+
+        # an open circuit fails without touching the bus
+        transactions = self.bus.transactions
+        self.assertRaises(CircuitOpen, device.read, C.CSE_CS_IDAC_00)
+        self.assertEqual(self.bus.transactions, transactions)
+
+    def testCircuitClosesAfterCooldown(self):
+        device = self.device(retries=0, failureThreshold=1, cooldown=0)
+        self.bus.failErrno = errno.EREMOTEIO
+        self.bus.failures = 1
+        self.assertEqual(device.read(C.CSE_CS_IDAC_00), -1)
+        self.assertEqual(device.breaker.trips, 1)
+        self.assertEqual(device.read(C.CSE_CS_IDAC_00), 12)
+        self.assertFalse(device.breaker.isOpen())
+
+    def testBusErrorRecovers(self):
+        fresh = SimulatedBus([self.chip])
+        device = self.device(retries=0, failureThreshold=1, recover=lambda device: fresh)
+        self.bus.failures = 1
+        self.assertEqual(device.read(C.CSE_CS_IDAC_00), -1)
+        self.assertTrue(device.rawBus is fresh)
+
+    def testNackLeavesBus(self):
+        recovered = []
+        device = self.device(retries=0, failureThreshold=1, recover=recovered.append)
+        self.bus.failErrno = errno.EREMOTEIO
+        self.bus.failures = 1
+        self.assertEqual(device.read(C.CSE_CS_IDAC_00), -1)
+        self.assertEqual(recovered, [])
+        self.assertTrue(device.rawBus is self.bus)
+
+if __name__ == '__main__':
+    unittest.main()
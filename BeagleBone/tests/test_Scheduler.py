@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Scheduler import BusScheduler
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+class CalibrateTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.bus = SimulatedBus([SimulatedCapsense(0x5D, seed=1), SimulatedCapsense(0x5E, seed=2)])
+        self.devices = [CypressCapsense_I2C(address, bus=self.bus) for address in (0x5D, 0x5E)]
+        self.scheduler = BusScheduler()
+        self.events = []
+
+    def testNoCallbacks(self):
+        job = self.scheduler.add(self.devices[0], 'status', 100,
+                                 lambda timestamp, value: self.events.append(value))
+        self.scheduler.calibrate()
+        self.assertEqual(self.events, [])
+        self.assertEqual(job.runs, 0)
+        self.assertTrue(job.cost > 0)
+
+    def testOnlyNewJobs(self):
+        first = self.scheduler.add(self.devices[0], 'status', 100)
+        self.scheduler.calibrate(runs=3)
+        cost = first.cost
+
+        self.devices[1].fetchAllRawCounts() # probe and prepare first
+        self.scheduler.add(self.devices[1], 'raw', 10)
+        before = self.bus.transactions
+        self.scheduler.calibrate(runs=3)
+        self.assertEqual(first.cost, cost)
+
+        # only the new job ran: three batched raw count reads
+        single = self.bus.transactions
+        self.devices[1].fetchAllRawCounts()
+        self.assertEqual(single - before, 3 * (self.bus.transactions - single))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+from CypressCapsense_Slider import SliderReader
+
+PINS = [0x0001, 0x0002, 0x0004, 0x0008, 0x0010]
+
+class SliderTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.chip = SimulatedCapsense(0x5D, noise=1.0, seed=1)
+        self.bus = SimulatedBus([self.chip])
+        self.device = CypressCapsense_I2C(0x5D, bus=self.bus)
+
+    def checkPositions(self, slider, positions):
+        self.assertEqual(slider.position(), None)
+        for (where, expected) in positions:
+            self.chip.touchSlider(where)
+            self.assertTrue(abs(slider.position() - expected) <= 2, (where, slider.value))
+        self.chip.touchSlider(None)
+        self.assertEqual(slider.position(), None)
+
+    def testChip(self):
+        self.assertTrue(self.device.setupDevice(capsense=0x001F, slider=PINS, sliderResolution=100))
+        slider = SliderReader(self.device, PINS)
+        self.checkPositions(slider, ((0.0, 0), (0.25, 25), (0.5, 50), (1.0, 100)))
+
+        # the status and the centroid come back in one transaction
+        self.chip.touchSlider(0.5)
+        transactions = self.bus.transactions
+        slider.position()
+        self.assertEqual(self.bus.transactions, transactions + 1)
+
+    def testHost(self):
+        self.assertTrue(self.device.setupDevice(capsense=0x001F))
+        slider = SliderReader(self.device, PINS, mode='host')
+        # between two sensors, where neither is over the chip's own threshold
+        self.checkPositions(slider, ((0.0, 0), (0.5, 50), (0.625, 62), (1.0, 100)))
+        self.assertEqual(len(slider.baseline), 5)
+
+    def testHostAnyPins(self):
+        self.assertTrue(self.device.setupDevice(capsense=0x0707))
+        pins = [0x0001, 0x0002, 0x0004, 0x0100, 0x0200, 0x0400]
+        slider = SliderReader(self.device, pins, mode='host')
+        slider.calibrate()
+        self.chip.touch(1, 0)
+        self.assertEqual(slider.position(), 60)
+
+    def testBadPins(self):
+        self.assertRaises(ValueError, SliderReader, self.device, [0x0001])
+        self.assertRaises(ValueError, SliderReader, self.device, [0x0003, 0x0004])
+        self.assertRaises(ValueError, SliderReader, self.device, PINS, mode='both')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import errno
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+try:
+    from StringIO import StringIO
+except ImportError: # python 3
+    from io import StringIO
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+from CypressCapsense_Trace import TraceBuffer, READ, WRITE, ERROR
+
+C = CypressCapsense_I2C
+
+def transfers(trace):
+    return [(kind, address, register, value)
+            for (timestamp, kind, address, register, value) in trace.records()]
+
+class TraceTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.chip = SimulatedCapsense(0x5D, noise=0, seed=1)
+        self.chip.setupMode = True
+        self.chip.regs[C.CSE_CS_ENABLE0] = 0x1F
+        self.bus = SimulatedBus([self.chip])
+        self.device = CypressCapsense_I2C(0x5D, bus=self.bus)
+        self.device.blockRead = True
+
+    def testReadsAndWrites(self):
+        trace = self.device.startTrace()
+        self.device.write(C.CSE_CS_IDAC_00, 12)
+        self.assertEqual(self.device.read(C.CSE_CS_IDAC_00), 12)
+        self.assertEqual(transfers(trace), [(WRITE, 0x5D, C.CSE_CS_IDAC_00, 12),
+                                            (READ, 0x5D, C.CSE_CS_IDAC_00, 12)])
+
+    def testBlockReadOneRecordPerByte(self):
+        self.chip.touch(0, 2)
+        trace = self.device.startTrace()
+        self.assertEqual(self.device.fetchTouchStatus(), 0x0400)
+        self.assertEqual(transfers(trace), [(READ, 0x5D, C.CSE_CS_READ_STATUS0, 0x04),
+                                            (READ, 0x5D, C.CSE_CS_READ_STATUS1, 0x00)])
+
+    def testBatchedRawCounts(self):
+        trace = self.device.startTrace()
+        counts = self.device.fetchRawCountsMask(0x0001)
+        self.assertEqual(transfers(trace), [(WRITE, 0x5D, C.CSE_CS_READ_BUTTON, 0x01),
+                                            (READ, 0x5D, C.CSE_CS_READ_RAWM, counts[0] >> 8),
+                                            (READ, 0x5D, C.CSE_CS_READ_RAWL, counts[0] & 0xFF)])
+
+    def testErrorRecordsErrno(self):
+        missing = CypressCapsense_I2C(0x5E, bus=self.bus)
+        trace = missing.startTrace()
+        self.assertEqual(missing.read(0x10), -1)
+        self.assertEqual(transfers(trace), [(ERROR, 0x5E, 0x10, errno.EREMOTEIO)])
+
+        out = StringIO()
+        trace.dump(out)
+        self.assertTrue("EREMOTEIO" in out.getvalue())
+
+    def testRingKeepsNewest(self):
+        trace = self.device.startTrace(size=4)
+        for value in range(6):
+            self.device.write(C.CSE_CS_IDAC_00, value)
+        self.assertEqual(len(trace), 4)
+        self.assertEqual([value for (kind, address, register, value) in transfers(trace)],
+                         [2, 3, 4, 5])
+
+    def testStop(self):
+        trace = self.device.startTrace()
+        self.assertTrue(self.device.stopTrace() is trace)
+        self.device.write(C.CSE_CS_IDAC_00, 1)
+        self.assertEqual(len(trace), 0)
+        self.assertTrue(self.device.bus is self.device.rawBus)
+
+if __name__ == '__main__':
+    unittest.main()
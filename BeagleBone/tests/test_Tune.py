@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_Config import CapsenseConfig
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+from CypressCapsense_Tune import autoTune
+
+C = CypressCapsense_I2C
+
+class TuneTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.chip = SimulatedCapsense(0x5D, noise=2.0, seed=1)
+        self.chip.capacitance = [1.0, 2.0, 0.5, 1.5, 3.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+        self.bus = SimulatedBus([self.chip])
+        self.device = CypressCapsense_I2C(0x5D, bus=self.bus)
+
+    def testConverges(self):
+        config = CapsenseConfig(capsense=0x001F)
+        result = autoTune(self.device, config, settle=0)
+        for i in range(5):
+            self.assertTrue(result['converged'][i], i)
+            self.assertTrue(800 <= result['counts'][i] <= 1200, result['counts'][i])
+            self.assertEqual(config.idac[i], result['idac'][i])
+            self.assertTrue(config.fingerThreshold[i] >= 10)
+        self.assertEqual(result['counts'][5:], [None] * 5)
+
+        # nothing on the chip changed, and it is back in normal mode
+        self.assertEqual(self.chip.regs[C.CSE_CS_IDAC_00:C.CSE_CS_IDAC_14 + 1], [0x0A] * 10)
+        self.assertFalse(self.chip.setupMode)
+
+    def testUnreachable(self):
+        self.chip.capacitance[0] = 0.01
+        result = autoTune(self.device, CapsenseConfig(capsense=0x0001), settle=0)
+        self.assertFalse(result['converged'][0])
+        self.assertEqual(result['idac'][0], 1)
+
+    def testThresholdFromSignal(self):
+        config = CapsenseConfig(capsense=0x0001)
+        result = autoTune(self.device, config, settle=0, signal=100)
+        self.assertEqual(result['fingerThreshold'][0], 80)
+
+    def testApply(self):
+        config = CapsenseConfig(capsense=0x0003)
+        result = autoTune(self.device, config, settle=0, apply=True)
+        self.assertEqual(self.chip.nvm[C.CSE_CS_IDAC_00:C.CSE_CS_IDAC_00 + 2], result['idac'][:2])
+        self.assertEqual(self.chip.nvmWrites, 1)
+
+    def testBusError(self):
+        self.bus.failRate = 1.0
+        self.assertEqual(autoTune(self.device, CapsenseConfig(capsense=0x0001), settle=0), None)
+
+if __name__ == '__main__':
+    unittest.main()
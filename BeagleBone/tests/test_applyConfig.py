@@ -0,0 +1,95 @@
+import errno
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from CypressCapsense_I2C import CypressCapsense_I2C
+from CypressCapsense_Simulator import SimulatedBus, SimulatedCapsense
+
+C = CypressCapsense_I2C
+
+class FailingBus(SimulatedBus) :
+    """
+    Reads always work; writes fail once failWrites is down to 0.
+    """
+
+    def __init__(self, chips=(), failWrites=None):
+        SimulatedBus.__init__(self, chips)
+        self.failWrites = failWrites # writes left before they start failing
+
+    def checkWrite(self):
+        if self.failWrites is not None:
+            if self.failWrites <= 0:
+                raise IOError(errno.EIO, "Simulated write error")
+            self.failWrites -= 1
+
+    def write_byte_data(self, address, register, value):
+        self.checkWrite()
+        SimulatedBus.write_byte_data(self, address, register, value)
+
+    def write_i2c_block_data(self, address, register, values):
+        self.checkWrite()
+        SimulatedBus.write_i2c_block_data(self, address, register, values)
+
+class ApplyConfigTest(unittest.TestCase) :
+
+    def setUp(self):
+        self.chip = SimulatedCapsense(0x5D, seed=1)
+        self.bus = FailingBus([self.chip])
+        self.device = CypressCapsense_I2C(0x5D, bus=self.bus)
+
+    def assertShadowTrue(self, device, chip):
+        # whatever the shadow remembers, the chip really holds
+        for (register_address, data) in device.shadow.items():
+            if register_address != C.CSE_COMMAND_REG:
+                self.assertEqual(chip.regs[register_address], data,
+                                 "shadow has 0x%02X = %d" % (register_address, data))
+
+    def testSetupStoresToNvm(self):
+        self.assertTrue(self.device.setupDevice(capsense=0x1F1F, gpio=0x0))
+        self.assertEqual(self.chip.nvmWrites, 1)
+        self.assertFalse(self.chip.setupMode)
+        self.assertEqual(self.chip.rejectedWrites, 0)
+
+    def testSetupAgainWritesNothing(self):
+        self.assertTrue(self.device.setupDevice(capsense=0x1F1F))
+        diff = {}
+        self.assertTrue(self.device.setupDevice(capsense=0x1F1F, diff=diff))
+        self.assertEqual(diff, {})
+        self.assertEqual(self.chip.nvmWrites, 1)
+
+    def testEveryWriteFailing(self):
+        self.bus.failWrites = 0
+        self.assertFalse(self.device.setupDevice(capsense=0x1E1F, interrupt=0x0001 << 8))
+        self.assertEqual(self.chip.nvmWrites, 0)
+        self.assertShadowTrue(self.device, self.chip)
+
+    def testFailureAtEveryWrite(self):
+        # fail the n-th write, for every n the full setup takes
+        n = 0
+        while True:
+            chip = SimulatedCapsense(0x5D, seed=1)
+            bus = FailingBus([chip], failWrites=n)
+            device = CypressCapsense_I2C(0x5D, bus=bus)
+            if device.setupDevice(capsense=0x1E1F, interrupt=0x0001 << 8):
+                break
+            self.assertShadowTrue(device, chip)
+
+            # the shadow must not claim registers that never got written, so
+            # a retry on a working bus ends up fully configured, and stored
+            bus.failWrites = None
+            self.assertTrue(device.setupDevice(capsense=0x1E1F, interrupt=0x0001 << 8))
+            self.assertTrue(chip.nvmWrites >= 1)
+            self.assertEqual(chip.nvm[:0x80], chip.regs[:0x80])
+            self.assertFalse(chip.setupMode)
+            check = CypressCapsense_I2C(0x5D, bus=bus)
+            diff = {}
+            self.assertTrue(check.setupDevice(capsense=0x1E1F, interrupt=0x0001 << 8, diff=diff))
+            self.assertEqual(diff, {}, "write %d failing left %r unwritten" % (n, diff))
+            n += 1
+        self.assertTrue(n > 3)
+
+if __name__ == '__main__':
+    unittest.main()